@@ -1,41 +1,104 @@
 import logging
+import os
 import subprocess
-from fastapi import APIRouter, Request, Depends, Form, Body
-from fastapi.responses import RedirectResponse, JSONResponse, HTMLResponse
+from dataclasses import asdict
+from typing import Optional
+from fastapi import APIRouter, Request, Depends, Form, Body, HTTPException
+from fastapi.responses import RedirectResponse, JSONResponse, HTMLResponse, PlainTextResponse
+from app.core.job.control import KILL_GRACE
 from app.core.job.tracker import job_tracker
+from app.core.job.timeline import to_chrome_trace
+from app.core.batch import batch_manager
+from app.core.catalog import catalog
 from app.core.config import get_config, set_config, get_description, get_descriptions
 from app.core.drivemanager import drive_manager
+from app.core.metadata.index import disc_index
+from app.core.storage import io_budget
 from app.core.templates import templates
-from app.core.systeminfo import SystemInfo
+from app.core import systeminfo
+from app.core import metrics
+from app.core.encoding import dumps, json_response
 
 router = APIRouter()
 
+PROFILE_MAX_SECONDS = 60
+
 @router.get("/jobs/{job_id}")
 def job_detail(job_id: str, request: Request):
     job = job_tracker.get_job_status(job_id)
     return templates.TemplateResponse("job_detail.html", {"request": request, "job": job})
 
 @router.get("/jobs/{job_id}/json")
-def job_json(job_id: str):
-    return job_tracker.get_job_status(job_id)
+def job_json(job_id: str, request: Request):
+    encoded = job_tracker.encoded_job(job_id)
+    if encoded is None:
+        return json_response(request, dumps(None))
+    etag, body = encoded
+    return json_response(request, body, etag)
+
+@router.get("/jobs/{job_id}/trace")
+def job_trace(job_id: str):
+    job = job_tracker.get_job_status(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(
+        content=to_chrome_trace(job),
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.trace.json"'},
+    )
 
 @router.get("/jobs/{job_id}/progress")
 def job_progress_partial(job_id: str, request: Request):
     job = job_tracker.get_job_status(job_id)
     return templates.TemplateResponse("partial_job_progress.html", {"request": request, "job": job})
 
+@router.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @router.get("/api/system-info")
 def get_system_info():
-    info = SystemInfo().get_system_info()
+    info = systeminfo.SystemInfo().get_system_info()
     return info
 
 @router.get("/api/jobs")
-def api_get_jobs():
-    return JSONResponse(content=list(job_tracker.jobs.values()))
+def api_get_jobs(request: Request):
+    etag, body = job_tracker.encoded_jobs()
+    return json_response(request, body, etag)
 
 @router.get("/api/drives")
-def api_get_drives():
-    return JSONResponse(content=drive_manager.get_all_drives())
+def api_get_drives(request: Request):
+    return json_response(request, dumps(drive_manager.get_all_drives()))
+
+@router.post("/api/drives/invalidate")
+def api_invalidate_drive(payload: dict = Body(...)):
+    drive_manager.invalidate(payload.get("drive_path"))
+    return {"detail": "✅ Drive info refreshed"}
+
+@router.get("/api/io")
+def api_get_io():
+    return JSONResponse(content=io_budget.snapshot())
+
+@router.get("/api/drives/profiles")
+def api_get_drive_profiles():
+    return JSONResponse(content=drive_manager.profiler.all())
+
+@router.post("/api/drives/profile")
+def profile_drive(payload: dict = Body(...)):
+    drive = payload.get("drive")
+    if not drive:
+        return JSONResponse(content={"error": "Missing drive path"}, status_code=400)
+    try:
+        seconds = float(payload.get("seconds", 10))
+    except (TypeError, ValueError):
+        seconds = 0
+    # The request thread reads the drive for this long
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        return JSONResponse(content={"error": f"seconds must be between 1 and {PROFILE_MAX_SECONDS}"}, status_code=400)
+    try:
+        profile = drive_manager.profile_drive(drive, seconds=seconds)
+    except (OSError, ValueError) as e:
+        return JSONResponse(content={"error": f"Could not profile {drive}: {e}"}, status_code=409)
+    return {"detail": f"✅ Profiled {drive}", "profile": asdict(profile)}
 
 @router.post("/api/drives/eject")
 def eject_drive(request: Request, payload: dict = Body(...)):
@@ -44,11 +107,14 @@ def eject_drive(request: Request, payload: dict = Body(...)):
         return JSONResponse(content={"error": "Missing drive path"}, status_code=400)
 
     try:
-        # Attempt to eject the drive
+        # A rip still reading the disc is cancelled first, so its reader lets go of the drive
+        job_id = drive_manager.get_job_for_drive(drive)
+        if job_id:
+            job_tracker.cancel_job(job_id, "Disc ejected", wait=KILL_GRACE + 1)
+
         subprocess.run(["eject", drive], check=True)
 
         # Free the drive if it had a job assigned
-        job_id = drive_manager.get_job_for_drive(drive)
         if job_id:
             drive_manager.free_drive_by_job(job_id)
 
@@ -56,6 +122,72 @@ def eject_drive(request: Request, payload: dict = Body(...)):
     except subprocess.CalledProcessError as e:
         return JSONResponse(content={"error": f"Failed to eject {drive}: {e}"}, status_code=500)
 
+@router.get("/api/discs/index")
+def api_get_disc_index():
+    return JSONResponse(content=disc_index.entries())
+
+@router.delete("/api/discs/index/{key:path}")
+def forget_disc(key: str):
+    """Forgets an archived disc so the next insertion rips it again."""
+    if not disc_index.forget(key):
+        raise HTTPException(status_code=404, detail="Disc not in index")
+    return {"detail": f"✅ Forgot {key}"}
+
+@router.get("/api/catalog")
+def api_search_catalog(q: str = "", category: Optional[str] = None, disc_type: Optional[str] = None,
+                       limit: int = 50, cursor: Optional[int] = None):
+    """Search over every output file, newest first; pass next_cursor back for the following page."""
+    return JSONResponse(content=catalog.store.search(q, category, disc_type, limit, cursor))
+
+@router.get("/api/catalog/stats")
+def api_catalog_stats():
+    return JSONResponse(content={"categories": catalog.store.stats(), "last_scan": catalog.last_scan})
+
+@router.post("/api/catalog/rescan")
+def api_catalog_rescan():
+    catalog.rescan()
+    return {"detail": "✅ Rescan queued"}
+
+def _batch_stats(session) -> dict:
+    return {**session.stats(), "eta_seconds": job_tracker.batch_eta(session.job_ids)}
+
+@router.get("/api/batches")
+def api_get_batches():
+    return JSONResponse(content=[_batch_stats(s) for s in batch_manager.sessions.values()])
+
+@router.post("/api/batches")
+def create_batch(payload: dict = Body(default={})):
+    drives = payload.get("drives") or None
+    drive_type = payload.get("drive_type")
+    if not drives and drive_type:
+        # A stack of one kind of disc goes through the best idle drive that can read it
+        if str(drive_type).lower() not in ("cd", "dvd", "bd"):
+            return JSONResponse(content={"error": "drive_type must be cd, dvd or bd"}, status_code=400)
+        drive = drive_manager.find_available_drive(drive_type)
+        if not drive:
+            return JSONResponse(content={"error": f"No idle {drive_type.upper()} drive"}, status_code=409)
+        drives = [drive]
+    session = batch_manager.create(
+        name=payload.get("name", "batch"),
+        drives=drives and [os.path.realpath(d) for d in drives],
+        auto_eject=bool(payload.get("auto_eject", True)),
+    )
+    return session.stats()
+
+@router.get("/api/batches/{batch_id}")
+def get_batch(batch_id: str):
+    session = batch_manager.get(batch_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_stats(session)
+
+@router.post("/api/batches/{batch_id}/close")
+def close_batch(batch_id: str):
+    session = batch_manager.close(batch_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return session.stats()
+
 @router.get("/settings")
 def get_settings(request: Request):
     config = get_config()
@@ -80,29 +212,51 @@ def update_setting(
 def create_job_from_api(payload: dict = Body(...)):
     drive = payload.get("drive_path")
     disc_type = payload.get("disc_type")
+    priority = payload.get("priority", "normal")
 
     if not drive or not disc_type:
         return JSONResponse(content={"error": "Missing drive or disc_type"}, status_code=400)
 
     try:
-        job_id = job_tracker.start_job(drive, disc_type)
+        job_id = job_tracker.start_job(drive, disc_type, priority)
         return {"job_id": job_id}
     except Exception as e:
         logging.warning(f"❌ Could not start job for {drive}: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, payload: dict = Body(default={})):
+    if not job_tracker.cancel_job(job_id, payload.get("reason") or "Cancelled by user"):
+        raise HTTPException(status_code=409, detail="Job is not running")
+    return {"detail": "🛑 Cancelling job"}
+
+@router.post("/jobs/{job_id}/pause")
+def pause_job(job_id: str):
+    if not job_tracker.pause_job(job_id):
+        raise HTTPException(status_code=409, detail="Job is not running")
+    return {"detail": "⏸️ Job paused"}
+
+@router.post("/jobs/{job_id}/resume")
+def resume_job(job_id: str):
+    if not job_tracker.resume_job(job_id):
+        raise HTTPException(status_code=409, detail="Job is not running")
+    return {"detail": "▶️ Job resumed"}
+
 @router.patch("/jobs/{job_id}")
 def patch_job(job_id: str, payload: dict = Body(...)):
-    job = job_tracker.jobs.get(job_id)
-    if not job:
+    if not job_tracker.update_job(job_id, payload):
         raise HTTPException(status_code=404, detail="Job not found")
-
-    with job_tracker.lock:
-        for key, value in payload.items():
-            if key == "log":
-                if "stdout_log" not in job:
-                    job["stdout_log"] = deque(maxlen=15)
-                job["stdout_log"].append(str(value))
-            else:
-                job[key] = value
     return {"detail": "✅ Job updated"}
+
+@router.post("/api/jobs/batch")
+def patch_jobs(updates: list = Body(..., embed=True)):
+    """Several PATCH /jobs/{id} payloads in one request, applied in order."""
+    for i, update in enumerate(updates):
+        if not isinstance(update, dict) or not isinstance(update.get("job_id"), str) \
+                or not isinstance(update.get("payload") or {}, dict):
+            raise HTTPException(status_code=422, detail=f"Update {i} needs a job_id string and a payload object")
+    missing = []
+    for update in updates:
+        if not job_tracker.update_job(update["job_id"], update.get("payload") or {}):
+            missing.append(update["job_id"])
+    return {"applied": len(updates) - len(missing), "missing": missing}
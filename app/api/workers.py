@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.core.storage.integrity import ALGORITHM, new_hasher
+from app.core.workers import worker_registry
+
+workers_router = APIRouter()
+
+NEXT_POLL = 0.25  # how often a waiting /next request looks for an assignment
+
+def _task_or_404(task_id: str):
+    task = worker_registry.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+@workers_router.get("/api/workers")
+def list_workers():
+    return JSONResponse(content=worker_registry.list_workers())
+
+@workers_router.post("/api/workers/register")
+def register_worker(payload: dict = Body(...)):
+    worker_id = worker_registry.register(
+        name=payload.get("name", "worker"),
+        capabilities=payload.get("capabilities", ["transcode", "compress"]),
+        slots=int(payload.get("slots", 1)),
+    )
+    return {"worker_id": worker_id}
+
+@workers_router.post("/api/workers/{worker_id}/heartbeat")
+def worker_heartbeat(worker_id: str, payload: dict = Body(default={})):
+    if not worker_registry.heartbeat(worker_id, payload.get("load", 0.0)):
+        raise HTTPException(status_code=404, detail="Unknown worker; register again")
+    return {"detail": "ok"}
+
+@workers_router.get("/api/workers/{worker_id}/next")
+async def worker_next_task(worker_id: str, timeout: float = 25):
+    # Long-polls on the event loop: each check is non-blocking, so idle workers hold no threadpool thread
+    deadline = time.monotonic() + max(0.0, min(timeout, 60))
+    while True:
+        task = worker_registry.next_task(worker_id, timeout=0)
+        if task is not None:
+            return task.payload()
+        if worker_id not in worker_registry.workers or time.monotonic() >= deadline:
+            return Response(status_code=204)
+        await asyncio.sleep(NEXT_POLL)
+
+@workers_router.get("/api/workers/tasks/{task_id}/input")
+def worker_task_input(task_id: str):
+    task = _task_or_404(task_id)
+    return FileResponse(task.input_path, filename=os.path.basename(task.input_path))
+
+@workers_router.put("/api/workers/tasks/{task_id}/output")
+async def worker_task_output(task_id: str, request: Request, worker_id: str = ""):
+    task = _task_or_404(task_id)
+    if not worker_registry.owns(task_id, worker_id):
+        raise HTTPException(status_code=409, detail="Task is no longer assigned to this worker")
+    part_path = f"{task.output_path}.part"
+    hasher = new_hasher()
+    size = 0
+    with open(part_path, "wb") as f:
+        async for chunk in request.stream():
+            hasher.update(chunk)
+            size += len(chunk)
+            await run_in_threadpool(f.write, chunk)
+    if not worker_registry.owns(task_id, worker_id):
+        # Reassigned (or given up on) while uploading: the output belongs to someone else now
+        os.remove(part_path)
+        raise HTTPException(status_code=409, detail="Task is no longer assigned to this worker")
+    os.replace(part_path, task.output_path)
+    task.result.update({"uploaded": hasher.hexdigest(), "uploaded_bytes": size})
+    return {"detail": "✅ Output stored", "digest": hasher.hexdigest(), "algorithm": ALGORITHM}
+
+@workers_router.post("/api/workers/tasks/{task_id}/progress")
+def worker_task_progress(task_id: str, payload: dict = Body(...)):
+    _task_or_404(task_id)
+    worker_registry.report_progress(task_id, payload.get("worker_id"), payload.get("progress", 0))
+    return {"detail": "ok"}
+
+@workers_router.post("/api/workers/tasks/{task_id}/complete")
+def worker_task_complete(task_id: str, payload: dict = Body(...)):
+    task = _task_or_404(task_id)
+    if not worker_registry.owns(task_id, payload.get("worker_id")):
+        # A worker that timed out finishing late; the task was retried or failed meanwhile
+        raise HTTPException(status_code=409, detail="Task is no longer assigned to this worker")
+    ok = bool(payload.get("ok"))
+    error = payload.get("error")
+    result = dict(task.result, **payload.get("result", {}))
+    # The worker hashes what it sent; it must match what we stored
+    if ok and payload.get("digest") and payload["digest"] != task.result.get("uploaded"):
+        ok, error = False, "Upload checksum mismatch"
+    if not worker_registry.complete(task_id, payload.get("worker_id"), ok, error=error, result=result):
+        raise HTTPException(status_code=409, detail="Task is no longer assigned to this worker")
+    return {"detail": "ok"}
@@ -0,0 +1,201 @@
+"""
+Shared client for talking to the local API from ripper threads, the disc detector
+and remote workers. One keep-alive session per process (optionally over a Unix
+domain socket), retries with backoff for failures that never reached a handler,
+and job updates coalesced into batches.
+"""
+import atexit
+import logging
+import socket
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.util.retry import Retry
+
+from app.core.metrics import JOB_UPDATE_LATENCY
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Payload keys the server appends rather than replaces; updates carrying the same one can't be merged
+APPEND_KEYS = ("log", "timeline_event")
+
+
+class _UnixConnection(HTTPConnection):
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if isinstance(self.timeout, (int, float)) else None)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class _UnixConnectionPool(HTTPConnectionPool):
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        return _UnixConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Sends every request of the session to one Unix socket, whatever the URL's host."""
+
+    def __init__(self, socket_path: str, pool_maxsize: int = 10, **kwargs):
+        self.socket_path = socket_path
+        self._pool_maxsize = pool_maxsize
+        self._uds_pool: Optional[_UnixConnectionPool] = None
+        self._uds_lock = threading.Lock()
+        super().__init__(pool_maxsize=pool_maxsize, **kwargs)
+
+    def _pool(self) -> _UnixConnectionPool:
+        with self._uds_lock:
+            if self._uds_pool is None:
+                self._uds_pool = _UnixConnectionPool(self.socket_path, maxsize=self._pool_maxsize, block=False)
+            return self._uds_pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._pool()
+
+    def get_connection(self, url, proxies=None):
+        return self._pool()
+
+    def request_url(self, request, proxies):
+        return request.path_url
+
+    def close(self):
+        super().close()
+        if self._uds_pool is not None:
+            self._uds_pool.close()
+
+
+class ApiClient:
+    def __init__(
+        self,
+        base_url: str,
+        auth=None,
+        unix_socket: Optional[str] = None,
+        retries: int = 3,
+        backoff: float = 0.2,
+        timeout: float = 5,
+        batch_interval: float = 0.1,
+        max_batch: int = 200,
+        pool_size: int = 16,
+    ):
+        self.configured_url = base_url
+        self.base_url = base_url.rstrip("/")
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        # Only retry what the server can't have applied: connection failures and 502/503/504
+        retry = Retry(
+            total=retries, connect=retries, read=0, status=retries, status_forcelist=(502, 503, 504),
+            allowed_methods=None, backoff_factor=backoff, raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.verify = False
+        if unix_socket:
+            adapter = UnixSocketAdapter(unix_socket, pool_maxsize=pool_size, max_retries=retry)
+            self.base_url = "http://localhost"
+        else:
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue: List[Tuple[str, Dict]] = []
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()  # one batch in flight at a time keeps updates in order
+        self._flusher: Optional[threading.Thread] = None
+        atexit.register(self._flush_quietly)
+
+    @classmethod
+    def from_config(cls, config, base_url: str, auth=None, local: bool = True) -> "ApiClient":
+        unix_socket = config.get("Server", "unixsocket", fallback="").strip() if local else ""
+        return cls(
+            base_url,
+            auth=auth,
+            unix_socket=unix_socket or None,
+            retries=config.getint("Server", "clientretries", fallback=3),
+            batch_interval=config.getfloat("Server", "updatebatchms", fallback=100) / 1000,
+        )
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
+    def update(self, job_id: str, payload: Dict, wait: bool = True):
+        """
+        Queues a job update. With wait=False it goes out with the next batch; with wait=True
+        everything queued so far is sent now and an error for this job is raised.
+        """
+        with self._cond:
+            idle = not self._queue  # the flusher waits without a timeout while the queue is empty
+            last = self._queue[-1] if self._queue else None
+            if last and last[0] == job_id and not set(APPEND_KEYS) & last[1].keys() & payload.keys():
+                self._queue[-1] = (job_id, {**last[1], **payload})
+            else:
+                self._queue.append((job_id, dict(payload)))
+            if not wait:
+                self._start_flusher()
+                if idle or len(self._queue) >= self.max_batch:
+                    self._cond.notify()
+                return
+        missing = self.flush()
+        if job_id in missing:
+            raise RuntimeError(f"Failed to update job {job_id}: {missing[job_id]}")
+
+    def flush(self) -> Dict[str, str]:
+        """Sends the queued updates; returns {job_id: error} for those the server didn't apply."""
+        with self._send_lock:
+            with self._cond:
+                batch, self._queue = self._queue, []
+            if not batch:
+                return {}
+            with JOB_UPDATE_LATENCY.time():
+                if len(batch) == 1:
+                    job_id, payload = batch[0]
+                    r = self.request("PATCH", f"/jobs/{job_id}", json=payload)
+                else:
+                    r = self.request("POST", "/api/jobs/batch", json={"updates": [{"job_id": j, "payload": p} for j, p in batch]})
+            if not r.ok:
+                return {job_id: f"{r.status_code} {r.text}" for job_id, _ in batch}
+            if len(batch) == 1:
+                return {}
+            return {job_id: "404 Job not found" for job_id in r.json().get("missing", [])}
+
+    def _start_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run_flusher, name="api-flush", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # Give the batch a moment to fill unless it is already full
+                if len(self._queue) < self.max_batch:
+                    self._cond.wait(self.batch_interval)
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            failed = self.flush()
+            if failed:
+                logging.debug(f"[ApiClient] {len(failed)} queued job updates not applied: {failed}")
+        except requests.RequestException as e:
+            logging.warning(f"[ApiClient] Dropped queued job updates: {e}")
+
+    def close(self):
+        self._flush_quietly()
+        self.session.close()
@@ -0,0 +1,49 @@
+"""
+Lazy platform dispatch for packages with linux/windows/macos backends (PEP 562).
+
+A package's __init__ lists what it exports; the backend module is imported the
+first time one of those names is used, so importing the package does no work
+and a platform that never uses a backend never imports it.
+"""
+import importlib
+import platform
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple, Union
+
+BACKENDS = {"Linux": "linux", "Windows": "windows", "Darwin": "macos"}
+
+
+@lru_cache(maxsize=None)
+def backend_name() -> str:
+    system = platform.system()
+    try:
+        return BACKENDS[system]
+    except KeyError:
+        raise ImportError(f"TKDiscRipper has no backend for {system}") from None
+
+
+def lazy_platform(package: str, *names: str, **aliases: Union[str, Dict[str, str]]) -> Tuple[Callable, Callable]:
+    """
+    Returns (__getattr__, __dir__) for `package`. Each name resolves to the same name in
+    the backend module; an alias maps an export to a different attribute, either one
+    name for every backend or a {backend: attribute} dict.
+    """
+    exports: Dict[str, Union[str, Dict[str, str]]] = {name: name for name in names}
+    exports.update(aliases)
+
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        backend = backend_name()
+        module = importlib.import_module(f"{package}.{backend}")
+        target = exports[name]
+        value = getattr(module, target if isinstance(target, str) else target[backend])
+        # Cache on the package so later lookups don't come back through here
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(exports) | set(vars(sys.modules[package])))
+
+    return __getattr__, __dir__
@@ -0,0 +1,2 @@
+from app.core.batch.manager import batch_manager, BatchSession
+from app.core.batch.changer import MediaChanger, ManualChanger, CommandChanger, SimulatedChanger, register_changer
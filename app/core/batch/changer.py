@@ -0,0 +1,117 @@
+import logging
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Type
+
+
+class MediaChanger:
+    """
+    Moves discs in and out of drives. `on_insert(drive, disc_type)` is set by the
+    batch manager and must be called when a changer loads a disc by itself; changers
+    that rely on udev insert events (a person or a real loader) never call it.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.on_insert: Optional[Callable[[str, str], None]] = None
+
+    @classmethod
+    def from_config(cls, config) -> "MediaChanger":
+        return cls()
+
+    def eject(self, drive_path: str):
+        raise NotImplementedError
+
+    def load_next(self, drive_path: str) -> bool:
+        """Puts the next disc into `drive_path`. Returns False when there is nothing to load."""
+        return False
+
+
+class ManualChanger(MediaChanger):
+    """Opens the tray; an operator swaps the disc and udev picks up the insertion."""
+    name = "manual"
+
+    def eject(self, drive_path: str):
+        subprocess.run(["eject", drive_path], check=False)
+
+
+class CommandChanger(ManualChanger):
+    """Auto-loader driven by an external command, e.g. `mtx -f /dev/sg3 load {slot} {drive}`."""
+    name = "command"
+
+    def __init__(self, load_command: str):
+        super().__init__()
+        self.load_command = load_command
+        self.next_slot = 1
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "CommandChanger":
+        return cls(config.get("Batch", "loadcommand", fallback=""))
+
+    def load_next(self, drive_path: str) -> bool:
+        if not self.load_command:
+            return False
+        with self.lock:
+            slot = self.next_slot
+            self.next_slot += 1
+        cmd = self.load_command.format(slot=slot, drive=drive_path)
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        if result.returncode != 0:
+            logging.info(f"[Changer] Load of slot {slot} into {drive_path} stopped: {result.stderr.strip()}")
+            return False
+        return True
+
+
+class SimulatedChanger(MediaChanger):
+    """In-memory stack of discs for tests and benchmarks; loading a disc fires on_insert directly."""
+    name = "simulated"
+
+    def __init__(self, discs: Optional[List[str]] = None):
+        super().__init__()
+        self.stack: Deque[str] = deque(discs or [])
+        self.loaded: Dict[str, Optional[str]] = {}
+        self.ejected: List[str] = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "SimulatedChanger":
+        discs = config.get("Batch", "simulateddiscs", fallback="")
+        return cls([d.strip() for d in discs.split(",") if d.strip()])
+
+    def eject(self, drive_path: str):
+        with self.lock:
+            self.loaded[drive_path] = None
+            self.ejected.append(drive_path)
+
+    def load_next(self, drive_path: str) -> bool:
+        with self.lock:
+            if not self.stack or self.loaded.get(drive_path):
+                return False
+            disc_type = self.stack.popleft()
+            self.loaded[drive_path] = disc_type
+        if self.on_insert:
+            self.on_insert(drive_path, disc_type)
+        return True
+
+
+CHANGERS: Dict[str, Type[MediaChanger]] = {}
+
+
+def register_changer(cls: Type[MediaChanger]) -> Type[MediaChanger]:
+    CHANGERS[cls.name] = cls
+    return cls
+
+
+for _cls in (ManualChanger, CommandChanger, SimulatedChanger):
+    register_changer(_cls)
+
+
+def build_changer(config) -> MediaChanger:
+    name = config.get("Batch", "changer", fallback="manual").strip().lower()
+    cls = CHANGERS.get(name)
+    if cls is None:
+        logging.warning(f"[Changer] Unknown changer '{name}', using manual")
+        cls = ManualChanger
+    return cls.from_config(config)
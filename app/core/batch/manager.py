@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from app.core.batch.changer import MediaChanger, build_changer
+from app.core.config import get_config
+
+
+@dataclass
+class BatchSession:
+    batch_id: str
+    name: str
+    drives: Optional[List[str]]  # None = every drive
+    auto_eject: bool = True
+    created_at: float = field(default_factory=time.time)
+    closed_at: Optional[float] = None
+    job_ids: List[str] = field(default_factory=list)
+    discs_read: int = 0
+    read_failures: int = 0
+    drive_busy: Dict[str, float] = field(default_factory=dict)  # drive -> seconds spent reading
+    drive_discs: Dict[str, int] = field(default_factory=dict)
+
+    def covers(self, drive_path: str) -> bool:
+        return self.closed_at is None and (self.drives is None or drive_path in self.drives)
+
+    def stats(self) -> dict:
+        elapsed = max(1e-6, (self.closed_at or time.time()) - self.created_at)
+        drives = sorted(set(self.drive_busy) | set(self.drives or []))
+        return {
+            "batch_id": self.batch_id,
+            "name": self.name,
+            "drives": self.drives,
+            "auto_eject": self.auto_eject,
+            "created_at": self.created_at,
+            "closed_at": self.closed_at,
+            "elapsed": elapsed,
+            "jobs": list(self.job_ids),
+            "discs_read": self.discs_read,
+            "read_failures": self.read_failures,
+            "discs_per_hour": self.discs_read * 3600 / elapsed,
+            "drive_utilization": {
+                d: {
+                    "discs": self.drive_discs.get(d, 0),
+                    "busy_seconds": self.drive_busy.get(d, 0.0),
+                    "utilization": min(1.0, self.drive_busy.get(d, 0.0) / elapsed),
+                }
+                for d in drives
+            },
+        }
+
+
+class BatchManager:
+    """
+    Groups jobs fed through one or more drives. When a job's read finishes the disc is
+    ejected (and the changer asked for the next one) so the drive is busy again while
+    the previous disc is still transcoding/compressing.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, BatchSession] = {}
+        self._changer: Optional[MediaChanger] = None
+        self.start_job: Optional[Callable[[str, str], str]] = None  # set by JobTracker
+
+    @property
+    def changer(self) -> MediaChanger:
+        if self._changer is None:
+            self.set_changer(build_changer(get_config()))
+        return self._changer
+
+    def set_changer(self, changer: MediaChanger):
+        changer.on_insert = self._on_insert
+        self._changer = changer
+
+    def _on_insert(self, drive_path: str, disc_type: str):
+        if self.start_job:
+            self.start_job(drive_path, disc_type)
+
+    def create(self, name: str, drives: Optional[List[str]] = None, auto_eject: bool = True) -> BatchSession:
+        session = BatchSession(str(uuid.uuid4()), name or "batch", drives or None, auto_eject)
+        with self.lock:
+            self.sessions[session.batch_id] = session
+        for drive in drives or []:
+            self._load_next(drive)
+        return session
+
+    def get(self, batch_id: str) -> Optional[BatchSession]:
+        return self.sessions.get(batch_id)
+
+    def close(self, batch_id: str) -> Optional[BatchSession]:
+        with self.lock:
+            session = self.sessions.get(batch_id)
+            if session and session.closed_at is None:
+                session.closed_at = time.time()
+        return session
+
+    def session_for_drive(self, drive_path: str) -> Optional[BatchSession]:
+        with self.lock:
+            return next((s for s in self.sessions.values() if s.covers(drive_path)), None)
+
+    def attach(self, job_id: str, drive_path: str) -> Optional[str]:
+        session = self.session_for_drive(drive_path)
+        if session:
+            with self.lock:
+                session.job_ids.append(job_id)
+            return session.batch_id
+        return None
+
+    def on_read_complete(self, job_id: str, drive_path: str, read_seconds: float, ok: bool):
+        session = next((s for s in self.sessions.values() if job_id in s.job_ids), None)
+        if not session:
+            return
+        with self.lock:
+            if ok:
+                session.discs_read += 1
+            else:
+                session.read_failures += 1
+            session.drive_busy[drive_path] = session.drive_busy.get(drive_path, 0.0) + read_seconds
+            session.drive_discs[drive_path] = session.drive_discs.get(drive_path, 0) + 1
+
+        # A failed read keeps its disc in the drive for inspection
+        if ok and session.auto_eject and session.closed_at is None:
+            threading.Thread(target=self._swap, args=(drive_path,), daemon=True).start()
+
+    def _swap(self, drive_path: str):
+        try:
+            self.changer.eject(drive_path)
+        except Exception as e:
+            logging.warning(f"[Batch] Eject of {drive_path} failed: {e}")
+            return
+        self._load_next(drive_path)
+
+    def _load_next(self, drive_path: str):
+        try:
+            self.changer.load_next(drive_path)
+        except Exception as e:
+            logging.warning(f"[Batch] Loading next disc into {drive_path} failed: {e}")
+
+
+# Singleton
+batch_manager = BatchManager()
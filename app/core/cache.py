@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+
+class TtlCache:
+    """
+    Small persistent key/value cache backed by one JSON file. Entries expire after
+    `ttl` seconds (per-entry override allowed) and are evicted on read and on save.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._entries: Optional[dict] = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        now = time.time()
+        entries = {k: v for k, v in self._load().items() if v["expires"] > now}
+        self._entries = entries
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None:
+                return default
+            if entry["expires"] <= time.time():
+                del entries[key]
+                return default
+            return entry["value"]
+
+    def __contains__(self, key: str) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self.lock:
+            self._load()[key] = {"value": value, "expires": time.time() + (ttl if ttl is not None else self.ttl)}
+            self._save()
+
+    def delete(self, key: str):
+        with self.lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def items(self) -> dict:
+        with self.lock:
+            now = time.time()
+            return {k: v["value"] for k, v in self._load().items() if v["expires"] > now}
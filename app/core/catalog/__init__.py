@@ -0,0 +1,2 @@
+from app.core.catalog.store import CatalogStore
+from app.core.catalog.service import Catalog, catalog
@@ -0,0 +1,72 @@
+"""
+Minimal inotify binding (ctypes, no extra dependency): watches directories and yields
+(path, mask) events. Only local changes are reported; NFS/SMB mounts written by other
+hosts still need the periodic rescan.
+"""
+import ctypes
+import errno
+import os
+import struct
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+@lru_cache(maxsize=1)
+def _libc() -> ctypes.CDLL:
+    return ctypes.CDLL(None, use_errno=True)
+
+
+class Inotify:
+    def __init__(self):
+        fd = _libc().inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.fd = fd
+        self.paths: Dict[int, str] = {}  # watch descriptor -> directory
+
+    def watch(self, path: str) -> bool:
+        """Adds a watch on one directory; False when the kernel's watch limit is reached."""
+        wd = _libc().inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                return False
+            raise OSError(err, os.strerror(err), path)
+        self.paths[wd] = path
+        return True
+
+    def events(self) -> Iterator[Tuple[Optional[str], int]]:
+        """Blocks for events; yields (full path, mask). An overflow yields (None, IN_Q_OVERFLOW)."""
+        while True:
+            buffer = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _cookie, length = EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    yield None, mask
+                    continue
+                directory = self.paths.get(wd)
+                if mask & IN_IGNORED:
+                    self.paths.pop(wd, None)
+                    continue
+                if directory is not None:
+                    yield (os.path.join(directory, os.fsdecode(name)) if name else directory), mask
+
+    def close(self):
+        os.close(self.fd)
@@ -0,0 +1,334 @@
+"""
+Keeps the output catalog current: finished jobs index their output right away, an
+inotify watcher picks up files changed by hand, and a periodic rescan (which only lists
+directories whose mtime moved) catches what inotify can't see, like other NFS clients.
+"""
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.catalog.inotify import IN_CREATE, IN_DELETE, IN_ISDIR, IN_MOVED_FROM, IN_MOVED_TO, Inotify
+from app.core.catalog.store import CatalogStore
+from app.core.config import get_config, subscribe
+from app.core.media.mkv import MkvError, probe_mkv
+
+CATEGORIES = {"CD": "cd", "DVD": "dvd", "BLURAY": "bluray", "OTHER": "iso"}  # config section -> category
+MANIFEST_ALGORITHMS = ("blake3", "xxh3_128", "blake2b")
+AUDIO_EXTENSIONS = {".flac": "flac", ".opus": "opus", ".ogg": "vorbis", ".mp3": "mp3", ".wav": "pcm", ".m4a": "aac"}
+SETTLE_SECONDS = 60  # a directory with files younger than this is listed again on the next rescan
+DEBOUNCE = 0.5
+
+
+class CatalogSettings(NamedTuple):
+    enabled: bool
+    path: str
+    watch: bool
+    rescan_seconds: float
+    roots: Tuple[Tuple[str, str], ...]  # (directory, category), deepest first
+
+
+def flac_duration(path: str) -> Optional[float]:
+    """From the STREAMINFO block that opens every FLAC file: total samples / sample rate."""
+    with open(path, "rb") as f:
+        head = f.read(42)
+    if len(head) < 42 or head[:4] != b"fLaC":
+        return None
+    packed = struct.unpack(">Q", head[18:26])[0]
+    rate = packed >> 44
+    samples = packed & 0xFFFFFFFFF
+    return samples / rate if rate else None
+
+
+def read_manifests(directory: str, names: List[str]) -> Dict[str, Tuple[str, str]]:
+    """name -> (algorithm, digest) from the `<digest>  <name>` sidecars the rippers write."""
+    checksums = {}
+    for name in names:
+        algorithm = name.rsplit(".", 1)[-1]
+        if algorithm not in MANIFEST_ALGORITHMS:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                for line in f:
+                    digest, sep, target = line.rstrip("\n").partition("  ")
+                    if sep:
+                        checksums[target] = (algorithm, digest)
+        except OSError:
+            continue
+    return checksums
+
+
+def is_catalogued(name: str) -> bool:
+    return not (name.startswith(".") or name.endswith(".tmp") or name.rsplit(".", 1)[-1] in MANIFEST_ALGORITHMS)
+
+
+def describe_file(path: str, st: os.stat_result, root: str, category: str) -> dict:
+    """A catalog row from the file's stat and, for MKV/FLAC, its header."""
+    directory, name = os.path.split(path)
+    relative = os.path.relpath(path, root).split(os.sep)
+    row = {
+        "path": path, "dir": directory, "category": category, "name": name,
+        "label": relative[0] if len(relative) > 1 else name.split(".")[0],
+        "size": st.st_size, "mtime": st.st_mtime,
+    }
+    extension = os.path.splitext(name)[1].lower()
+    try:
+        if extension == ".mkv":
+            info = probe_mkv(path)
+            video = info.video
+            audio = info.of_type("audio")
+            row.update(
+                duration=info.duration or None,
+                video_codec=video.codec if video else None,
+                resolution=f"{video.width}x{video.height}" if video and video.width else None,
+                audio_codecs=",".join(dict.fromkeys(t.codec.removeprefix("a_") for t in audio)) or None,
+                languages=",".join(dict.fromkeys(t.language for t in audio + info.of_type("subtitle"))) or None,
+            )
+        elif extension in AUDIO_EXTENSIONS:
+            row.update(audio_codecs=AUDIO_EXTENSIONS[extension], duration=flac_duration(path) if extension == ".flac" else None)
+    except (OSError, MkvError, EOFError) as e:
+        logging.debug(f"[Catalog] Could not probe {path}: {e}")
+    return row
+
+
+class Catalog:
+    def __init__(self):
+        self._settings: Optional[CatalogSettings] = None
+        self._store: Optional[CatalogStore] = None
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._rescan_changed = threading.Event()
+        self.last_scan: Optional[dict] = None
+        subscribe(self.reload)
+
+    @property
+    def settings(self) -> CatalogSettings:
+        if self._settings is None:
+            self.reload()
+        return self._settings
+
+    def reload(self, config=None):
+        config = config or get_config()
+        roots = []
+        for section, category in CATEGORIES.items():
+            directory = config.get(section, "outputdirectory", fallback="")
+            if directory:
+                roots.append((os.path.realpath(os.path.expanduser(directory)), category))
+        previous = self._settings
+        self._settings = CatalogSettings(
+            config.get("Catalog", "enabled", fallback="true").lower() == "true",
+            os.path.expanduser(config.get("Catalog", "path", fallback="~/.cache/TKDiscRipper/catalog.db")),
+            config.get("Catalog", "watch", fallback="true").lower() == "true",
+            config.getfloat("Catalog", "rescanminutes", fallback=60) * 60,
+            tuple(sorted(roots, key=lambda r: -len(r[0]))),
+        )
+        if previous and previous.rescan_seconds != self._settings.rescan_seconds:
+            self._rescan_changed.set()
+
+    @property
+    def store(self) -> CatalogStore:
+        path = self.settings.path
+        if self._store is None or self._store.path != path:
+            self._store = CatalogStore(path)
+        return self._store
+
+    def root_of(self, path: str) -> Optional[Tuple[str, str]]:
+        for root, category in self.settings.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root, category
+        return None
+
+    # --- entry points ---
+
+    def start(self):
+        """Starts the indexer, the watcher and the periodic rescan (server startup)."""
+        settings = self.settings
+        with self._start_lock:
+            if self._started or not settings.enabled:
+                return
+            self._started = True
+        threading.Thread(target=self._worker, name="catalog", daemon=True).start()
+        self._queue.put(("full",))
+        if settings.watch:
+            threading.Thread(target=self._watch, name="catalog-watch", daemon=True).start()
+        # Started even when rescans are off, so setting an interval later takes effect
+        threading.Thread(target=self._rescan_loop, name="catalog-rescan", daemon=True).start()
+
+    def index_output(self, path: str, job: dict):
+        """Indexes a finished job's output file or folder and tags it with the job's label and disc type."""
+        if self._started:
+            self._queue.put(("job", os.path.realpath(path), job))
+
+    def rescan(self):
+        self._queue.put(("full",))
+
+    # --- indexer thread ---
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(DEBOUNCE)  # let a burst of events for one directory collapse
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception as e:
+                logging.warning(f"[Catalog] Indexing failed: {e}")
+
+    def _process(self, batch: List[tuple]):
+        if any(item[0] == "full" for item in batch):
+            self._scan_all()
+        dirs: Dict[str, bool] = {}  # directory -> recursive
+        for item in batch:
+            if item[0] == "dir":
+                dirs[item[1]] = dirs.get(item[1], False) or item[2]
+        for directory, recursive in dirs.items():
+            located = self.root_of(directory)
+            if located is None:
+                continue
+            if not os.path.isdir(directory):
+                self.store.remove_tree(directory)
+            elif recursive:
+                self._scan_tree(directory, *located, force=True)
+            else:
+                self._scan_dir(directory, *located)
+        for item in batch:
+            if item[0] == "job":
+                self._index_job(item[1], item[2])
+
+    def _index_job(self, path: str, job: dict):
+        located = self.root_of(path)
+        if located is None:
+            return
+        if os.path.isdir(path):
+            self._scan_tree(path, *located, force=True)
+        elif os.path.exists(path):
+            self._scan_dir(os.path.dirname(path), *located)
+        else:
+            return
+        self.store.assign_job(path, job, since=(job.get("start_time") or 0) - 1)
+
+    def _scan_all(self):
+        started = time.monotonic()
+        listed = 0
+        for root, category in self.settings.roots:
+            if os.path.isdir(root):
+                listed += self._scan_tree(root, root, category)
+        self.last_scan = {"at": time.time(), "seconds": round(time.monotonic() - started, 2), "dirs_listed": listed}
+        logging.info(f"[Catalog] Rescan listed {listed} changed directories in {self.last_scan['seconds']}s")
+
+    def _scan_tree(self, top: str, root: str, category: str, force: bool = False) -> int:
+        """Walks top, listing only directories whose mtime changed (all of them with force)."""
+        listed = 0
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime
+            except FileNotFoundError:
+                self.store.remove_tree(directory)
+                continue
+            if not force and self.store.dir_mtime(directory) == mtime:
+                stack.extend(self.store.subdirs(directory))
+                continue
+            stack.extend(self._scan_dir(directory, root, category))
+            listed += 1
+        return listed
+
+    def _scan_dir(self, directory: str, root: str, category: str) -> List[str]:
+        """Brings one directory's rows up to date; returns its subdirectories."""
+        try:
+            mtime = os.stat(directory).st_mtime
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            self.store.remove_tree(directory)
+            return []
+        names = [e.name for e in entries]
+        manifests = read_manifests(directory, names)
+        known = self.store.files_in(directory)
+        subdirs, rows, checksums = [], [], {}
+        settled = True
+        now = time.time()
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.is_file() or not is_catalogued(entry.name):
+                    continue
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            settled = settled and now - st.st_mtime > SETTLE_SECONDS
+            previous = known.pop(entry.path, None)
+            checksum = manifests.get(entry.name)
+            if previous is not None and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime:
+                if checksum and previous["checksum"] != checksum[1]:
+                    checksums[entry.path] = checksum
+                continue
+            row = describe_file(entry.path, st, root, category)
+            if checksum:
+                row["checksum_algorithm"], row["checksum"] = checksum
+            rows.append(row)
+
+        if rows:
+            self.store.upsert(rows)
+        if checksums:
+            self.store.set_checksums(checksums)
+        if known:
+            self.store.remove(known)
+        for gone in set(self.store.subdirs(directory)) - set(subdirs):
+            self.store.remove_tree(gone)
+        # Files still being written may grow without touching the directory's mtime
+        self.store.set_dir(directory, mtime if settled else 0.0)
+        return subdirs
+
+    # --- watcher and periodic rescan ---
+
+    def _watch(self):
+        try:
+            inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            logging.warning(f"[Catalog] inotify unavailable, relying on periodic rescans: {e}")
+            return
+        for root, _ in self.settings.roots:
+            self._watch_tree(inotify, root)
+        for path, mask in inotify.events():
+            if path is None:  # queue overflow: events were lost
+                self._queue.put(("full",))
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(inotify, path)
+                self._queue.put(("dir", path, True))
+            elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                self._queue.put(("dir", path, False))
+            else:
+                self._queue.put(("dir", os.path.dirname(path), False))
+
+    def _watch_tree(self, inotify: Inotify, top: str):
+        for directory, dirnames, _ in os.walk(top):
+            try:
+                if not inotify.watch(directory):
+                    logging.warning(f"[Catalog] inotify watch limit reached at {directory}; the rest is covered by rescans")
+                    return
+            except OSError:
+                dirnames.clear()
+
+    def _rescan_loop(self):
+        while True:
+            self._rescan_changed.clear()
+            interval = self.settings.rescan_seconds
+            # An interval of 0 disables rescans: wait until a reload sets another one
+            if self._rescan_changed.wait(interval if interval > 0 else None):
+                continue
+            self._queue.put(("full",))
+
+
+# Singleton
+catalog = Catalog()
@@ -0,0 +1,209 @@
+"""
+SQLite catalog of every file under the output directories, with an FTS5 index over
+names, labels and codecs. Rows are keyed by absolute path; directories are tracked with
+their mtime so a rescan only lists the ones that changed.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    dir TEXT NOT NULL,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    label TEXT,
+    disc_type TEXT,
+    job_id TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    duration REAL,
+    video_codec TEXT,
+    resolution TEXT,
+    audio_codecs TEXT,
+    languages TEXT,
+    checksum TEXT,
+    checksum_algorithm TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS files_category ON files(category, id);
+CREATE INDEX IF NOT EXISTS files_disc_type ON files(disc_type, id);
+
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    name, label, dir, codecs, disc_type,
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts(rowid, name, label, dir, codecs, disc_type)
+    VALUES (new.id, new.name, new.label, new.dir, coalesce(new.video_codec, '') || ' ' || coalesce(new.audio_codecs, '') || ' ' || coalesce(new.languages, ''), new.disc_type);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    DELETE FROM files_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE ON files BEGIN
+    DELETE FROM files_fts WHERE rowid = old.id;
+    INSERT INTO files_fts(rowid, name, label, dir, codecs, disc_type)
+    VALUES (new.id, new.name, new.label, new.dir, coalesce(new.video_codec, '') || ' ' || coalesce(new.audio_codecs, '') || ' ' || coalesce(new.languages, ''), new.disc_type);
+END;
+"""
+
+FIELDS = (
+    "path", "dir", "category", "name", "label", "disc_type", "job_id", "size", "mtime",
+    "duration", "video_codec", "resolution", "audio_codecs", "languages", "checksum", "checksum_algorithm",
+)
+# A rescan only knows what the file itself says; labels and job ids set at finalize are kept
+KEEP_IF_NULL = ("label", "disc_type", "job_id")
+
+UPSERT = (
+    f"INSERT INTO files ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)}) "
+    "ON CONFLICT(path) DO UPDATE SET "
+    + ", ".join(
+        f"{f} = coalesce(excluded.{f}, files.{f})" if f in KEEP_IF_NULL else f"{f} = excluded.{f}"
+        for f in FIELDS if f != "path"
+    )
+)
+
+MAX_PAGE = 500
+
+
+def match_query(text: str) -> Optional[str]:
+    """Free text -> FTS5 query: every word must match as a prefix; quotes keep user input out of the syntax."""
+    words = [w for w in "".join(c if c.isalnum() else " " for c in text).split() if w]
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+def _under(path: str) -> tuple[str, str]:
+    """Bounds of every path strictly below a directory ('0' sorts right after '/')."""
+    return path.rstrip("/") + "/", path.rstrip("/") + "0"
+
+
+class CatalogStore:
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self.lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def close(self):
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # --- writes (one transaction per call) ---
+
+    def upsert(self, rows: Iterable[Dict]):
+        with self.lock, self.db:
+            self.db.executemany(UPSERT, [tuple(row.get(f) for f in FIELDS) for row in rows])
+
+    def set_checksums(self, checksums: Dict[str, tuple[str, str]]):
+        """path -> (algorithm, digest), for files whose sidecar manifest appeared after them."""
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE files SET checksum = ?, checksum_algorithm = ? WHERE path = ? AND checksum IS NOT ?",
+                [(digest, algorithm, path, digest) for path, (algorithm, digest) in checksums.items()],
+            )
+
+    def remove(self, paths: Iterable[str]):
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+
+    def remove_tree(self, path: str):
+        low, high = _under(path)
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM files WHERE path = ? OR (path > ? AND path < ?)", (path, low, high))
+            self.db.execute("DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)", (path, low, high))
+
+    def set_dir(self, path: str, mtime: float):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO dirs (path, parent, mtime) VALUES (?, ?, ?) ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime",
+                (path, os.path.dirname(path), mtime),
+            )
+
+    def assign_job(self, path: str, job: Dict, since: float):
+        """Labels the files a job produced under path (modified since it started) with the job's identity."""
+        low, high = _under(path)
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE files SET label = ?, disc_type = ?, job_id = ? "
+                "WHERE (path = ? OR (path > ? AND path < ?)) AND mtime >= ?",
+                (job.get("disc_label"), job.get("disc_type"), job["job_id"], path, low, high, since),
+            )
+
+    # --- reads ---
+
+    def dir_mtime(self, path: str) -> Optional[float]:
+        with self.lock:
+            row = self.db.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+        return row["mtime"] if row else None
+
+    def subdirs(self, path: str) -> List[str]:
+        with self.lock:
+            return [r["path"] for r in self.db.execute("SELECT path FROM dirs WHERE parent = ? AND path != ?", (path, path))]
+
+    def files_in(self, path: str) -> Dict[str, sqlite3.Row]:
+        with self.lock:
+            rows = self.db.execute("SELECT path, size, mtime, checksum FROM files WHERE dir = ?", (path,)).fetchall()
+        return {r["path"]: r for r in rows}
+
+    def search(self, query: str = "", category: Optional[str] = None, disc_type: Optional[str] = None,
+               limit: int = 50, cursor: Optional[int] = None) -> Dict:
+        """
+        Newest first, keyset-paginated: pass the returned next_cursor to get the following page.
+        Cost is bounded by the page size, not the catalog size or page depth.
+        """
+        limit = max(1, min(limit, MAX_PAGE))
+        match = match_query(query)
+        # With a query, FTS5 walks its matches in rowid order itself; otherwise the primary key does
+        key = "files_fts.rowid" if match else "f.id"
+        sql = "SELECT f.* FROM files_fts JOIN files f ON f.id = files_fts.rowid" if match else "SELECT f.* FROM files f"
+        where, params = [], []
+        if match:
+            where.append("files_fts MATCH ?")
+            params.append(match)
+        if category:
+            where.append("f.category = ?")
+            params.append(category)
+        if disc_type:
+            where.append("f.disc_type = ?")
+            params.append(disc_type)
+        if cursor is not None:
+            where.append(f"{key} < ?")
+            params.append(cursor)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {key} DESC LIMIT ?"
+        with self.lock:
+            rows = self.db.execute(sql, (*params, limit + 1)).fetchall()
+        items = [dict(r) for r in rows[:limit]]
+        return {"items": items, "next_cursor": items[-1]["id"] if len(rows) > limit else None}
+
+    def stats(self) -> Dict:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT category, count(*) AS files, coalesce(sum(size), 0) AS bytes FROM files GROUP BY category"
+            ).fetchall()
+        return {r["category"]: {"files": r["files"], "bytes": r["bytes"]} for r in rows}
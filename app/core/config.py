@@ -1,34 +1,171 @@
 import configparser
+import logging
 import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
 import yaml
 
 DEFAULT_CONFIG_PATH = "config/TKDiscRipper.conf"
 DESC_PATH = "config/settings_desc.yaml"
 
+
+class ConfigSnapshot(configparser.ConfigParser):
+    """
+    A parsed config that can't be modified once loaded. Every reader shares the
+    same snapshot until the file changes; writes go through set_config().
+    """
+    _frozen = False
+
+    def freeze(self) -> "ConfigSnapshot":
+        self._frozen = True
+        return self
+
+    def _check_writable(self):
+        if self._frozen:
+            raise TypeError("Config snapshots are read-only; use set_config()")
+
+    def set(self, section, option, value=None):
+        self._check_writable()
+        super().set(section, option, value)
+
+    def add_section(self, section):
+        self._check_writable()
+        super().add_section(section)
+
+    def remove_section(self, section):
+        self._check_writable()
+        return super().remove_section(section)
+
+    def remove_option(self, section, option):
+        self._check_writable()
+        return super().remove_option(section, option)
+
+
+class ConfigService:
+    """
+    Parses the config file once and hands out the same immutable snapshot until the
+    file's stat signature changes (edited by hand) or set_config() rewrites it.
+    Subscribers are called with the new snapshot after every reload.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._signature = None
+        self._subscribers: list[Callable[[ConfigSnapshot], None]] = []
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Config file not found: {self.path}")
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self) -> ConfigSnapshot:
+        signature = self._stat_signature()
+        snapshot = self._snapshot
+        if snapshot is not None and signature == self._signature:
+            return snapshot
+        return self._reload(signature)
+
+    def _reload(self, signature) -> ConfigSnapshot:
+        with self.lock:
+            if self._snapshot is not None and signature == self._signature:
+                return self._snapshot
+            changed = self._snapshot is not None
+            snapshot = ConfigSnapshot()
+            snapshot.read(self.path)
+            self._snapshot = snapshot.freeze()
+            self._signature = signature
+            subscribers = list(self._subscribers) if changed else []
+
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.warning(f"[Config] Subscriber {callback!r} failed: {e}")
+        return snapshot
+
+    def update(self, mutate: Callable[[configparser.ConfigParser], bool]):
+        """Applies `mutate` to a fresh copy of the file and writes it atomically if it returns True."""
+        with self.lock:
+            config = configparser.ConfigParser()
+            config.read(self.path)
+            if not mutate(config):
+                return
+            self._write_atomic(config)
+        self.get()
+
+    def _write_atomic(self, config: configparser.ConfigParser):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tkdr-", suffix=".conf", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                config.write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]):
+        with self.lock:
+            self._subscribers.append(callback)
+        return callback
+
+
+_services: Dict[str, ConfigService] = {}
+_services_lock = threading.Lock()
+_desc_cache: Dict[str, tuple] = {}
+
+
+def config_service(config_file=DEFAULT_CONFIG_PATH) -> ConfigService:
+    key = os.path.abspath(config_file)
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.setdefault(key, ConfigService(config_file))
+    return service
+
+
+def subscribe(callback: Callable[[ConfigSnapshot], None], config_file=DEFAULT_CONFIG_PATH):
+    return config_service(config_file).subscribe(callback)
+
+
 def get_descriptions(desc_file=DESC_PATH):
-    if not os.path.exists(desc_file):
+    try:
+        st = os.stat(desc_file)
+    except FileNotFoundError:
         return {}
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _desc_cache.get(desc_file)
+    if cached and cached[0] == signature:
+        return cached[1]
     with open(desc_file, "r") as f:
-        return yaml.safe_load(f) or {}
+        descs = yaml.safe_load(f) or {}
+    _desc_cache[desc_file] = (signature, descs)
+    return descs
 
 def get_description(section, key, descs=None):
     descs = descs or get_descriptions()
     return descs.get(section, {}).get(key, "")
 
-def get_config(config_file=DEFAULT_CONFIG_PATH) -> configparser.ConfigParser:
-    if not os.path.exists(config_file):
-        raise FileNotFoundError(f"Config file not found: {config_file}")
-    config = configparser.ConfigParser()
-    config.read(config_file)
-    return config
+def get_config(config_file=DEFAULT_CONFIG_PATH) -> ConfigSnapshot:
+    return config_service(config_file).get()
 
 def set_config(config_file=DEFAULT_CONFIG_PATH, section=None, option=None, value=None):
-    config = get_config(config_file)
-    if section not in config:
-        config.add_section(section)
-    config.set(section, option, value)
-    with open(config_file, "w") as f:
-        config.write(f)
+    def mutate(config):
+        if section not in config:
+            config.add_section(section)
+        config.set(section, option, value)
+        return True
+    config_service(config_file).update(mutate)
 
 def add_or_update_credentials(config_file=DEFAULT_CONFIG_PATH, username=None, password=None):
     if username and password:
@@ -38,8 +175,6 @@ def add_or_update_credentials(config_file=DEFAULT_CONFIG_PATH, username=None, pa
         raise ValueError("Both username and password must be provided")
 
 def remove_section(config_file=DEFAULT_CONFIG_PATH, section=None):
-    config = get_config(config_file)
-    if section in config:
-        config.remove_section(section)
-        with open(config_file, "w") as f:
-            config.write(f)
+    def mutate(config):
+        return config.remove_section(section)
+    config_service(config_file).update(mutate)
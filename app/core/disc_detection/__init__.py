@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.disc_detection.linux import monitor_cdrom
-elif platform.system() == "Windows":
-    from app.core.disc_detection.windows import monitor_cdrom
-elif platform.system() == "Darwin":
-    from app.core.disc_detection.macos import monitor_cdrom
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "monitor_cdrom")
@@ -1,19 +1,11 @@
 import subprocess
 import logging
 import os
+import threading
 import time
-import requests
-from requests.auth import HTTPBasicAuth
-from app.core.config import get_config
 from app.core.drivemanager import drive_manager
-
-# API endpoint
-API_URL = "https://[::1]:8000"
-
-# Load credentials from config
-config = get_config()
-USERNAME = config.get("auth", "username")
-PASSWORD = config.get("auth", "password")
+from app.core.job.api_helpers import api_client
+from app.core.metrics import timed_run
 
 # Mapping filesystem + folder detection to disc type
 DISC_TYPES = {
@@ -22,16 +14,16 @@ DISC_TYPES = {
     "dvd_video": "dvd_video",
     "dvd_rom": "dvd_rom",
     "blu_ray_video": "bluray_video",
-    "blu_ray_rom": "blu_ray_rom"
+    "blu_ray_rom": "bluray_rom"
 }
 
 def get_disc_type(drive):
     """Detect the type of disc inserted."""
     try:
-        result = subprocess.run(['blkid', '-o', 'value', '-s', 'TYPE', drive], stdout=subprocess.PIPE, text=True)
+        result = timed_run(['blkid', '-o', 'value', '-s', 'TYPE', drive], stdout=subprocess.PIPE, text=True)
         filesystem_type = result.stdout.strip().lower()
 
-        size_result = subprocess.run(['lsblk', '-bno', 'SIZE', drive], stdout=subprocess.PIPE, text=True)
+        size_result = timed_run(['lsblk', '-bno', 'SIZE', drive], stdout=subprocess.PIPE, text=True)
         disc_size = int(size_result.stdout.strip())
 
         if filesystem_type in ['udf', 'iso9660']:
@@ -62,7 +54,7 @@ def has_folder(drive, folder_name):
 def get_mount_point(drive):
     """Get the mount point of the drive."""
     try:
-        result = subprocess.run(['lsblk', '-o', 'MOUNTPOINT', drive], stdout=subprocess.PIPE, text=True)
+        result = timed_run(['lsblk', '-o', 'MOUNTPOINT', drive], stdout=subprocess.PIPE, text=True)
         mount_point = result.stdout.strip().split('\n')[1:]
         return mount_point[0] if mount_point else None
     except Exception as e:
@@ -74,12 +66,7 @@ def start_ripping(drive, disc_type):
     job_type = DISC_TYPES.get(disc_type, "otherdisc")
 
     try:
-        response = requests.post(
-            f"{API_URL}/jobs/create",
-            json={"drive_path": drive, "disc_type": job_type},
-            auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            verify=False
-        )
+        response = api_client().request("POST", "/jobs/create", json={"drive_path": drive, "disc_type": job_type})
         if response.status_code == 200:
             logging.info(f"✅ Started job: {response.json()}")
         else:
@@ -87,6 +74,13 @@ def start_ripping(drive, disc_type):
     except Exception as e:
         logging.error(f"❌ Error calling API to start job: {e}")
 
+def handle_insert(drive):
+    """Probes and submits one inserted disc; runs per insertion so drives don't wait on each other."""
+    time.sleep(5)  # debounce
+    disc_type = get_disc_type(drive)
+    logging.info(f"📀 Detected {disc_type.upper()} in {drive}")
+    start_ripping(drive, disc_type)
+
 def monitor_cdrom():
     """Monitors for disc insertions and starts ripping via backend API."""
     logging.info("🔍 Monitoring for disc insertions...")
@@ -102,19 +96,14 @@ def monitor_cdrom():
 
         if "ID_CDROM_MEDIA=1" in line and drive:
             logging.info(f"📥 Disc inserted in {drive}")
-            time.sleep(5)  # debounce
-            disc_type = get_disc_type(drive)
-            logging.info(f"📀 Detected {disc_type.upper()} in {drive}")
-            start_ripping(drive, disc_type)
+            drive_manager.invalidate(drive)
+            threading.Thread(target=handle_insert, args=(drive,), daemon=True).start()
 
         elif "ID_CDROM_MEDIA=0" in line and drive:
             logging.info(f"💿 Disc ejected from {drive}")
+            drive_manager.invalidate(drive)
             try:
-                # Optional: inform backend to free the drive
-                requests.delete(
-                    f"{API_URL}/jobs/{drive}",
-                    auth=HTTPBasicAuth(USERNAME, PASSWORD),
-                    verify=False
-                )
+                # The server keeps its own drive info cache when the detector runs out of process
+                api_client().request("POST", "/api/drives/invalidate", json={"drive_path": drive})
             except Exception as e:
                 logging.warning(f"⚠️ Could not notify backend of eject: {e}")
@@ -1,48 +1,65 @@
 import os
 import subprocess
 import json
-from typing import List, Dict
+from app.core.metrics import timed_run
+from typing import List, Dict, Optional
 
 class LinuxDriveInfo:
     def get_drive_info(self) -> List[Dict]:
         drives = []
         try:
-            result = subprocess.run(["lsblk", "-J"], capture_output=True, text=True, check=True)
+            result = timed_run(["lsblk", "-J"], capture_output=True, text=True, check=True)
             lsblk_data = json.loads(result.stdout)
         except subprocess.CalledProcessError:
             return [{"error": "Failed to retrieve drive information"}]
 
         for device in lsblk_data.get("blockdevices", []):
             if "rom" in device.get("type", ""):
-                name = device.get("name", "")
-                path = os.path.realpath(f"/dev/{name}")
-                drives.append({
-                    "model": self._get_drive_model(path),
-                    "path": path,
-                    "capability": self._get_drive_capability(name),
-                    "status": self._get_drive_status(name),
-                    "disc_label": self._get_disc_label(path)
-                })
+                drives.append(self.get_drive(os.path.realpath(f"/dev/{device.get('name', '')}")))
         return drives
 
-    def _get_drive_model(self, device_path: str) -> str:
+    def get_drive(self, device_path: str) -> Dict:
+        """Describes a single drive without scanning the others."""
+        name = os.path.basename(device_path)
+        model, serial = self._get_drive_id(device_path)
+        return {
+            "model": model,
+            "serial": serial,
+            "path": device_path,
+            "capability": self._get_drive_capability(name),
+            "status": self._get_drive_status(name),
+            "disc_label": self._get_disc_label(device_path)
+        }
+
+    def _get_drive_id(self, device_path: str) -> tuple[str, str]:
+        """(model, serial) from lsblk's ID, which is "<model>_<serial>"."""
         try:
-            result = subprocess.run(["lsblk", "-no", "ID", device_path], capture_output=True, text=True, check=True)
+            result = timed_run(["lsblk", "-no", "ID", device_path], capture_output=True, text=True, check=True)
             raw_id = result.stdout.strip()
-            return raw_id.rsplit("_", 1)[0] if "_" in raw_id else raw_id
+            if "_" in raw_id:
+                model, serial = raw_id.rsplit("_", 1)
+                return model, serial
+            return raw_id or "Unknown", "Unknown"
         except subprocess.CalledProcessError:
-            return "Unknown"
+            return "Unknown", "Unknown"
 
     def _get_disc_label(self, device_path: str) -> str:
         try:
-            result = subprocess.run(["lsblk", "-no", "LABEL", device_path], capture_output=True, text=True)
+            result = timed_run(["lsblk", "-no", "LABEL", device_path], capture_output=True, text=True)
             return result.stdout.strip() or "UNTITLED"
         except subprocess.CalledProcessError:
             return "UNTITLED"
 
+    def get_mount_point(self, device_path: str) -> Optional[str]:
+        try:
+            result = timed_run(["lsblk", "-no", "MOUNTPOINT", device_path], capture_output=True, text=True)
+            return result.stdout.strip() or None
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
     def _get_drive_capability(self, device_name: str) -> str:
         try:
-            result = subprocess.run(
+            result = timed_run(
                 ["udevadm", "info", "--query=property", f"--name=/dev/{device_name}"],
                 capture_output=True, text=True, check=True
             )
@@ -56,7 +73,7 @@ class LinuxDriveInfo:
 
     def _get_drive_status(self, device_name: str) -> str:
         try:
-            result = subprocess.run(["fuser", f"/dev/{device_name}"], capture_output=True, text=True)
+            result = timed_run(["fuser", f"/dev/{device_name}"], capture_output=True, text=True)
             return "ripping" if result.stdout.strip() else "idle"
         except subprocess.CalledProcessError:
             return "unknown"
@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.drivemanager.linux import drive_manager as drive_manager
-elif platform.system() == "Windows":
-    from app.core.drivemanager.windows import drive_manager as drive_manager
-elif platform.system() == "Darwin":
-    from app.core.drivemanager.macos import drive_manager as drive_manager
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "drive_manager")
@@ -1,25 +1,79 @@
 import os
 import threading
 import logging
-from typing import List, Dict, Optional
-from app.core.config import get_config
+import subprocess
+import time
+from typing import List, Dict, NamedTuple, Optional
+from app.core.config import get_config, subscribe
 from app.core.driveinfo.linux import LinuxDriveInfo
+from app.core.drivemanager.profiler import DriveProfile, DriveProfiler
+from app.core.metrics import DRIVE_BYTES, DRIVE_READ_MBPS
+
+class DriveSettings(NamedTuple):
+    blacklist: List[str]
+    default_speed: int
+    speed_caps: Dict[str, int]
+    info_ttl: float
+
 
 class DriveManager:
     def __init__(self):
         self.lock = threading.Lock()
-        self.blacklist = self._load_blacklist()
         self.drive_map: Dict[str, str] = {}  # drive_path -> job_id
         self.provider = LinuxDriveInfo()
-
-    def _load_blacklist(self) -> List[str]:
-        config = get_config()
+        self._drive_cache: Dict[str, tuple[float, Dict]] = {}  # drive_path -> (fetched_at, info)
+        self._all_cache: Optional[tuple[float, List[Dict]]] = None
+        # Read from the config on first use so importing the singleton touches no files
+        self._settings: Optional[DriveSettings] = None
+        self._profiler: Optional[DriveProfiler] = None
+        subscribe(self.reload_blacklist)
+
+    @property
+    def settings(self) -> DriveSettings:
+        if self._settings is None:
+            self.reload_blacklist()
+        return self._settings
+
+    @property
+    def blacklist(self) -> List[str]:
+        return self.settings.blacklist
+
+    @property
+    def info_ttl(self) -> float:
+        return self.settings.info_ttl
+
+    @property
+    def profiler(self) -> DriveProfiler:
+        if self._profiler is None:
+            self._profiler = DriveProfiler.from_config(get_config())
+        return self._profiler
+
+    def _load_blacklist(self, config=None) -> List[str]:
+        config = config or get_config()
         raw = config.get("Drives", "blacklist", fallback="")
         return [os.path.realpath(d.strip()) for d in raw.split(",") if d.strip()]
 
-    def reload_blacklist(self):
+    def _load_speed_caps(self, config=None) -> tuple[int, Dict[str, int]]:
+        """[Drives] readspeed is the default cap; speedcaps overrides it per drive path or model."""
+        config = config or get_config()
+        default = config.getint("Drives", "readspeed", fallback=0)
+        caps = {}
+        for entry in config.get("Drives", "speedcaps", fallback="").split(","):
+            target, sep, speed = entry.strip().rpartition(":")
+            if sep and target and speed.strip().isdigit():
+                key = os.path.realpath(target) if target.startswith("/") else target
+                caps[key] = int(speed)
+        return default, caps
+
+    def reload_blacklist(self, config=None):
+        config = config or get_config()
+        settings = DriveSettings(
+            self._load_blacklist(config),
+            *self._load_speed_caps(config),
+            config.getfloat("Drives", "inforefreshseconds", fallback=2),
+        )
         with self.lock:
-            self.blacklist = self._load_blacklist()
+            self._settings = settings
 
     def mark_busy(self, drive_path: str, job_id: str):
         with self.lock:
@@ -54,11 +108,42 @@ class DriveManager:
     def is_available(self, drive_path: str) -> bool:
         return not self.is_busy(drive_path) and not self.is_blacklisted(drive_path)
 
+    def describe(self, drive_path: str) -> Dict:
+        """Shared, briefly cached identity of one drive (model, capability, disc label)."""
+        path = os.path.realpath(drive_path)
+        now = time.monotonic()
+        cached = self._drive_cache.get(path)
+        if cached and now - cached[0] < self.info_ttl:
+            return cached[1]
+        info = self.provider.get_drive(path)
+        self._drive_cache[path] = (now, info)
+        return info
+
+    def invalidate(self, drive_path: Optional[str] = None):
+        """Drops cached drive info, e.g. after a disc was inserted or ejected."""
+        if drive_path:
+            self._drive_cache.pop(os.path.realpath(drive_path), None)
+        else:
+            self._drive_cache.clear()
+        self._all_cache = None
+
+    def _scan_drives(self) -> List[Dict]:
+        now = time.monotonic()
+        if self._all_cache and now - self._all_cache[0] < self.info_ttl:
+            return self._all_cache[1]
+        drives = self.provider.get_drive_info()
+        self._all_cache = (now, drives)
+        for drive in drives:
+            if "path" in drive:
+                self._drive_cache[os.path.realpath(drive["path"])] = (now, drive)
+        return drives
+
     def get_all_drives(self) -> List[Dict]:
-        raw_drives = self.provider.get_drive_info()
+        raw_drives = self._scan_drives()
         enriched = []
 
-        for drive in raw_drives:
+        for raw in raw_drives:
+            drive = dict(raw)
             path = os.path.realpath(drive["path"])
             drive["status"] = (
                 "blacklisted" if self.is_blacklisted(path)
@@ -66,6 +151,9 @@ class DriveManager:
                 else "idle"
             )
             drive["job_id"] = self.get_job_for_drive(path)
+            profile = self.profiler.get(drive.get("model"), drive.get("serial"))
+            drive["read_mbps"] = round(profile.speed_mbps, 2) if profile else 0.0
+            drive["speed_cap"] = self.speed_cap(path)
             enriched.append(drive)
 
         return enriched
@@ -77,11 +165,67 @@ class DriveManager:
             "bd": ["BD"]
         }
         desired_caps = capability_order.get(desired_type.lower(), [])
-        for drive in self.get_all_drives():
-            if drive.get("capability") in desired_caps and drive["status"] == "idle":
-                return drive["path"]
-        logging.warning(f"[DriveManager] No available {desired_type.upper()} drive")
-        return None
+        candidates = [
+            d for d in self.get_all_drives()
+            if d.get("capability") in desired_caps and d["status"] == "idle"
+        ]
+        if not candidates:
+            logging.warning(f"[DriveManager] No available {desired_type.upper()} drive")
+            return None
+        # Least capable drive first (keeps BD drives free), then the fastest profiled drive
+        candidates.sort(key=lambda d: (desired_caps.index(d["capability"]), -d.get("read_mbps", 0.0)))
+        return candidates[0]["path"]
+
+    def get_profile(self, drive_path: str) -> Optional[DriveProfile]:
+        info = self.describe(drive_path)
+        return self.profiler.get(info.get("model"), info.get("serial"))
+
+    def disc_size(self, drive_path: str) -> int:
+        """Bytes on the loaded disc (0 when the device won't say, as with audio CDs)."""
+        try:
+            with open(drive_path, "rb") as f:
+                return f.seek(0, os.SEEK_END)
+        except OSError:
+            return 0
+
+    def read_rate(self, drive_path: str) -> Optional[float]:
+        """Expected read throughput in bytes/s from the drive's profile, or None if it was never measured."""
+        profile = self.get_profile(drive_path)
+        return profile.speed_mbps * 1e6 if profile and profile.speed_mbps else None
+
+    def profile_drive(self, drive_path: str, seconds: float = 10.0) -> DriveProfile:
+        """Measures the loaded disc's read throughput; the drive must be idle."""
+        path = os.path.realpath(drive_path)
+        if not self.is_available(path):
+            raise ValueError(f"Drive {path} is busy or blacklisted")
+        info = self.describe(path)
+        self.apply_speed_cap(path)
+        return self.profiler.profile(path, info.get("model"), info.get("serial"), seconds=seconds)
+
+    def observe_read(self, drive_path: str, nbytes: int, seconds: float):
+        DRIVE_BYTES.labels(drive_path, "read").inc(nbytes)
+        if seconds > 0:
+            DRIVE_READ_MBPS.labels(drive_path).set(nbytes / seconds / 1e6)
+        info = self.describe(drive_path)
+        self.profiler.observe(info.get("model"), info.get("serial"), nbytes, seconds)
+
+    def speed_cap(self, drive_path: str) -> Optional[int]:
+        """Read-speed cap (CD x-factor, as eject -x / cdparanoia -S take it) or None for full speed."""
+        path = os.path.realpath(drive_path)
+        settings = self.settings
+        cap = settings.speed_caps.get(path)
+        if cap is None:
+            cap = settings.speed_caps.get(self.describe(path).get("model"), settings.default_speed)
+        return cap or None
+
+    def apply_speed_cap(self, drive_path: str) -> Optional[int]:
+        """Sets the drive's speed before a read; MakeMKV and dd have no speed option of their own."""
+        cap = self.speed_cap(drive_path)
+        if cap:
+            result = subprocess.run(["eject", "-x", str(cap), drive_path], capture_output=True, text=True)
+            if result.returncode != 0:
+                logging.warning(f"[DriveManager] Could not cap {drive_path} to {cap}x: {result.stderr.strip()}")
+        return cap
 
     def free_drive_by_job(self, job_id: str):
         drive = self.get_drive_for_job(job_id)
@@ -0,0 +1,137 @@
+"""
+Read-throughput profiles per drive (model + serial). A profile is measured by
+reading the loaded disc sequentially for a few seconds; anything that can be
+opened and read works, so a plain file stands in for a block device:
+
+    truncate -s 2G /tmp/fake-sr0 && python -m app.core.drivemanager.profiler /tmp/fake-sr0
+"""
+import os
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from app.core.cache import TtlCache
+
+READ_BLOCK = 2 * 1024 * 1024
+WINDOW_SECONDS = 0.5
+PROFILE_TTL = 180 * 86400
+OBSERVED_WEIGHT = 0.3  # EWMA weight of each real rip's throughput
+
+
+@dataclass
+class DriveProfile:
+    model: str
+    serial: str
+    sustained_mbps: float = 0.0     # median of the second half of the measurement
+    first_byte_seconds: float = 0.0  # spin-up / seek before data arrives
+    ramp_seconds: float = 0.0       # until a window reaches 90% of sustained
+    observed_mbps: float = 0.0      # smoothed throughput of real rips
+    samples: List[float] = field(default_factory=list)
+    measured_at: float = 0.0
+
+    @property
+    def speed_mbps(self) -> float:
+        """Best estimate for placement: real rips win over a synthetic profile once we have them."""
+        return self.observed_mbps or self.sustained_mbps
+
+
+def profile_key(model: str, serial: str) -> str:
+    return f"{model or 'Unknown'}:{serial or 'Unknown'}"
+
+
+def measure(path: str, seconds: float = 10.0, max_bytes: Optional[int] = None) -> dict:
+    """Reads `path` sequentially and returns per-window MB/s plus ramp/sustained figures."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # Don't let the page cache (or a fake file's cache) report RAM speed
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+        samples: List[float] = []
+        total = window_bytes = 0
+        start = time.monotonic()
+        first_byte = None
+        window_start = start
+        while True:
+            chunk = os.read(fd, READ_BLOCK)
+            now = time.monotonic()
+            if first_byte is None:
+                first_byte = now - start
+                window_start = now
+            if not chunk:
+                break
+            total += len(chunk)
+            window_bytes += len(chunk)
+            if now - window_start >= WINDOW_SECONDS:
+                samples.append(window_bytes / (now - window_start) / 1e6)
+                window_bytes, window_start = 0, now
+            if now - start >= seconds or (max_bytes and total >= max_bytes):
+                break
+        if window_bytes and now > window_start:
+            samples.append(window_bytes / (now - window_start) / 1e6)
+    finally:
+        os.close(fd)
+
+    tail = samples[len(samples) // 2:] or samples
+    sustained = statistics.median(tail) if tail else 0.0
+    ramp = 0.0
+    for i, rate in enumerate(samples):
+        if rate >= 0.9 * sustained:
+            ramp = i * WINDOW_SECONDS
+            break
+    return {
+        "sustained_mbps": round(sustained, 2),
+        "first_byte_seconds": round(first_byte or 0.0, 3),
+        "ramp_seconds": ramp,
+        "samples": [round(s, 2) for s in samples],
+        "bytes": total,
+    }
+
+
+class DriveProfiler:
+    def __init__(self, path: str, ttl: float = PROFILE_TTL):
+        self.store = TtlCache(path, ttl)
+
+    @classmethod
+    def from_config(cls, config) -> "DriveProfiler":
+        return cls(config.get("Drives", "profilepath", fallback="~/.cache/TKDiscRipper/drive_profiles.json"))
+
+    def get(self, model: str, serial: str) -> Optional[DriveProfile]:
+        data = self.store.get(profile_key(model, serial))
+        return DriveProfile(**data) if data else None
+
+    def save(self, profile: DriveProfile):
+        self.store.set(profile_key(profile.model, profile.serial), asdict(profile))
+
+    def profile(self, device_path: str, model: str, serial: str, seconds: float = 10.0) -> DriveProfile:
+        result = measure(device_path, seconds=seconds)
+        profile = self.get(model, serial) or DriveProfile(model, serial)
+        profile.sustained_mbps = result["sustained_mbps"]
+        profile.first_byte_seconds = result["first_byte_seconds"]
+        profile.ramp_seconds = result["ramp_seconds"]
+        profile.samples = result["samples"]
+        profile.measured_at = time.time()
+        self.save(profile)
+        return profile
+
+    def observe(self, model: str, serial: str, nbytes: int, seconds: float):
+        """Folds the throughput of a finished read into the drive's profile."""
+        if seconds <= 0 or nbytes <= 0:
+            return
+        mbps = nbytes / seconds / 1e6
+        profile = self.get(model, serial) or DriveProfile(model, serial)
+        profile.observed_mbps = (
+            mbps if not profile.observed_mbps
+            else OBSERVED_WEIGHT * mbps + (1 - OBSERVED_WEIGHT) * profile.observed_mbps
+        )
+        self.save(profile)
+
+    def all(self) -> Dict[str, dict]:
+        return self.store.items()
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:]:
+        print(target, measure(target))
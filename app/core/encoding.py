@@ -0,0 +1,54 @@
+"""
+JSON encoding for the polled API endpoints. Uses orjson when it is installed and
+falls back to the stdlib otherwise; either way the result is bytes that can be
+cached and sent as-is, with an ETag so unchanged bodies turn into 304s.
+"""
+import hashlib
+import json
+from collections import deque
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def _default(obj: Any):
+    if isinstance(obj, (deque, set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+try:
+    import orjson
+
+    ENCODER = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    ENCODER = "json"
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (t.strip() for t in if_none_match.split(","))
+    return etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def json_response(request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+    """Sends pre-encoded JSON, or 304 Not Modified when the client already has this body."""
+    etag = etag or etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
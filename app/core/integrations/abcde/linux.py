@@ -1,5 +1,7 @@
 import subprocess
 from typing import Optional, Callable
+from app.core.job.control import spawn
+from app.core.job.timeline import wait_process
 
 def run_abcde(
     drive_path: str,
@@ -20,7 +22,7 @@ def run_abcde(
     if on_output:
         on_output(f"$ {' '.join(command)}")
 
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    process = spawn(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
     assert process.stdout is not None
 
     for line in process.stdout:
@@ -28,5 +30,4 @@ def run_abcde(
         if line and on_output:
             on_output(line)
 
-    process.wait()
-    return process.returncode == 0
+    return wait_process(process) == 0
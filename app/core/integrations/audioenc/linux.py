@@ -0,0 +1,40 @@
+from typing import Callable, Optional
+from app.core.storage.integrity import tee_command_to_file
+
+# format -> (file extension, command writing the encoded stream to stdout)
+ENCODERS = {
+    "flac": ("flac", lambda wav, tags: ["flac", "-s", "-8", "-c", *_tag_args("-T", "=", tags), wav]),
+    "opus": ("opus", lambda wav, tags: ["opusenc", "--quiet", *_tag_args("--comment", "=", tags), wav, "-"]),
+    "ogg": ("ogg", lambda wav, tags: ["oggenc", "-Q", *_tag_args("-c", "=", tags), "-o", "-", wav]),
+    "mp3": ("mp3", lambda wav, tags: ["lame", "--quiet", "-V2", *_lame_tag_args(tags), wav, "-"]),
+}
+
+LAME_TAGS = {"title": "--tt", "artist": "--ta", "album": "--tl", "tracknumber": "--tn", "date": "--ty"}
+
+
+def _tag_args(flag: str, sep: str, tags: Optional[dict]) -> list[str]:
+    args = []
+    for key, value in (tags or {}).items():
+        args += [flag, f"{key.upper()}{sep}{value}"]
+    return args
+
+
+def _lame_tag_args(tags: Optional[dict]) -> list[str]:
+    args = []
+    for key, value in (tags or {}).items():
+        if key.lower() in LAME_TAGS:
+            args += [LAME_TAGS[key.lower()], str(value)]
+    return args
+
+
+def encode_track(
+    wav_path: str,
+    output_path: str,
+    output_format: str,
+    tags: Optional[dict] = None,
+    on_output: Optional[Callable[[str], None]] = None,
+) -> tuple[bool, str]:
+    """Encodes one WAV, hashing the encoded stream as it's written. Returns (ok, hexdigest)."""
+    _, build = ENCODERS[output_format]
+    code, digest, _ = tee_command_to_file(build(wav_path, tags), output_path, on_output=on_output, preemptible=True)
+    return code == 0, digest
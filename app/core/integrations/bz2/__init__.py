@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.integrations.bz2.linux import compress_bz2
-elif platform.system() == "Windows":
-    from app.core.integrations.bz2.windows import compress_bz2
-elif platform.system() == "Darwin":
-    from app.core.integrations.bz2.macos import compress_bz2
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "compress_bz2")
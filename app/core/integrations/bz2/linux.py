@@ -1,8 +1,12 @@
-import subprocess
-import shutil
-from typing import Callable
+from typing import Callable, Optional
+from app.core.storage.integrity import compress_verified
 
-def compress_bz2(input_path: str, output_path: str, on_output: Callable[[str], None]):
+def compress_bz2(
+    input_path: str,
+    output_path: str,
+    on_output: Callable[[str], None],
+    throttle: Optional[Callable[[int], None]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> dict:
     on_output(f"▶️ Compressing {input_path} → {output_path} using bzip2")
-    subprocess.run(["bzip2", "-zkf", input_path], check=True)
-    shutil.move(f"{input_path}.bz2", output_path)
+    return compress_verified(["bzip2", "-zc", input_path], ["bzip2", "-dc"], output_path, throttle, on_progress)
@@ -0,0 +1,65 @@
+import re
+import subprocess
+from typing import Callable, Optional
+from app.core.job.control import spawn
+from app.core.job.timeline import wait_process
+
+SECTOR_BYTES = 2352
+WORDS_PER_SECTOR = SECTOR_BYTES // 2  # cdparanoia reports positions in 16-bit sample words
+WAV_HEADER_BYTES = 44
+
+TOC_LINE = re.compile(r"^\s*(\d+)\.\s+(\d+)\s+\[[^\]]*\]\s+(\d+)\s+\[")
+PROGRESS_LINE = re.compile(r"^##: -?\d+ \[(\w+)\] @ (\d+)")
+
+
+def read_toc(drive_path: str) -> Optional[list[dict]]:
+    """Returns the audio tracks as [{"number", "begin", "sectors", "bytes"}], or None if the TOC can't be read."""
+    process = spawn(["cdparanoia", "-d", drive_path, "-Q"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    _, stderr = process.communicate()
+    if wait_process(process) != 0:
+        return None
+
+    tracks = []
+    # cdparanoia prints its TOC on stderr
+    for line in stderr.splitlines():
+        match = TOC_LINE.match(line)
+        if match:
+            number, sectors, begin = (int(g) for g in match.groups())
+            tracks.append({
+                "number": number,
+                "begin": begin,
+                "sectors": sectors,
+                "bytes": sectors * SECTOR_BYTES + WAV_HEADER_BYTES,
+            })
+    return tracks
+
+
+def rip_track(
+    drive_path: str,
+    track: dict,
+    wav_path: str,
+    on_progress: Optional[Callable[[float], None]] = None,
+    on_output: Optional[Callable[[str], None]] = None,
+    speed: Optional[int] = None,
+) -> bool:
+    command = ["cdparanoia", "-d", drive_path, "-e", "-w"]
+    if speed:
+        command += ["-S", str(speed)]
+    command += [str(track["number"]), wav_path]
+
+    if on_output:
+        on_output(f"$ {' '.join(command)}")
+
+    process = spawn(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    assert process.stderr is not None
+
+    for line in process.stderr:
+        match = PROGRESS_LINE.match(line)
+        if match:
+            if on_progress and match.group(1) == "read":
+                sector = int(match.group(2)) // WORDS_PER_SECTOR - track["begin"]
+                on_progress(min(1.0, max(0.0, sector / track["sectors"])) if track["sectors"] else 0.0)
+        elif line.strip() and on_output:
+            on_output(line.strip())
+
+    return wait_process(process) == 0
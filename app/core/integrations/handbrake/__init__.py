@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.integrations.handbrake.linux import HandBrake
-elif platform.system() == "Windows":
-    from app.core.integrations.handbrake.windows import HandBrake
-elif platform.system() == "Darwin":
-    from app.core.integrations.handbrake.macos import HandBrake
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "HandBrake", "ScanResult")
@@ -1,75 +1,160 @@
 import os
 import re
 import subprocess
+from dataclasses import dataclass
 from typing import Callable, Optional
 from app.core.job.context import JobContext
+from app.core.job.control import spawn
+from app.core.job.timeline import wait_process
+from app.core.storage.iobudget import io_budget
+
+HANDBRAKE_CLI = ["flatpak", "run", "--command=HandBrakeCLI", "fr.handbrake.ghb"]
+
+
+@dataclass
+class ScanResult:
+    duration: float = 0.0  # seconds
+    width: int = 0
+    height: int = 0
+    crop: Optional[tuple[int, int, int, int]] = None  # top/bottom/left/right
+    combed: bool = False
+
 
 class HandBrake:
     def __init__(self, preset_name: str, preset_file: Optional[str] = None):
         self.preset_name = preset_name
         self.preset_file = preset_file
 
+    def _command(self, *args: str) -> list[str]:
+        presetfilecmd = ["--preset-import-file", self.preset_file] if self.preset_file else []
+        # Encodes read temp and write output while drive reads may be landing; keep them behind those
+        return io_budget.command([*HANDBRAKE_CLI, *presetfilecmd, "-Z", self.preset_name, *args])
+
+    def scan(self, path: str, previews: int = 10) -> Optional[ScanResult]:
+        """Scans a file's first title: duration, size, autocrop from `previews` frames and comb detection."""
+        process = spawn(
+            self._command("-i", path, "-t", "1", "--scan", "--previews", f"{previews}:0"),
+            preemptible=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        output, _ = process.communicate()
+        if wait_process(process) != 0:
+            return None
+        scan = ScanResult()
+        for line in output.splitlines():
+            if m := re.search(r"\+ duration: (\d+):(\d+):(\d+)", line):
+                h, mi, sec = map(int, m.groups())
+                scan.duration = h * 3600 + mi * 60 + sec
+            elif m := re.search(r"\+ size: (\d+)x(\d+)", line):
+                scan.width, scan.height = map(int, m.groups())
+            elif m := re.search(r"\+ autocrop: (\d+)/(\d+)/(\d+)/(\d+)", line):
+                scan.crop = tuple(map(int, m.groups()))
+            if "combing detected" in line:
+                scan.combed = True
+        return scan if scan.duration else None
+
+    def sample(self, path: str, output_path: str, start: float, seconds: float, extra_args: Optional[list[str]] = None) -> bool:
+        """Encodes `seconds` of video from `start` without audio or subtitles, for sizing the real encode."""
+        command = self._command(
+            "-i", path, "-o", output_path,
+            "--start-at", f"seconds:{int(start)}", "--stop-at", f"seconds:{int(seconds)}",
+            "-a", "none", "-s", "none", *(extra_args or []),
+        )
+        process = spawn(command, preemptible=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return wait_process(process) == 0 and os.path.isfile(output_path)
+
+    def encode_file(
+        self,
+        path: str,
+        output_path: str,
+        extra_args: Optional[list[str]] = None,
+        on_progress: Optional[Callable[[float], None]] = None,
+    ) -> bool:
+        """One encode without job logging, reporting percent done; for callers running several at once."""
+        process = spawn(
+            self._command("-i", path, "-o", output_path, *(extra_args or [])),
+            preemptible=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        assert process.stdout is not None
+        for line in process.stdout:
+            if on_progress and "Encoding:" in line and (match := re.search(r'(\d+\.\d+)\s+%', line)):
+                on_progress(float(match.group(1)))
+        wait_process(process)
+        return process.returncode == 0 and os.path.isfile(output_path)
+
     def transcode(
         self,
         mkv_files: list[str],
         output_dir: str,
         ctx: JobContext,
+        on_file_done: Optional[Callable[[str], None]] = None,
+        extra_args: Optional[dict[str, list[str]]] = None,
+        on_progress: Optional[Callable[[float], None]] = None,
     ) -> bool:
+        """
+        extra_args maps an input file to HandBrake options applied on top of the preset (crop, quality).
+        on_progress gets the fraction of the whole batch done, weighted by each file's size.
+        """
 
         total_tracks = len(mkv_files)
         if total_tracks == 0:
             ctx.log("⚠️ No MKV files found to transcode.")
             return False
 
-        track_weight = 100 / total_tracks
+        sizes = [os.path.getsize(f) if os.path.exists(f) else 0 for f in mkv_files]
+        total_bytes = sum(sizes) or 1
+        done_bytes = 0
 
         for idx, mkv_file in enumerate(mkv_files, start=1):
             track_basename = os.path.basename(mkv_file)
             output_path = os.path.join(output_dir, track_basename)
-            presetfilecmd = ""
-            if self.preset_file:
-                presetfilecmd=("--preset-import-file", self.preset_file,)
+            file_args = (extra_args or {}).get(mkv_file, [])
 
             ctx.log(f"🎞️ Transcoding file {idx}/{total_tracks}: {track_basename}")
             ctx.log(f"🚀 {mkv_file} → {output_path}")
 
-            command = [
-                "flatpak", "run", "--command=HandBrakeCLI", "fr.handbrake.ghb",
-                presetfilecmd,
-                "-Z", self.preset_name,
-                "-i", mkv_file,
-                "-o", output_path
-            ]
+            if file_args:
+                ctx.log(f"🎛️ {' '.join(file_args)}")
+
+            command = self._command("-i", mkv_file, "-o", output_path, *file_args)
 
             try:
-                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-                assert process.stdout is not None
-
-                for line in process.stdout:
-                    line = line.strip()
-
-                    if "Encoding:" in line and "%" in line:
-                        match = re.search(r'(\d+\.\d+)\s+%', line)
-                        if match:
-                            file_pct = float(match.group(1))
-                            progress = int(((idx - 1) + file_pct / 100) * track_weight)
-                            ctx.set_progress(progress_step=progress, progress=int(50 + progress * 0.5))
-
-                            eta_match = re.search(r'ETA\s+([\dhms]+)', line)
-                            eta = eta_match.group(1) if eta_match else ""
-                            ctx.log(f"🎞️ {file_pct:.2f}% {'(ETA ' + eta + ')' if eta else ''}")
-                    elif line:
-                        ctx.log(line)
-
-                process.wait()
-                if process.returncode != 0:
-                    ctx.log(f"❌ HandBrake failed on {track_basename}")
-                    return False
+                with ctx.phase(f"transcode {track_basename}", "transcode", input=mkv_file) as span:
+                    process = spawn(command, preemptible=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+                    assert process.stdout is not None
+
+                    for line in process.stdout:
+                        line = line.strip()
+
+                        if "Encoding:" in line and "%" in line:
+                            match = re.search(r'(\d+\.\d+)\s+%', line)
+                            if match:
+                                file_pct = float(match.group(1))
+                                if on_progress:
+                                    on_progress((done_bytes + sizes[idx - 1] * file_pct / 100) / total_bytes)
+
+                                eta_match = re.search(r'ETA\s+([\dhms]+)', line)
+                                eta = eta_match.group(1) if eta_match else ""
+                                ctx.log(f"🎞️ {file_pct:.2f}% {'(ETA ' + eta + ')' if eta else ''}")
+                        elif line:
+                            ctx.log(line)
+
+                    wait_process(process)
+                    if process.returncode != 0:
+                        span.args["failed"] = True
+                        ctx.log(f"❌ HandBrake failed on {track_basename}")
+                        if os.path.exists(output_path):
+                            os.remove(output_path)  # don't leave a truncated file in the library
+                        return False
+                    span.bytes = os.path.getsize(output_path)
+                    done_bytes += sizes[idx - 1]
+                    if on_file_done:
+                        on_file_done(output_path)
 
             except Exception as e:
                 ctx.log(f"❌ Error transcoding {mkv_file}: {e}")
                 return False
 
         ctx.log("✅ Transcoding complete.")
-        ctx.set_progress(progress=100, progress_step=100)
+        if on_progress:
+            on_progress(1.0)
         return True
@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.integrations.makemkv.linux import MakeMKV
-elif platform.system() == "Windows":
-    from app.core.integrations.makemkv.windows import MakeMKV
-elif platform.system() == "Darwin":
-    from app.core.integrations.makemkv.macos import MakeMKV
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "MakeMKV")
@@ -1,28 +1,70 @@
 import os
 import threading
-from typing import Optional
+from typing import Callable, Optional
 from app.core.logstream import stream_subprocess
 from app.core.job.context import JobContext
 
+# TINFO attribute ids from makemkvcon's robot output
+TINFO_DURATION = 9
+TINFO_SIZE_BYTES = 11
+TINFO_FILENAME = 27
+
 class MakeMKV:
-    def rip(self, drive_path: str, temp_dir: str, ctx: JobContext) -> Optional[str]:
+    def scan(self, drive_path: str, ctx: JobContext) -> Optional[list[dict]]:
+        """Lists the disc's titles with their predicted size in bytes."""
+        command = ["makemkvcon", "-r", "--cache=1", "info", f"dev:{drive_path}", "--minlength=1"]
+        ctx.log(f"$ {' '.join(command)}")
+
+        code, output = stream_subprocess(command, capture_output=True)
+        if code != 0:
+            ctx.log(f"❌ MakeMKV scan exited with code {code}")
+            return None
+
+        titles: dict[int, dict] = {}
+        for line in (output or "").splitlines():
+            if not line.startswith("TINFO:"):
+                continue
+            title_id, attr_id, _, value = line[6:].split(",", 3)
+            title = titles.setdefault(int(title_id), {"id": int(title_id), "size": 0})
+            value = value.strip('"')
+            if int(attr_id) == TINFO_SIZE_BYTES:
+                title["size"] = int(value)
+            elif int(attr_id) == TINFO_DURATION:
+                title["duration"] = value
+            elif int(attr_id) == TINFO_FILENAME:
+                title["filename"] = value
+        return [titles[k] for k in sorted(titles)]
+
+    def rip(
+        self,
+        drive_path: str,
+        temp_dir: str,
+        ctx: JobContext,
+        title: str = "all",
+        on_progress: Optional[Callable[[float], None]] = None,
+    ) -> Optional[str]:
+        """Rips one title (or all) into temp_dir; on_progress gets the fraction of this rip done."""
         progress_path = os.path.join(temp_dir, f"{ctx.job_id}_progress.txt")
 
         command = [
-            "makemkvcon", "--robot", "mkv", f"dev:{drive_path}", "all",
+            "makemkvcon", "--robot", "mkv", f"dev:{drive_path}", title,
             temp_dir, "--noscan", "--decrypt", "--minlength=1",
             f"--progress={progress_path}"
         ]
 
         ctx.log(f"$ {' '.join(command)}")
 
+        stop = threading.Event()
         threading.Thread(
             target=self._watch_progress_file,
-            args=(progress_path, ctx),
+            args=(progress_path, ctx, on_progress, stop),
             daemon=True
         ).start()
 
-        code, _ = stream_subprocess(command, on_output=ctx.log)
+        try:
+            code, _ = stream_subprocess(command, on_output=ctx.log)
+        finally:
+            stop.set()
 
         if code != 0:
             ctx.log(f"❌ MakeMKV exited with code {code}")
@@ -31,12 +73,13 @@ class MakeMKV:
         if os.path.exists(progress_path):
             os.remove(progress_path)
 
-        ctx.set_progress(progress_step=100, progress=50)
+        if on_progress:
+            on_progress(1.0)
         return temp_dir
 
-    def _watch_progress_file(self, path: str, ctx: JobContext):
+    def _watch_progress_file(self, path: str, ctx: JobContext, on_progress: Optional[Callable[[float], None]], stop: threading.Event):
         last_pos = 0
-        while True:
+        while not stop.is_set():
             try:
                 with open(path, "r") as f:
                     f.seek(last_pos)
@@ -45,12 +88,13 @@ class MakeMKV:
                         if line.startswith("PRGV:"):
                             _, disc_pct, max_val = line.split(":")[1].split(",")
                             max_val = int(max_val)
-                            step_pct = int((int(disc_pct) / max_val) * 100) if max_val else 0
-                            ctx.set_progress(current_phase="makemkv", progress_step=step_pct, progress=int(step_pct * 0.5))
+                            if on_progress and max_val:
+                                on_progress(int(disc_pct) / max_val)
                         elif line.startswith("PRGC:"):
                             _, _, status = line.split(",", 2)
-                            ctx.log(f"📘 {status.strip('\"')}")
+                            status = status.strip('"')
+                            ctx.log(f"📘 {status}")
                     last_pos = f.tell()
             except Exception:
                 pass
-            import time; time.sleep(1)
+            stop.wait(1)
@@ -0,0 +1,3 @@
+from app.core.backends import lazy_platform
+
+__getattr__, __dir__ = lazy_platform(__name__, "remux", "split", "concat", "available")
@@ -0,0 +1,80 @@
+import glob
+import os
+import re
+import shutil
+from typing import Callable, List, Optional
+from app.core.logstream import stream_subprocess
+from app.core.storage.iobudget import io_budget
+
+PROGRESS = re.compile(r"Progress:\s*(\d+)%")
+
+def available() -> bool:
+    return shutil.which("mkvmerge") is not None
+
+def remux(
+    input_path: str,
+    output_path: str,
+    audio_ids: List[int],
+    subtitle_ids: List[int],
+    on_output: Callable[[str], None],
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> bool:
+    """Stream-copies video plus the given audio/subtitle track ids (mkvmerge numbering, file order)."""
+    command = ["mkvmerge", "-o", output_path]
+    command += ["-a", ",".join(map(str, audio_ids))] if audio_ids else ["-A"]
+    command += ["-s", ",".join(map(str, subtitle_ids))] if subtitle_ids else ["-S"]
+    command.append(input_path)
+    return _run(command, on_output, on_progress)
+
+def split(
+    input_path: str,
+    output_pattern: str,
+    timestamps: List[float],
+    on_output: Callable[[str], None],
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> List[str]:
+    """
+    Cuts the video track into pieces at the first keyframe at or after each timestamp
+    (seconds). Files are named like output_pattern with -001, -002, ... before the
+    extension; returns them in order, or [] on failure.
+    """
+    command = [
+        "mkvmerge", "-o", output_pattern, "-A", "-S", "-B", "-M", "-T", "--no-chapters", "--no-global-tags",
+        "--split", "timestamps:" + ",".join(f"{t:.3f}s" for t in timestamps), input_path,
+    ]
+    if not _run(command, on_output, on_progress):
+        return []
+    stem, ext = os.path.splitext(output_pattern)
+    return sorted(glob.glob(f"{glob.escape(stem)}-[0-9][0-9][0-9]{ext}"))
+
+def concat(
+    video_parts: List[str],
+    audio_source: str,
+    output_path: str,
+    audio_ids: List[int],
+    subtitle_ids: List[int],
+    on_output: Callable[[str], None],
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> bool:
+    """Appends video-only parts into one track and muxes the given audio/subtitle tracks of audio_source alongside."""
+    command = ["mkvmerge", "-o", output_path, video_parts[0]]
+    for part in video_parts[1:]:
+        command += ["+", part]
+    command += ["-D", "-B", "-M"]
+    command += ["-a", ",".join(map(str, audio_ids))] if audio_ids else ["-A"]
+    command += ["-s", ",".join(map(str, subtitle_ids))] if subtitle_ids else ["-S"]
+    command.append(audio_source)
+    return _run(command, on_output, on_progress)
+
+def _run(command: List[str], on_output: Callable[[str], None], on_progress: Optional[Callable[[int], None]]) -> bool:
+    def handle(line: str):
+        match = PROGRESS.search(line)
+        if match:
+            if on_progress:
+                on_progress(int(match.group(1)))
+        else:
+            on_output(line)
+
+    returncode, _ = stream_subprocess(io_budget.command(command), handle, preemptible=True)
+    # 1 means finished with warnings
+    return returncode in (0, 1)
@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.integrations.zstd.linux import compress_zstd
-elif platform.system() == "Windows":
-    from app.core.integrations.zstd.windows import compress_zstd
-elif platform.system() == "Darwin":
-    from app.core.integrations.zstd.macos import compress_zstd
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "compress_zstd")
@@ -1,8 +1,12 @@
-import subprocess
-import shutil
-from typing import Callable
+from typing import Callable, Optional
+from app.core.storage.integrity import compress_verified
 
-def compress_zstd(input_path: str, output_path: str, on_output: Callable[[str], None]):
+def compress_zstd(
+    input_path: str,
+    output_path: str,
+    on_output: Callable[[str], None],
+    throttle: Optional[Callable[[int], None]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> dict:
     on_output(f"▶️ Compressing {input_path} → {output_path} using zstd")
-    subprocess.run(["zstd", "-T0", "-q", input_path], check=True)
-    shutil.move(f"{input_path}.zst", output_path)
+    return compress_verified(["zstd", "-T0", "-q", "-c", input_path], ["zstd", "-d", "-q", "-c"], output_path, throttle, on_progress)
@@ -1,25 +1,51 @@
-import requests
-from requests.auth import HTTPBasicAuth
+import threading
+from typing import Optional
+
+from requests.auth import AuthBase, HTTPBasicAuth
+from app.core.apiclient import ApiClient
 from app.core.config import get_config
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+DEFAULT_API_URL = "https://[::1]:8000"
+API_URL = DEFAULT_API_URL
+
+_client: Optional[ApiClient] = None
+_client_lock = threading.Lock()
+
+def api_auth() -> HTTPBasicAuth:
+    # Read per call: the config snapshot is cached and credential changes apply without a restart
+    config = get_config()
+    return HTTPBasicAuth(config.get("auth", "username"), config.get("auth", "password"))
+
+class ConfigAuth(AuthBase):
+    def __call__(self, r):
+        return api_auth()(r)
 
-config = get_config()
-API_URL = "https://[::1]:8000"
-AUTH = HTTPBasicAuth(config.get("auth", "username"), config.get("auth", "password"))
+def api_client() -> ApiClient:
+    """The process-wide client for API_URL; rebuilt if something (worker, harness) repoints API_URL."""
+    global _client
+    client = _client
+    if client is None or client.configured_url != API_URL:
+        with _client_lock:
+            if _client is None or _client.configured_url != API_URL:
+                if _client is not None:
+                    _client.close()
+                # The Unix socket is only for the local server, not a coordinator elsewhere
+                _client = ApiClient.from_config(get_config(), API_URL, auth=ConfigAuth(), local=API_URL == DEFAULT_API_URL)
+            client = _client
+    return client
 
 def get_job(job_id: str) -> dict:
     try:
-        r = requests.get(f"{API_URL}/jobs/{job_id}/json", auth=AUTH, timeout=5, verify=False)
+        r = api_client().request("GET", f"/jobs/{job_id}/json")
         r.raise_for_status()
         return r.json()
     except Exception as e:
         print(f"❌ get_job({job_id}) failed: {e}")
         return {}
 
-def update_job(job_id: str, **kwargs):
-    payload = dict(kwargs)
-    r = requests.patch(f"{API_URL}/jobs/{job_id}", json=payload, auth=AUTH, timeout=5, verify=False)
-    if not r.ok:
-        raise RuntimeError(f"Failed to update job {job_id}: {r.status_code} {r.text}")
+def update_job(job_id: str, wait: bool = True, **kwargs):
+    """
+    Sends a job update. wait=False queues it for the next batch (logs, progress, spans);
+    the default flushes everything queued before it and raises if this job's update failed.
+    """
+    api_client().update(job_id, kwargs, wait=wait)
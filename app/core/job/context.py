@@ -1,4 +1,12 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
 from app.core.job.api_helpers import update_job
+from app.core.job.control import JobControl
+from app.core.job.progress import ProgressModel
+from app.core.job.timeline import Span, enter_span, exit_span
+from app.core.metrics import PHASE_DURATION
 
 class JobContext:
     """
@@ -7,9 +15,71 @@ class JobContext:
     """
     def __init__(self, job_id: str):
         self.job_id = job_id
+        # Cancel/pause handle for every process and thread this job starts
+        self.control = JobControl(job_id)
+        # Weighted phases -> progress, progress_step and ETA; rippers plan and advance it
+        self.progress = ProgressModel(self._report_progress, self.control.paused_seconds)
+        # Set by JobTracker: called once the disc is no longer needed (drive can be freed/ejected)
+        self.on_read_complete: Optional[Callable[[bool], None]] = None
+        self._read_done = False
+        # Set by a background stage (ISO compression) that failed after rip() returned
+        self.background_error: Optional[str] = None
+        self._phase: Optional[str] = None
+        self._phase_start = 0.0
 
+    # Logs, progress and spans are batched; the tracker's final status update flushes them in order
     def log(self, msg: str):
-        update_job(self.job_id, log=msg)
+        update_job(self.job_id, wait=False, log=msg)
 
     def set_progress(self, **kwargs):
-        update_job(self.job_id, **kwargs)
+        if "operation" in kwargs:
+            self._enter_phase(kwargs["operation"])
+        update_job(self.job_id, wait=False, **kwargs)
+
+    def _report_progress(self, fields: dict):
+        update_job(self.job_id, wait=False, **fields)
+
+    def _enter_phase(self, operation: str):
+        if operation == self._phase:
+            return
+        now = time.monotonic()
+        if self._phase is not None:
+            PHASE_DURATION.labels(self._phase).observe(now - self._phase_start)
+        self._phase, self._phase_start = operation, now
+
+    @contextmanager
+    def phase(self, name: str, category: str = "job", **args) -> Iterator[Span]:
+        """
+        Times a block as one timeline span; child processes reaped inside it add their CPU time.
+        Phases are where a cancelled job stops: entering one raises JobCancelled.
+        """
+        self.control.check()
+        span = Span(name, category, **args)
+        token = enter_span(span)
+        try:
+            yield span
+        except BaseException:
+            span.args["failed"] = True
+            raise
+        finally:
+            exit_span(token)
+            self.add_span(span)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.control.cancelled.is_set()
+
+    def add_span(self, span: Span):
+        try:
+            update_job(self.job_id, wait=False, timeline_event=span.finish())
+        except Exception as e:
+            # Telemetry must never fail a rip
+            logging.debug(f"[Timeline] Dropped span {span.name} for {self.job_id}: {e}")
+
+    def read_complete(self, ok: bool = True):
+        if self._read_done:
+            return
+        self._read_done = True
+        update_job(self.job_id, wait=False, read_end_time=time.time())
+        if self.on_read_complete:
+            self.on_read_complete(ok)
@@ -0,0 +1,251 @@
+"""
+Cancellation and preemption of running jobs. Every process a job starts goes through
+spawn(), which puts it in its own process group and registers it with the job's
+JobControl (found through a context variable the job's threads inherit). Cancelling
+terminates those process trees and raises JobCancelled at the job's next phase; pausing
+stops the preemptible ones (encodes, compression) with SIGSTOP until they are resumed.
+"""
+import contextvars
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+KILL_GRACE = 5.0  # seconds between SIGTERM and SIGKILL
+
+
+class JobCancelled(BaseException):
+    """
+    Raised at the next phase boundary (or process start) of a cancelled job. A
+    BaseException, so the rippers' `except Exception` handlers don't report it as a failure.
+    """
+
+
+_current: ContextVar[Optional["JobControl"]] = ContextVar("job_control", default=None)
+
+
+def current_control() -> Optional["JobControl"]:
+    return _current.get()
+
+
+def _descendants(pid: int) -> List[int]:
+    """All processes below pid, from /proc; catches children that left its process group (flatpak, bwrap)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def signal_tree(pid: int, sig: int):
+    """Signals a spawned process's group and every descendant of it."""
+    try:
+        os.killpg(pid, sig)  # spawn() makes each process its own group leader
+    except (ProcessLookupError, PermissionError):
+        pass
+    for target in (pid, *_descendants(pid)):
+        try:
+            os.kill(target, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class JobControl:
+    def __init__(self, job_id: str, priority: str = "normal"):
+        self.job_id = job_id
+        self.priority = priority
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.reason: Optional[str] = None
+        self._running = threading.Event()  # cleared while paused
+        self._running.set()
+        self._holds: Set[str] = set()  # why it's paused: "manual", "preempt:<job id>"
+        self._paused_at: Optional[float] = None
+        self._paused_total = 0.0
+        self._processes: Dict[int, Tuple[subprocess.Popen, bool]] = {}  # pid -> (process, preemptible)
+        self._threads = 0
+        self._thread_objects: List[threading.Thread] = []
+        self.stopped = threading.Event()  # set once the job's last thread has exited
+        self._cleanups: List[Callable[[], None]] = []  # run after a cancel, once nothing uses the files
+        # Set by JobTracker: called when the last thread exits (after the cleanups, if cancelled)
+        self.on_stopped: Optional[Callable[[], None]] = None
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def paused_seconds(self) -> float:
+        """Total time spent paused so far (progress estimates leave it out)."""
+        paused_at = self._paused_at
+        return self._paused_total + (time.monotonic() - paused_at if paused_at is not None else 0.0)
+
+    @property
+    def alive(self) -> bool:
+        """Some thread of the job (the rip or its background compression) is still running."""
+        return self._threads > 0
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(self.reason)
+
+    def add_cleanup(self, fn: Callable[[], None]):
+        self._cleanups.append(fn)
+
+    # --- processes ---
+
+    def spawn(self, command: List[str], preemptible: bool = False, **kwargs) -> subprocess.Popen:
+        self.check()
+        while preemptible and not self._running.wait(0.5):
+            self.check()  # a paused job starts no new encodes
+        process = subprocess.Popen(command, process_group=0, **kwargs)
+        with self.lock:
+            self._processes = {pid: entry for pid, entry in self._processes.items() if entry[0].returncode is None}
+            self._processes[process.pid] = (process, preemptible)
+            stop = preemptible and not self._running.is_set()
+        if stop:
+            signal_tree(process.pid, signal.SIGSTOP)
+        if self.cancelled.is_set():
+            self._terminate([process])
+        return process
+
+    def _live(self, preemptible_only: bool = False) -> List[subprocess.Popen]:
+        with self.lock:
+            return [p for p, preemptible in self._processes.values() if p.returncode is None and (preemptible or not preemptible_only)]
+
+    def _terminate(self, processes: List[subprocess.Popen]):
+        for process in processes:
+            signal_tree(process.pid, signal.SIGCONT)  # a stopped process can't act on SIGTERM
+            signal_tree(process.pid, signal.SIGTERM)
+
+        def kill_stragglers():
+            time.sleep(KILL_GRACE)
+            for process in processes:
+                if process.returncode is None:
+                    signal_tree(process.pid, signal.SIGKILL)
+
+        if processes:
+            threading.Thread(target=kill_stragglers, name=f"kill-{self.job_id[:8]}", daemon=True).start()
+
+    # --- control ---
+
+    def cancel(self, reason: str = "Cancelled") -> bool:
+        with self.lock:
+            if self.cancelled.is_set() or self.stopped.is_set():
+                return False
+            self.reason = reason
+            self.cancelled.set()
+            self._holds.clear()
+            self._running.set()  # wake spawns waiting on a pause so they raise
+            if self._paused_at is not None:
+                self._paused_total += time.monotonic() - self._paused_at
+                self._paused_at = None
+        self._terminate(self._live())
+        return True
+
+    def pause(self, hold: str) -> bool:
+        """Stops the job's preemptible processes (and holds back new ones) until every hold is resumed."""
+        with self.lock:
+            if self.cancelled.is_set() or hold in self._holds:
+                return False
+            first = not self._holds
+            self._holds.add(hold)
+            self._running.clear()
+            if first:
+                self._paused_at = time.monotonic()
+        if first:
+            for process in self._live(preemptible_only=True):
+                signal_tree(process.pid, signal.SIGSTOP)
+        return True
+
+    def resume(self, hold: Optional[str] = None) -> bool:
+        """Releases one hold (all of them when None); processes continue once none is left."""
+        with self.lock:
+            if hold is None:
+                self._holds.clear()
+            else:
+                self._holds.discard(hold)
+            if self._holds or self._running.is_set():
+                return False
+            self._running.set()
+            self._paused_total += time.monotonic() - self._paused_at
+            self._paused_at = None
+        for process in self._live(preemptible_only=True):
+            signal_tree(process.pid, signal.SIGCONT)
+        return True
+
+    # --- threads ---
+
+    def thread(self, target: Callable, *args, name: Optional[str] = None, daemon: bool = False) -> threading.Thread:
+        """A thread that runs as part of this job: it inherits the caller's context and is counted until it exits."""
+        context = contextvars.copy_context()
+        context.run(_current.set, self)
+        with self.lock:
+            self._threads += 1
+
+        def run():
+            try:
+                context.run(target, *args)
+            except JobCancelled:
+                pass
+            finally:
+                with self.lock:
+                    self._threads -= 1
+                    last = self._threads == 0
+                if last:
+                    self._stop()
+
+        thread = threading.Thread(target=run, name=name, daemon=daemon)
+        self._thread_objects.append(thread)
+        return thread
+
+    def join_background(self):
+        """Waits for the job's other threads (background compression) to finish."""
+        for thread in list(self._thread_objects):
+            if thread is not threading.current_thread() and thread.ident is not None:
+                thread.join()
+
+    def _stop(self):
+        if self.cancelled.is_set():
+            for cleanup in self._cleanups:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logging.warning(f"[Jobs] Cleanup after cancelling {self.job_id} failed: {e}")
+        self.stopped.set()
+        if self.on_stopped:
+            try:
+                self.on_stopped()
+            except Exception as e:
+                logging.warning(f"[Jobs] Stop handler for {self.job_id} failed: {e}")
+
+
+def spawn(command: List[str], preemptible: bool = False, **kwargs) -> subprocess.Popen:
+    """
+    subprocess.Popen for job work. Inside a job the process is tracked for cancel/pause;
+    `preemptible` marks background work (encodes, compression) that may be paused.
+    """
+    control = _current.get()
+    if control is None:
+        return subprocess.Popen(command, **kwargs)
+    return control.spawn(command, preemptible, **kwargs)
+
+
+def bound(fn: Callable) -> Callable:
+    """fn wrapped to run on a pool thread in the submitting thread's job context."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
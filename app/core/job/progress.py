@@ -0,0 +1,280 @@
+"""
+Job progress from a plan of phases weighted by how long each is expected to take: its
+size (bytes, or 1 for fixed-cost steps like a scan) over the throughput that kind of work
+reached in earlier jobs. The ETA blends that history with the rate the running phase
+actually shows, is smoothed so it doesn't jump with every progress line, and leaves out
+time the job spent paused. Percent done is the share of the expected time already spent.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional
+
+from app.core.cache import TtlCache
+from app.core.config import get_config, subscribe
+
+HISTORY_TTL = 180 * 86400
+HISTORY_WEIGHT = 0.3  # EWMA weight of the newest finished phase
+ETA_SMOOTHING = 0.25  # EWMA weight of each new ETA sample
+TRUST_SECONDS = 60.0  # phase time after which the observed rate has fully replaced history
+REPORT_INTERVAL = 1.0
+MIN_OBSERVED_SECONDS = 0.5  # shorter phases say more about overhead than throughput
+
+# units/s before there is any history: bytes/s, or 1/seconds for fixed-cost steps.
+# Looked up by the longest matching prefix of a phase key ("compress:bz2" -> "compress").
+DEFAULT_RATES = {
+    "read": 8e6,
+    "read:audio_cd": 0.6e6,
+    "read:bluray": 20e6,
+    "scan": 1 / 20,
+    "scan:audio_cd": 1 / 3,
+    "metadata": 1 / 3,
+    "analyze": 1 / 30,
+    "transcode": 12e6,
+    "remux": 150e6,
+    "finalize": 300e6,
+    "compress": 12e6,
+    "compress:zstd": 150e6,
+    "encode": 25e6,
+    "abcde": 1 / 600,  # a whole CD read and encoded in one step
+}
+
+
+def default_rate(key: str) -> float:
+    """Most specific default: "read:bluray_video" -> "read:bluray" -> "read"."""
+    while key:
+        if key in DEFAULT_RATES:
+            return DEFAULT_RATES[key]
+        head, sep, tail = key.rpartition(":")
+        key = f"{head}{sep}{tail.rpartition('_')[0]}" if "_" in tail else head
+    return 1.0
+
+
+class ThroughputHistory:
+    """Smoothed units/s of finished phases per kind of work ("compress:bz2", "encode:flac", ...)."""
+
+    def __init__(self):
+        self._store: Optional[TtlCache] = None
+        subscribe(self.reload)
+
+    def reload(self, config=None):
+        config = config or get_config()
+        path = os.path.expanduser(config.get("General", "throughputpath", fallback="~/.cache/TKDiscRipper/throughput.json"))
+        if self._store is None or self._store.path != path:
+            self._store = TtlCache(path, HISTORY_TTL)
+
+    @property
+    def store(self) -> TtlCache:
+        if self._store is None:
+            self.reload()
+        return self._store
+
+    def rate(self, key: str) -> float:
+        return self.store.get(key) or default_rate(key)
+
+    def observe(self, key: str, amount: float, seconds: float):
+        if amount <= 0 or seconds < MIN_OBSERVED_SECONDS:
+            return
+        rate = amount / seconds
+        previous = self.store.get(key)
+        self.store.set(key, rate if not previous else HISTORY_WEIGHT * rate + (1 - HISTORY_WEIGHT) * previous)
+
+
+@dataclass
+class Phase:
+    name: str
+    key: str  # kind of work, for history and defaults: "read:dvd_video", "compress:bz2"
+    amount: float
+    rate: float  # expected units/s
+    learn: bool = True  # False when the rate came from elsewhere (drive profile, encode rates), which keeps its own history
+    overlaps: bool = False  # runs alongside the phase before it (audio encodes during reads)
+    done: float = 0.0
+    started: Optional[float] = None  # on the active clock (see ProgressModel._clock)
+    seconds: float = 0.0  # active time once finished
+    finished: bool = False
+    eta: Optional[float] = None  # smoothed seconds left
+    eta_at: float = 0.0
+
+    @property
+    def fraction(self) -> float:
+        if self.finished:
+            return 1.0
+        return min(1.0, self.done / self.amount) if self.amount > 0 else 0.0
+
+    @property
+    def expected(self) -> float:
+        return self.amount / self.rate if self.rate > 0 else 0.0
+
+
+class ProgressModel:
+    """
+    One job's phases. Rippers plan() what they know up front (and re-plan as scans and probes
+    tell them more), then report advance() from their tools' progress; the model sends
+    progress, progress_step and ETAs through `report`. Safe to call from several threads.
+    """
+
+    def __init__(self, report: Callable[[dict], None], paused_seconds: Callable[[], float] = lambda: 0.0,
+                 history: Optional[ThroughputHistory] = None):
+        self._report = report
+        self._paused_seconds = paused_seconds
+        self.history = history or throughput_history
+        self.lock = threading.Lock()
+        self.phases: Dict[str, Phase] = {}
+        self._last_report = 0.0
+        self._last_progress = 0
+
+    def _clock(self) -> float:
+        """Monotonic time minus time spent paused, so a preempted encode doesn't look slow."""
+        return time.monotonic() - self._paused_seconds()
+
+    # --- plan ---
+
+    def plan(self, name: str, key: str, amount: float, rate: Optional[float] = None, overlaps: bool = False):
+        """
+        Adds a phase, or resizes one already planned (keeping what it has done). Without a
+        rate, the history for `key` supplies it and learns from the phase when it finishes.
+        """
+        learn = not rate
+        rate = rate or self.history.rate(key)
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None:
+                self.phases[name] = Phase(name, key, max(float(amount), 0.0), rate, learn, overlaps)
+            else:
+                phase.amount, phase.rate, phase.learn = max(float(amount), phase.done), rate, learn
+        self._maybe_report(force=True)
+
+    def skip(self, name: str):
+        """Drops a planned phase that turned out not to be needed (raw MKVs skip the encode)."""
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is not None and phase.started is None:
+                del self.phases[name]
+        self._maybe_report(force=True)
+
+    # --- progress ---
+
+    def start(self, name: str):
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is not None and phase.started is None:
+                phase.started = self._clock()
+        self._maybe_report(force=True)
+
+    @contextmanager
+    def running(self, name: str) -> Iterator[None]:
+        """start() and finish() around a block; an exception finishes the phase without learning from it."""
+        self.start(name)
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.finish(name, ok)
+
+    def advance(self, name: str, done: Optional[float] = None, fraction: Optional[float] = None):
+        """Sets how much of a phase is done, in its units or as a fraction."""
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None or phase.finished:
+                return
+            now = self._clock()
+            if phase.started is None:
+                phase.started = now
+            if done is None:
+                done = (fraction or 0.0) * phase.amount
+            phase.done = min(max(done, phase.done), phase.amount)
+            self._update_eta(phase, now)
+        self._maybe_report()
+
+    def finish(self, name: str, ok: bool = True):
+        """Completes a phase; a successful one teaches the history its throughput."""
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None or phase.finished:
+                return
+            now = self._clock()
+            phase.seconds = now - phase.started if phase.started is not None else 0.0
+            phase.finished, phase.done, phase.eta = True, phase.amount, 0.0
+            learn, key, amount, seconds = phase.learn, phase.key, phase.amount, phase.seconds
+        if ok and learn:
+            self.history.observe(key, amount, seconds)
+        self._maybe_report(force=True)
+
+    def _update_eta(self, phase: Phase, now: float):
+        elapsed = now - phase.started
+        rate = phase.rate
+        if elapsed > 0 and phase.done > 0:
+            # Geometric blend: history rules the first seconds, the phase's own pace after that
+            trust = min(1.0, elapsed / TRUST_SECONDS)
+            rate = phase.rate ** (1 - trust) * (phase.done / elapsed) ** trust
+        raw = (phase.amount - phase.done) / rate if rate > 0 else 0.0
+        if phase.eta is None:
+            phase.eta = raw
+        else:
+            decayed = max(0.0, phase.eta - (now - phase.eta_at))
+            phase.eta = decayed + ETA_SMOOTHING * (raw - decayed)
+        phase.eta_at = now
+
+    # --- estimates ---
+
+    def _remaining(self, phase: Phase, now: float) -> float:
+        if phase.finished:
+            return 0.0
+        if phase.started is None:
+            return phase.expected
+        if phase.eta is None:
+            return max(0.0, phase.expected - (now - phase.started))
+        return max(0.0, phase.eta - (now - phase.eta_at))
+
+    def estimate(self) -> dict:
+        """Percent done (share of expected time), job ETA and per-phase figures, in seconds of active time."""
+        with self.lock:
+            now = self._clock()
+            phases, spent, left, eta = [], 0.0, 0.0, 0.0
+            for phase in self.phases.values():
+                remaining = self._remaining(phase, now)
+                elapsed = phase.seconds if phase.finished else (now - phase.started if phase.started is not None else 0.0)
+                spent += elapsed
+                left += remaining
+                # Overlapping phases run in parallel with the one before; the job waits for the longer
+                eta = max(eta, remaining) if phase.overlaps else eta + remaining
+                phases.append({
+                    "name": phase.name,
+                    "progress": round(phase.fraction * 100, 1),
+                    "eta_seconds": round(remaining),
+                    "expected_seconds": round(elapsed + remaining),
+                    "state": "done" if phase.finished else "running" if phase.started is not None else "planned",
+                })
+            active = next((p for p in self.phases.values() if p.started is not None and not p.finished), None)
+        total = spent + left
+        return {
+            "progress": spent / total * 100 if total > 0 else 0.0,
+            "eta_seconds": eta,
+            "step": active.fraction * 100 if active else None,
+            "phases": phases,
+        }
+
+    def _maybe_report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < REPORT_INTERVAL:
+            return
+        estimate = self.estimate()
+        # Never backwards and never done early: the tracker sets 100 once the job has finished
+        progress = min(99, max(self._last_progress, int(estimate["progress"])))
+        self._last_report, self._last_progress = now, progress
+        fields = {
+            "progress": progress,
+            "eta_seconds": round(estimate["eta_seconds"]),
+            "eta_at": round(time.time() + estimate["eta_seconds"]),
+            "progress_phases": estimate["phases"],
+        }
+        if estimate["step"] is not None:
+            fields["progress_step"] = int(estimate["step"])
+        self._report(fields)
+
+
+# Singleton
+throughput_history = ThroughputHistory()
@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+LOG_LINES = 15
+
+# Fields every job has; anything else a ripper reports (checksums, tracks, finalize, ...) goes to `extra`
+JOB_FIELDS = (
+    "job_id", "disc_type", "drive", "disc_label", "temp_folder", "output_folder",
+    "start_time", "end_time", "read_end_time", "operation", "status",
+    "progress", "progress_step", "batch_id",
+)
+
+
+class JobRecord:
+    """
+    Mutable state of one job, written by its ripper thread(s) through apply().
+    Readers get snapshot(): a plain dict built at most once per version and never
+    mutated afterwards, so it can be shared, cached and serialized without a lock.
+    """
+    __slots__ = (*JOB_FIELDS, "stdout_log", "timeline", "extra", "version", "_lock", "_snapshot")
+
+    def __init__(self, job_id: str, **fields):
+        for name in JOB_FIELDS:
+            setattr(self, name, None)
+        self.job_id = job_id
+        self.operation = "Initializing"
+        self.status = "Queued for processing"
+        self.progress = 0
+        self.progress_step = 0
+        self.stdout_log: deque = deque(maxlen=LOG_LINES)
+        self.timeline: list = []
+        self.extra: Dict[str, Any] = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot: Optional[dict] = None
+        for name, value in fields.items():
+            self._set(name, value)
+
+    def _set(self, key: str, value: Any):
+        if key == "log":
+            self.stdout_log.append(str(value))
+        elif key == "timeline_event":
+            self.timeline.append(value)
+        elif key == "timeline":
+            self.timeline = list(value)
+        elif key in JOB_FIELDS and key != "job_id":
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def apply(self, payload: Dict[str, Any]) -> int:
+        with self._lock:
+            for key, value in payload.items():
+                self._set(key, value)
+            self.version += 1
+            self._snapshot = None
+            return self.version
+
+    def snapshot(self) -> dict:
+        snap = self._snapshot
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snapshot is None:
+                snap = {name: getattr(self, name) for name in JOB_FIELDS}
+                snap.update(self.extra)
+                snap["stdout_log"] = list(self.stdout_log)
+                snap["timeline"] = list(self.timeline)
+                snap["version"] = self.version
+                self._snapshot = snap
+            return self._snapshot
+
+    @property
+    def active(self) -> bool:
+        return self.status not in ("completed", "failed", "cancelled")
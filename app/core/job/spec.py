@@ -0,0 +1,15 @@
+from dataclasses import dataclass, field
+import time
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """
+    Everything a ripper needs to know about its job, resolved once in JobTracker.start_job
+    and handed unchanged to the ripper that executes it.
+    """
+    job_id: str
+    drive_path: str
+    disc_type: str
+    disc_label: str = "UNTITLED"
+    created_at: float = field(default_factory=time.time)
@@ -0,0 +1,116 @@
+"""
+Per-job phase timeline. A span covers one phase (scan, read title 2, transcode
+title 2, compress, ...) with wall time, bytes and the CPU time of the child
+processes it waited on. Spans are stored on the job and can be exported as a
+Chrome trace (chrome://tracing, ui.perfetto.dev).
+"""
+import os
+import subprocess
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, category: str = "job", **args):
+        self.name = name
+        self.category = category
+        self.args = dict(args)
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.bytes = 0
+        self.cpu_user = 0.0
+        self.cpu_system = 0.0
+        self.max_rss_kb = 0
+        self.processes = 0
+        self.thread = threading.current_thread().name
+
+    def add_rusage(self, usage):
+        self.cpu_user += usage.ru_utime
+        self.cpu_system += usage.ru_stime
+        self.max_rss_kb = max(self.max_rss_kb, usage.ru_maxrss)
+        self.processes += 1
+
+    def finish(self) -> dict:
+        self.end = self.end or time.time()
+        return self.as_dict()
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "category": self.category,
+            "start": self.start,
+            "end": self.end,
+            "thread": self.thread,
+            "bytes": self.bytes,
+            "cpu_user": round(self.cpu_user, 3),
+            "cpu_system": round(self.cpu_system, 3),
+            "max_rss_kb": self.max_rss_kb,
+            "processes": self.processes,
+            "args": self.args,
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def enter_span(span: Span):
+    return _current_span.set(span)
+
+
+def exit_span(token):
+    _current_span.reset(token)
+
+
+def wait_process(process: subprocess.Popen) -> int:
+    """
+    Popen.wait() that reaps the child with wait4 so its rusage can be charged to the
+    span open in the calling thread. Falls back to a plain wait if something else
+    already reaped it.
+    """
+    if process.returncode is not None:
+        return process.returncode
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    span = _current_span.get()
+    if span is not None:
+        span.add_rusage(usage)
+    return process.returncode
+
+
+def to_chrome_trace(job: dict) -> dict:
+    """Converts a job's timeline into Chrome trace-event JSON; one track per worker thread."""
+    events = job.get("timeline") or []
+    origin = min((e["start"] for e in events), default=job.get("start_time", 0))
+    lanes: dict[str, int] = {}
+    trace = []
+    for event in events:
+        tid = lanes.setdefault(event.get("thread", "main"), len(lanes) + 1)
+        end = event.get("end") or time.time()
+        args = dict(event.get("args") or {})
+        for key in ("bytes", "cpu_user", "cpu_system", "max_rss_kb", "processes"):
+            if event.get(key):
+                args[key] = event[key]
+        if event.get("bytes") and end > event["start"]:
+            args["mb_per_s"] = round(event["bytes"] / (end - event["start"]) / 1e6, 2)
+        trace.append({
+            "name": event["name"],
+            "cat": event.get("category", "job"),
+            "ph": "X",
+            "ts": int((event["start"] - origin) * 1e6),
+            "dur": int((end - event["start"]) * 1e6),
+            "pid": 1,
+            "tid": tid,
+            "args": args,
+        })
+    trace.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"{job.get('disc_label', 'job')} ({job.get('job_id')})"}})
+    for thread, tid in lanes.items():
+        trace.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}})
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
@@ -1,97 +1,333 @@
+import itertools
+import logging
 import os
 import threading
 import time
 import uuid
-from collections import deque
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
+from app.core.batch import batch_manager
+from app.core.catalog import catalog
 from app.core.drivemanager import drive_manager
-from app.core.rippers.cd import CdRipper
-from app.core.rippers.dvd import DvdRipper
-from app.core.rippers.bluray import BlurayRipper
-from app.core.rippers.other import IsoRipper
+from app.core.encoding import dumps, etag_for
 from app.core.job.api_helpers import update_job
+from app.core.job.control import KILL_GRACE, JobControl
+from app.core.job.record import JobRecord
+from app.core.job.spec import JobSpec
+from app.core.job.timeline import Span
+from app.core.metadata.index import disc_fingerprint, disc_index
+from app.core.metrics import QUEUE_DEPTH
+from app.core.rippers import get_ripper
+
+PRIORITIES = ("low", "normal", "high")
+FINISHED = ("completed", "failed", "cancelled")
 
-RIPPER_MAP = {
-    "audio_cd": CdRipper,
-    "dvd_video": DvdRipper,
-    "bluray_video": BlurayRipper,
-    "cd_rom": IsoRipper,
-    "dvd_rom": IsoRipper,
-    "bluray_rom": IsoRipper,
-    "otherdisc": IsoRipper,
-}
 
 class JobTracker:
     def __init__(self):
-        self.jobs: Dict[str, Dict] = {}
+        self.jobs: Dict[str, JobRecord] = {}
+        self.controls: Dict[str, JobControl] = {}
+        self._preempting: set = set()  # high-priority jobs still running; other jobs' encodes wait for them
         self.lock = threading.Lock()
         self.drive_manager = drive_manager
+        # Bumped on every job change; the encoded /api/jobs payload is rebuilt only when it moves
+        self._generations = itertools.count(1)
+        self.generation = 0
+        self._encoded: Tuple[int, str, bytes] = (-1, "", b"")
+        batch_manager.start_job = self.start_job
+        QUEUE_DEPTH.labels("jobs_active").set_function(
+            lambda: sum(1 for j in list(self.jobs.values()) if j.active)
+        )
 
-    def start_job(self, drive_path: str, disc_type: str) -> str:
+    def start_job(self, drive_path: str, disc_type: str, priority: str = "normal") -> str:
+        """priority "high" pauses the background encodes of every other job until this one is done."""
         job_id = str(uuid.uuid4())
         drive_path = os.path.realpath(drive_path)
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
 
         if not self.drive_manager.is_available(drive_path):
             raise ValueError(f"Drive {drive_path} is not available.")
 
-        ripper_cls = RIPPER_MAP.get(disc_type)
+        ripper_cls = get_ripper(disc_type)
         if not ripper_cls:
             raise ValueError(f"Unsupported disc type: {disc_type}")
 
-        ripper = ripper_cls(job_id, drive_path)
+        # Resolve the disc identity once, from the shared registry, and hand the same spec to the ripper
+        detect = Span("detect", "detect", drive=drive_path, disc_type=disc_type)
+        spec = JobSpec(
+            job_id=job_id,
+            drive_path=drive_path,
+            disc_type=disc_type,
+            disc_label=self.drive_manager.describe(drive_path).get("disc_label", "UNTITLED"),
+        )
+        ripper = ripper_cls(spec)
+        ripper.ctx.on_read_complete = lambda ok: self._on_read_complete(spec, ok)
+        control = ripper.ctx.control
+        control.priority = priority
+        control.on_stopped = lambda: self._on_stopped(job_id)
+        if getattr(ripper, "tiers", None) is not None:
+            control.add_cleanup(ripper.tiers.cleanup)
         self.drive_manager.mark_busy(drive_path, job_id)
+        batch_id = batch_manager.attach(job_id, drive_path)
+        detect.args["disc_label"] = spec.disc_label
 
+        record = JobRecord(
+            job_id,
+            disc_type=disc_type,
+            drive=drive_path,
+            disc_label=ripper.disc_label,
+            temp_folder=getattr(ripper, "temp_dir", None),
+            output_folder=getattr(ripper, "output_dir", None),
+            start_time=spec.created_at,
+            batch_id=batch_id,
+            timeline=[detect.finish()],
+            priority=priority,
+            paused=False,
+        )
+        thread = control.thread(self._run_job, spec, ripper, name=f"job-{job_id[:8]}")
         with self.lock:
-            self.jobs[job_id] = {
-                "job_id": job_id,
-                "disc_type": disc_type,
-                "drive": drive_path,
-                "disc_label": ripper.disc_label,
-                "temp_folder": getattr(ripper, "temp_dir", None),
-                "output_folder": getattr(ripper, "output_dir", None),
-                "start_time": time.time(),
-                "operation": "Initializing",
-                "status": "Queued for processing",
-                "progress": 0,
-                "progress_step": 0,
-                "stdout_log": deque(maxlen=15)
-            }
-
-        threading.Thread(target=self._run_job, args=(job_id, drive_path, disc_type)).start()
+            self.jobs[job_id] = record
+            self.controls[job_id] = control
+            holds = [] if priority == "high" else list(self._preempting)
+        for holder in holds:
+            control.pause(f"preempt:{holder}")
+        self.generation = next(self._generations)
+        if priority == "high":
+            self._preempt(job_id)
+
+        thread.start()
         return job_id
 
-    def _run_job(self, job_id: str, drive_path: str, disc_type: str):
+    def _run_job(self, spec: JobSpec, ripper):
+        job_id = spec.job_id
         job = self.jobs.get(job_id)
         if not job:
             return
 
         try:
-            ripper_cls = RIPPER_MAP.get(disc_type)
-            if not ripper_cls:
-                update_job(job_id, log="❌ Unknown disc type", status="failed", progress=100)
+            if self._skip_duplicate(spec, ripper):
+                update_job(job_id, status="completed", progress=100, end_time=time.time())
                 return
 
-            ripper = ripper_cls(job_id, drive_path)
             for log in ripper.rip():
-                update_job(job_id, log=log)
+                update_job(job_id, wait=False, log=log)
 
-            update_job(job_id, status="completed", progress=100, end_time=time.time())
+            # Done means the archive exists: background compression outlives rip()
+            ripper.ctx.control.join_background()
+            # A cancelled job's final state is set once its last thread stops (see _on_stopped)
+            ripper.ctx.control.check()
+            if ripper.ctx.background_error:
+                update_job(job_id, status="failed", progress=100, end_time=time.time())
+            else:
+                update_job(job_id, status="completed", progress=100, end_time=time.time())
         except Exception as e:
             update_job(job_id, log=f"❌ Error: {e}", status="failed", progress=100, end_time=time.time())
         finally:
-            self.drive_manager.mark_free(drive_path)
+            # Frees only this job's mapping; the drive may already be running the next disc
+            self.drive_manager.free_drive_by_job(job_id)
 
-    def get_job_status(self, job_id: str) -> Optional[Dict]:
+    def _skip_duplicate(self, spec: JobSpec, ripper) -> bool:
+        """
+        Fingerprints the disc from a few raw sectors and checks it against the archive index.
+        True when the duplicate policy says not to rip it; the drive is released (and the
+        disc ejected) before the first full read would have started.
+        """
+        policy = disc_index.policy
+        if policy == "off":
+            return False
+        with ripper.ctx.phase("fingerprint", "detect") as span:
+            fingerprint = disc_fingerprint(spec.drive_path, spec.disc_type)
+            span.args["fingerprint"] = fingerprint["id"] if fingerprint else None
+        if fingerprint is None:
+            return False
+        ripper.ctx.set_progress(disc_fingerprint=fingerprint)
+        duplicate = disc_index.lookup(fingerprint)
+        if duplicate is None:
+            return False
+
+        archived = time.strftime("%Y-%m-%d %H:%M", time.localtime(duplicate["archived_at"]))
+        ripper.ctx.set_progress(duplicate_of=duplicate)
+        ripper.ctx.log(f"♻️ Already archived {archived} by job {duplicate['job_id'][:8]}: {duplicate['output']}")
+        if policy == "flag":
+            return False
+
+        ripper.ctx.set_progress(operation="Skipped", status="Duplicate disc", skipped=True)
+        session = batch_manager.session_for_drive(spec.drive_path)
+        if policy == "eject" and not (session and session.auto_eject):  # a batch swaps the disc itself
+            try:
+                batch_manager.changer.eject(spec.drive_path)
+            except Exception as e:
+                logging.warning(f"[DiscIndex] Eject of {spec.drive_path} failed: {e}")
+        ripper.ctx.read_complete(True)
+        return True
+
+    def _on_finished(self, record: JobRecord):
+        """Catalogs and indexes a successfully archived disc, or drops its index entry if a later stage failed."""
+        snap = record.snapshot()
+        fingerprint = snap.get("disc_fingerprint")
+        if snap.get("skipped"):
+            return
+        if snap["status"] in ("failed", "cancelled") or snap["operation"] == "failed":
+            if fingerprint:
+                disc_index.forget_job(record.job_id)
+            return
+        output = snap.get("output_file") or snap.get("output_folder")
+        if not output or not os.path.exists(output):
+            return
+        catalog.index_output(output, snap)
+        if fingerprint:
+            disc_index.record(fingerprint, snap, output)
+
+    def _on_read_complete(self, spec: JobSpec, ok: bool):
+        """The disc is no longer needed: release the drive and let a batch swap in the next one."""
+        self.drive_manager.free_drive_by_job(spec.job_id)
+        batch_manager.on_read_complete(spec.job_id, spec.drive_path, time.time() - spec.created_at, ok)
+
+    def update_job(self, job_id: str, payload: Dict) -> bool:
+        """Applies a PATCH from a ripper; "log" and "timeline_event" append instead of replace."""
+        record = self.jobs.get(job_id)
+        if record is None:
+            return False
+        control = self.controls.get(job_id)
+        if control is not None and control.cancelled.is_set() and payload.get("status") in ("completed", "failed"):
+            # A killed process looks like a failure to the ripper; the job is cancelled, not failed
+            payload = {k: v for k, v in payload.items() if k not in ("status", "operation")}
+        record.apply(payload)
+        self.generation = next(self._generations)
+        if payload.get("status") in FINISHED:
+            self._on_finished(record)
+        return True
+
+    # --- cancellation and preemption ---
+
+    def cancel_job(self, job_id: str, reason: str = "Cancelled by user", wait: float = 0) -> bool:
+        """
+        Terminates the job's processes, stops it at its next phase and removes its temp files.
+        False if the job is unknown or already done; `wait` blocks until it stopped, up to that many seconds.
+        """
+        control = self.controls.get(job_id)
+        if control is None or control.cancelled.is_set() or control.stopped.is_set():
+            return False
+        # Before the signals: the job may stop, and be marked cancelled, right after them
+        self.update_job(job_id, {"operation": "Cancelling", "status": reason, "log": f"🛑 {reason}"})
+        if not control.cancel(reason):
+            return False
+        if wait:
+            control.stopped.wait(wait)
+        return True
+
+    def cancel_all(self, reason: str):
+        """Cancels every running job and waits for their processes to go (server shutdown)."""
+        cancelled = [job_id for job_id in list(self.controls) if self.cancel_job(job_id, reason)]
+        deadline = time.monotonic() + KILL_GRACE + 1
+        for job_id in cancelled:
+            self.controls[job_id].stopped.wait(max(0.0, deadline - time.monotonic()))
+
+    def pause_job(self, job_id: str) -> bool:
+        """Stops the job's encodes and compression with SIGSTOP; disc reads are not paused."""
+        control = self.controls.get(job_id)
+        if control is None or not control.alive:
+            return False
+        if control.pause("manual"):
+            self.update_job(job_id, {"paused": control.paused, "log": "⏸️ Paused"})
+        return True
+
+    def resume_job(self, job_id: str) -> bool:
+        control = self.controls.get(job_id)
+        if control is None or not control.alive:
+            return False
+        control.resume("manual")
+        self.update_job(job_id, {"paused": control.paused, "log": "▶️ Resumed" if not control.paused else "⏸️ Still held by a high-priority job"})
+        return True
+
+    def _preempt(self, job_id: str):
+        """Pauses every other job's preemptible processes so a high-priority job gets the CPU."""
         with self.lock:
-            job = self.jobs.get(job_id)
-            if not job:
-                return None
-
-            now = time.time()
-            end_time = job.get("end_time")
-            job["elapsed_time"] = (end_time or now) - job["start_time"]
-            return job
+            self._preempting.add(job_id)
+            others = [(other_id, c) for other_id, c in self.controls.items() if other_id != job_id and c.priority != "high" and c.alive]
+        for other_id, control in others:
+            if control.pause(f"preempt:{job_id}"):
+                self.update_job(other_id, {"paused": control.paused, "log": f"⏸️ Paused for high-priority job {job_id[:8]}"})
+
+    def _on_stopped(self, job_id: str):
+        """The job's last thread exited: release its preemption holds and finish a cancelled job."""
+        control = self.controls[job_id]
+        with self.lock:
+            preempting = job_id in self._preempting
+            self._preempting.discard(job_id)
+            others = [(other_id, c) for other_id, c in self.controls.items() if other_id != job_id]
+        if preempting:
+            for other_id, other in others:
+                if other.resume(f"preempt:{job_id}"):
+                    self.update_job(other_id, {"paused": False, "log": f"▶️ Resumed after job {job_id[:8]}"})
+        if control.cancelled.is_set():
+            self.update_job(job_id, {
+                "status": "cancelled", "operation": "cancelled", "paused": False, "end_time": time.time(),
+                "log": "🧹 Cancelled, processes stopped and temp files removed",
+            })
+
+    def get_job_status(self, job_id: str) -> Optional[Dict]:
+        record = self.jobs.get(job_id)
+        if record is None:
+            return None
+        return self._with_elapsed(record.snapshot(), time.time())
+
+    def encoded_job(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        """
+        One job's /jobs/{id}/json body and its ETag. elapsed_time changes on every read, so the
+        ETag is taken over the snapshot without it and a poll of an unchanged running job gets a 304.
+        """
+        record = self.jobs.get(job_id)
+        if record is None:
+            return None
+        snap = record.snapshot()
+        return etag_for(dumps(snap)), dumps(self._with_elapsed(snap, time.time()))
+
+    def time_to_done(self, job_id: str) -> Optional[float]:
+        """Seconds until the job should be done (background stages included): 0 once it is, None before any estimate."""
+        record = self.jobs.get(job_id)
+        if record is None:
+            return None
+        snap = record.snapshot()
+        if snap["status"] in FINISHED:
+            return 0.0
+        eta_at = snap.get("eta_at")
+        return max(0.0, eta_at - time.time()) if eta_at else None
+
+    def batch_eta(self, job_ids: List[str]) -> Optional[float]:
+        """Jobs run side by side, so a batch is done when its slowest job is."""
+        etas = [self.time_to_done(job_id) for job_id in job_ids]
+        known = [eta for eta in etas if eta is not None]
+        return max(known) if known else None
+
+    def list_jobs(self) -> List[Dict]:
+        now = time.time()
+        return [self._with_elapsed(r.snapshot(), now) for r in list(self.jobs.values())]
+
+    def encoded_jobs(self) -> Tuple[str, bytes]:
+        """
+        The /api/jobs body and its ETag. Snapshots are only re-taken for jobs whose version changed and
+        the JSON is only re-encoded when any job changed, so polling dashboards cost a dict lookup.
+        The timeline is left out here; it is served per job by /jobs/{id}/json and /trace.
+        """
+        generation = self.generation
+        cached_generation, etag, body = self._encoded
+        if cached_generation == generation:
+            return etag, body
+        jobs = []
+        for record in list(self.jobs.values()):
+            snap = record.snapshot()
+            jobs.append({k: v for k, v in snap.items() if k != "timeline"})
+        body = dumps(jobs)
+        etag = etag_for(body)
+        self._encoded = (generation, etag, body)
+        return etag, body
+
+    @staticmethod
+    def _with_elapsed(snap: Dict, now: float) -> Dict:
+        # Snapshots are shared between readers, so elapsed_time goes on a copy
+        return {**snap, "elapsed_time": (snap.get("end_time") or now) - (snap.get("start_time") or now)}
 
 
 # Singleton
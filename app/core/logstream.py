@@ -1,13 +1,17 @@
 import subprocess
 from typing import Callable
+from app.core.job.control import spawn
+from app.core.job.timeline import wait_process
 
 def stream_subprocess(
     command: list[str],
     on_output: Callable[[str], None] = None,
-    capture_output: bool = False
+    capture_output: bool = False,
+    preemptible: bool = False
 ) -> tuple[int, str | None]:
-    process = subprocess.Popen(
+    process = spawn(
         command,
+        preemptible,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
@@ -25,5 +29,5 @@ def stream_subprocess(
                 captured.append(line)
 
     process.stdout.close()
-    returncode = process.wait()
+    returncode = wait_process(process)
     return (returncode, "\n".join(captured) if capture_output else None)
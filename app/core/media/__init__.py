@@ -0,0 +1,4 @@
+from app.core.media.mkv import MkvError, MkvInfo, MkvTrack, probe_mkv
+from app.core.media.remux import EncodeRates, RemuxPlan, RemuxPolicy, RemuxStats, TrackSelection
+from app.core.media.analysis import EncodeAnalyzer, EncodeSettings, series_name, title_fingerprint
+from app.core.media.chunks import ChunkPolicy, encode_chunked
@@ -0,0 +1,147 @@
+"""
+Pre-encode analysis per title: a HandBrake scan for autocrop and combing, then a few
+short sample encodes at the preset's quality whose bitrate shows how hard the title is
+to compress. The RF is moved toward a target bitrate from that. Results are cached by
+series fingerprint, so later discs and episodes of the same show skip the sampling.
+"""
+import math
+import os
+import re
+import statistics
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.cache import TtlCache
+from app.core.media.preset import load_preset
+
+ANALYSIS_TTL = 180 * 86400
+DEFAULT_RF = 22.0  # HandBrake's built-in presets encode around RF 20-22
+RF_PER_DOUBLING = 6.0  # x264/x265: +6 RF roughly halves the bitrate
+RF_MIN_OFFSET, RF_MAX_OFFSET = -4.0, 6.0
+SCAN_PREVIEWS = 20
+
+# Trailing label tokens that tell discs/episodes of one series apart: S1, D2, S01E03, DISC_1, VOL 2, 1994
+SERIES_SUFFIX = re.compile(
+    r"^(?:(?:s|d|e|ep|disc|disk|dvd|bd|cd|season|vol|volume|part|pt)?\d+)+$|^(?:disc|disk|season|vol|volume|part)$"
+)
+
+
+def series_name(label: str) -> str:
+    tokens = [t for t in re.split(r"[\W_]+", label.lower()) if t]
+    while len(tokens) > 1 and SERIES_SUFFIX.match(tokens[-1]):
+        tokens.pop()
+    return "_".join(tokens)
+
+
+def title_fingerprint(label: str, width: int, height: int, duration: float) -> str:
+    """Series, picture size and a duration bucket (quarter octaves), so a show's episodes share a key."""
+    bucket = round(math.log2(max(duration, 60) / 60) * 4)
+    return f"{series_name(label)}|{width}x{height}|{bucket}"
+
+
+@dataclass
+class EncodeSettings:
+    crop: Optional[tuple[int, int, int, int]]  # top/bottom/left/right
+    interlaced: bool
+    quality: Optional[float]  # RF; None keeps the preset's
+    sample_mbps: float = 0.0
+    cached: bool = False
+
+    def handbrake_args(self) -> list[str]:
+        args = []
+        if self.crop is not None:
+            args += ["--crop", ":".join(map(str, self.crop))]
+        if self.interlaced:
+            args += ["--comb-detect", "--decomb"]
+        if self.quality is not None:
+            args += ["-q", f"{self.quality:g}"]
+        return args
+
+    def describe(self) -> str:
+        crop = "/".join(map(str, self.crop)) if self.crop else "none"
+        quality = f"RF {self.quality:g}" if self.quality is not None else "preset quality"
+        sampled = f", samples {self.sample_mbps:.1f} Mbit/s" if self.sample_mbps else ""
+        return f"crop {crop}, {'interlaced' if self.interlaced else 'progressive'}, {quality}{sampled}{' (cached)' if self.cached else ''}"
+
+    def as_dict(self) -> dict:
+        return {
+            "crop": list(self.crop) if self.crop else None,
+            "interlaced": self.interlaced,
+            "quality": self.quality,
+            "sample_mbps": round(self.sample_mbps, 2),
+            "cached": self.cached,
+        }
+
+
+class EncodeAnalyzer:
+    def __init__(self, path: str, samples: int = 3, sample_seconds: float = 5, target_mbps: float = 0.0,
+                 reference_rf: Optional[float] = DEFAULT_RF):
+        self.store = TtlCache(path, ANALYSIS_TTL)
+        self.samples = samples
+        self.sample_seconds = sample_seconds
+        self.target_mbps = target_mbps
+        self.reference_rf = reference_rf  # None for average-bitrate presets: nothing to tune
+
+    @classmethod
+    def from_config(cls, config, section: str) -> Optional["EncodeAnalyzer"]:
+        if config.get(section, "analysis", fallback="true").lower() != "true":
+            return None
+        preset = load_preset(config, section)
+        reference_rf = DEFAULT_RF
+        if preset is not None:
+            reference_rf = float(preset["VideoQualitySlider"]) if preset.get("VideoQualityType") == 2 and "VideoQualitySlider" in preset else None
+        return cls(
+            config.get("General", "analysispath", fallback="~/.cache/TKDiscRipper/analysis.json"),
+            samples=config.getint(section, "analysissamples", fallback=3),
+            sample_seconds=config.getfloat(section, "analysisseconds", fallback=5),
+            target_mbps=config.getfloat(section, "targetmbps", fallback=0),
+            reference_rf=reference_rf,
+        )
+
+    @property
+    def tunes_quality(self) -> bool:
+        return self.reference_rf is not None and self.target_mbps > 0 and self.samples > 0
+
+    def quality_for(self, sample_mbps: float) -> Optional[float]:
+        """RF that moves the sampled bitrate toward the target, within a few steps of the preset's."""
+        if not self.tunes_quality or sample_mbps <= 0:
+            return None
+        offset = RF_PER_DOUBLING * math.log2(sample_mbps / self.target_mbps)
+        offset = min(max(offset, RF_MIN_OFFSET), RF_MAX_OFFSET)
+        return round((self.reference_rf + offset) * 2) / 2
+
+    def analyze(self, hb, path: str, label: str, workdir: str) -> Optional[EncodeSettings]:
+        """Settings for one title, from cache or a scan plus sample encodes; None if HandBrake can't scan it."""
+        try:
+            scan = hb.scan(path, previews=SCAN_PREVIEWS)
+        except OSError:
+            return None
+        if scan is None:
+            return None
+        key = title_fingerprint(label, scan.width, scan.height, scan.duration)
+        cached = self.store.get(key)
+        if cached and (cached["sample_mbps"] or not self.tunes_quality):
+            crop = tuple(cached["crop"]) if cached["crop"] else None
+            return EncodeSettings(crop, cached["interlaced"], self.quality_for(cached["sample_mbps"]), cached["sample_mbps"], cached=True)
+
+        settings = EncodeSettings(scan.crop, scan.combed, None)
+        if self.tunes_quality:
+            settings.sample_mbps = self._sample(hb, path, scan.duration, settings, workdir)
+            settings.quality = self.quality_for(settings.sample_mbps)
+        self.store.set(key, {"crop": list(scan.crop) if scan.crop else None, "interlaced": scan.combed, "sample_mbps": settings.sample_mbps})
+        return settings
+
+    def _sample(self, hb, path: str, duration: float, settings: EncodeSettings, workdir: str) -> float:
+        """Median video bitrate (Mbit/s) of evenly spread sample encodes at the reference RF; 0 if none worked."""
+        seconds = int(min(self.sample_seconds, duration / (self.samples + 1)))  # HandBrake takes whole seconds
+        if seconds < 1:
+            return 0.0
+        args = EncodeSettings(settings.crop, settings.interlaced, self.reference_rf).handbrake_args()
+        rates = []
+        with tempfile.TemporaryDirectory(prefix="analysis-", dir=workdir) as tmp:
+            for i in range(1, self.samples + 1):
+                out = os.path.join(tmp, f"sample{i}.mkv")
+                if hb.sample(path, out, duration * i / (self.samples + 1), seconds, args):
+                    rates.append(os.path.getsize(out) * 8 / seconds / 1e6)
+        return statistics.median(rates) if rates else 0.0
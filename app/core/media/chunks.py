@@ -0,0 +1,126 @@
+"""
+Split encoding of long titles: the video track is cut at keyframes (preferring chapter
+starts), the pieces are encoded by parallel HandBrake processes and appended back into
+one track. Audio and subtitles never go through the pieces; they are copied from the
+source in one piece, so there are no gaps or priming samples at the seams.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from app.core.job.control import bound
+from app.core.media.mkv import MkvInfo
+from app.core.media.preset import load_preset
+from app.core.media.remux import TrackSelection
+
+CHAPTER_SNAP = 0.25  # move a cut to a chapter start within this fraction of a chunk's length
+
+
+@dataclass
+class ChunkPolicy:
+    chunks: int
+    min_seconds: float = 1800
+    tracks: TrackSelection = field(default_factory=TrackSelection)
+
+    @classmethod
+    def from_config(cls, config, section: str) -> Optional["ChunkPolicy"]:
+        """None unless chunkedencode asks for two or more chunks and the output is Matroska."""
+        chunks = config.getint(section, "chunkedencode", fallback=0)
+        if chunks < 2 or config.get(section, "handbrakeformat", fallback="mkv").lower() != "mkv":
+            return None
+        preset = load_preset(config, section)
+        return cls(
+            chunks=chunks,
+            min_seconds=config.getfloat(section, "chunkminminutes", fallback=30) * 60,
+            tracks=TrackSelection.from_preset(preset) if preset else TrackSelection(),
+        )
+
+    def split_points(self, info: MkvInfo) -> List[float]:
+        """Cut times in seconds, evenly spaced or snapped to a nearby chapter; [] if the title is too short."""
+        if info.video is None or info.duration < max(self.min_seconds, 1):
+            return []
+        length = info.duration / self.chunks
+        points = []
+        for i in range(1, self.chunks):
+            target = i * length
+            near = [c for c in info.chapters if abs(c - target) <= length * CHAPTER_SNAP]
+            points.append(min(near, key=lambda c: abs(c - target)) if near else target)
+        return sorted({p for p in points if 0 < p < info.duration})
+
+
+def encode_chunked(
+    hb,
+    mkvmerge,
+    info: MkvInfo,
+    output_path: str,
+    points: List[float],
+    tracks: TrackSelection,
+    extra_args: List[str],
+    workdir: str,
+    log: Callable[[str], None],
+    on_progress: Optional[Callable[[float], None]] = None,
+    phase=None,
+) -> bool:
+    """
+    Encodes info.path into output_path in len(points) + 1 parallel pieces. `phase` is an
+    optional JobContext.phase for per-step timeline spans; on_progress gets percent done.
+    """
+    name = os.path.basename(info.path)
+    tmp = tempfile.mkdtemp(prefix="chunks-", dir=workdir)
+    try:
+        with _phase(phase, f"split {name}", "transcode", chunks=len(points) + 1):
+            parts = mkvmerge.split(info.path, os.path.join(tmp, "part.mkv"), points, log)
+        if len(parts) < 2:
+            log(f"⚠️ Splitting {name} produced {len(parts)} parts")
+            return False
+
+        sizes = [os.path.getsize(p) for p in parts]
+        total = sum(sizes) or 1
+        done = [0.0] * len(parts)
+        lock = threading.Lock()
+
+        def encode(index: int) -> Optional[str]:
+            out = os.path.join(tmp, f"encoded-{index:03}.mkv")
+
+            def progress(pct: float):
+                with lock:
+                    done[index] = sizes[index] * pct / 100
+                    overall = 100 * sum(done) / total
+                if on_progress:
+                    on_progress(overall)
+
+            with _phase(phase, f"transcode {name} part {index + 1}/{len(parts)}", "transcode", input=parts[index]) as span:
+                ok = hb.encode_file(parts[index], out, [*extra_args, "-a", "none", "-s", "none"], progress)
+                if span is not None and ok:
+                    span.bytes = os.path.getsize(out)
+                elif span is not None:
+                    span.args["failed"] = True
+            return out if ok else None
+
+        with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="chunk") as pool:
+            encoded = list(pool.map(bound(encode), range(len(parts))))
+        failed = [os.path.basename(parts[i]) for i, out in enumerate(encoded) if out is None]
+        if failed:
+            log(f"❌ HandBrake failed on {', '.join(failed)} of {name}")
+            return False
+
+        audio, subtitles = tracks.apply(info)
+        with _phase(phase, f"concat {name}", "transcode") as span:
+            ok = mkvmerge.concat(
+                encoded, info.path, output_path,
+                [info.tracks.index(t) for t in audio], [info.tracks.index(t) for t in subtitles], log,
+            )
+            if span is not None and ok:
+                span.bytes = os.path.getsize(output_path)
+        return ok
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _phase(phase, name: str, category: str, **args):
+    return phase(name, category, **args) if phase else nullcontext()
@@ -0,0 +1,258 @@
+"""
+Minimal Matroska (EBML) reader: segment info, track headers and chapter starts. Clusters are
+skipped by seeking over them, so probing a 40 GB MKV reads a few kilobytes.
+
+    python -m app.core.media.mkv title_t00.mkv
+"""
+import json
+import os
+import struct
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TRACKS = 0x1654AE6B
+CLUSTER = 0x1F43B675
+CHAPTERS = 0x1043A770
+EDITION_ENTRY = 0x45B9
+CHAPTER_ATOM = 0xB6
+CHAPTER_TIME_START = 0x91
+SEEK_HEAD = 0x114D9B74
+VOID = 0xEC
+TAGS = 0x1254C367
+ATTACHMENTS = 0x1941A469
+CUES = 0x1C53BB6B
+HEADER_ELEMENTS = {SEEK_HEAD, VOID, TAGS, ATTACHMENTS, CUES}
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+LANGUAGE = 0x22B59C
+LANGUAGE_BCP47 = 0x22B59D
+NAME = 0x536E
+FLAG_DEFAULT = 0x88
+FLAG_FORCED = 0x55AA
+VIDEO = 0xE0
+AUDIO = 0xE1
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+FLAG_INTERLACED = 0x9A
+CHANNELS = 0x9F
+
+TRACK_TYPES = {1: "video", 2: "audio", 17: "subtitle"}
+CODECS = {
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_AV1": "av1",
+    "V_VP9": "vp9",
+    "V_MPEG2": "mpeg2",
+    "V_MPEG1": "mpeg1",
+    "V_MS/VFW/FOURCC": "vc1",
+}
+UNKNOWN_SIZE = -1
+HEAD_LIMIT = 64 * 1024 * 1024  # give up if Info/Tracks aren't found before this offset
+
+
+class MkvError(ValueError):
+    pass
+
+
+@dataclass
+class MkvTrack:
+    number: int
+    type: str
+    codec_id: str
+    language: str = "eng"  # Matroska default when the element is absent
+    name: str = ""
+    default: bool = True
+    forced: bool = False
+    width: int = 0
+    height: int = 0
+    interlaced: bool = False
+    channels: int = 0
+
+    @property
+    def codec(self) -> str:
+        return CODECS.get(self.codec_id, self.codec_id.lower())
+
+
+@dataclass
+class MkvInfo:
+    path: str
+    size: int
+    duration: float = 0.0  # seconds
+    tracks: List[MkvTrack] = field(default_factory=list)
+    chapters: List[float] = field(default_factory=list)  # start times (seconds) of the first edition
+
+    @property
+    def video(self) -> Optional[MkvTrack]:
+        return next((t for t in self.tracks if t.type == "video"), None)
+
+    def of_type(self, kind: str) -> List[MkvTrack]:
+        return [t for t in self.tracks if t.type == kind]
+
+    @property
+    def bitrate_mbps(self) -> float:
+        """Overall bitrate (all streams), an upper bound for the video stream's."""
+        return self.size * 8 / self.duration / 1e6 if self.duration else 0.0
+
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> Tuple[int, int]:
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    b = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not b & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise MkvError(f"Invalid EBML variable-length integer at {f.tell() - 1}")
+    value = b if keep_marker else b & (mask - 1)
+    rest = f.read(length - 1)
+    if len(rest) != length - 1:
+        raise EOFError
+    all_ones = value == mask - 1
+    for byte in rest:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if not keep_marker and all_ones:
+        return UNKNOWN_SIZE, length
+    return value, length
+
+
+def _elements(f: BinaryIO, end: Optional[int]) -> Iterator[Tuple[int, int, int]]:
+    """Yields (id, data offset, size) for the elements between f.tell() and end."""
+    while end is None or f.tell() < end:
+        try:
+            element_id, _ = _read_vint(f, keep_marker=True)
+            size, _ = _read_vint(f, keep_marker=False)
+        except EOFError:
+            return
+        start = f.tell()
+        yield element_id, start, size
+        if size != UNKNOWN_SIZE:
+            f.seek(start + size)
+
+
+def _uint(f: BinaryIO, size: int) -> int:
+    return int.from_bytes(f.read(size), "big") if size else 0
+
+
+def _float(f: BinaryIO, size: int) -> float:
+    data = f.read(size)
+    if size == 4:
+        return struct.unpack(">f", data)[0]
+    if size == 8:
+        return struct.unpack(">d", data)[0]
+    return 0.0
+
+
+def _string(f: BinaryIO, size: int) -> str:
+    return f.read(size).rstrip(b"\0").decode("utf-8", "replace")
+
+
+def _parse_track(f: BinaryIO, end: int) -> MkvTrack:
+    track = MkvTrack(number=0, type="", codec_id="")
+    bcp47 = None
+    for element_id, start, size in _elements(f, end):
+        if element_id == TRACK_NUMBER:
+            track.number = _uint(f, size)
+        elif element_id == TRACK_TYPE:
+            kind = _uint(f, size)
+            track.type = TRACK_TYPES.get(kind, str(kind))
+        elif element_id == CODEC_ID:
+            track.codec_id = _string(f, size)
+        elif element_id == LANGUAGE:
+            track.language = _string(f, size)
+        elif element_id == LANGUAGE_BCP47:
+            bcp47 = _string(f, size)
+        elif element_id == NAME:
+            track.name = _string(f, size)
+        elif element_id == FLAG_DEFAULT:
+            track.default = bool(_uint(f, size))
+        elif element_id == FLAG_FORCED:
+            track.forced = bool(_uint(f, size))
+        elif element_id == VIDEO:
+            for sub_id, _, sub_size in _elements(f, start + size):
+                if sub_id == PIXEL_WIDTH:
+                    track.width = _uint(f, sub_size)
+                elif sub_id == PIXEL_HEIGHT:
+                    track.height = _uint(f, sub_size)
+                elif sub_id == FLAG_INTERLACED:
+                    track.interlaced = _uint(f, sub_size) == 1
+        elif element_id == AUDIO:
+            for sub_id, _, sub_size in _elements(f, start + size):
+                if sub_id == CHANNELS:
+                    track.channels = _uint(f, sub_size)
+    if bcp47:
+        track.language = bcp47
+    return track
+
+
+def _parse_chapters(f: BinaryIO, end: int) -> List[float]:
+    for element_id, start, size in _elements(f, end):
+        if element_id == EDITION_ENTRY:
+            starts = []
+            for sub_id, sub_start, sub_size in _elements(f, start + size):
+                if sub_id == CHAPTER_ATOM:
+                    for atom_id, _, atom_size in _elements(f, sub_start + sub_size):
+                        if atom_id == CHAPTER_TIME_START:
+                            starts.append(_uint(f, atom_size) / 1e9)
+            return sorted(starts)
+    return []
+
+
+def probe_mkv(path: str) -> MkvInfo:
+    """Reads duration and track headers; raises MkvError if the file isn't Matroska."""
+    info = MkvInfo(path=path, size=os.path.getsize(path))
+    with open(path, "rb") as f:
+        header = next(_elements(f, None), None)
+        if not header or header[0] != EBML_HEADER:
+            raise MkvError(f"{path} is not an EBML file")
+        f.seek(header[1] + header[2])
+        segment = next(_elements(f, None), None)
+        if not segment or segment[0] != SEGMENT:
+            raise MkvError(f"{path} has no Matroska segment")
+        segment_end = None if segment[2] == UNKNOWN_SIZE else segment[1] + segment[2]
+
+        scale, duration = 1_000_000, 0.0
+        try:
+            for element_id, start, size in _elements(f, segment_end):
+                if element_id == INFO:
+                    for sub_id, _, sub_size in _elements(f, start + size):
+                        if sub_id == TIMESTAMP_SCALE:
+                            scale = _uint(f, sub_size)
+                        elif sub_id == DURATION:
+                            duration = _float(f, sub_size)
+                elif element_id == TRACKS:
+                    for sub_id, sub_start, sub_size in _elements(f, start + size):
+                        if sub_id == TRACK_ENTRY:
+                            info.tracks.append(_parse_track(f, sub_start + sub_size))
+                elif element_id == CHAPTERS:
+                    info.chapters = _parse_chapters(f, start + size)
+                elif element_id == CLUSTER or size == UNKNOWN_SIZE:
+                    break  # media data; header elements come before it in anything MakeMKV or mkvmerge write
+                elif info.tracks and element_id not in HEADER_ELEMENTS:
+                    break
+                if start > HEAD_LIMIT:
+                    break
+        except MkvError:
+            if not info.tracks:
+                raise  # otherwise it's whatever follows a complete header
+        info.duration = duration * scale / 1e9
+    if not info.tracks:
+        raise MkvError(f"{path}: no track headers found")
+    return info
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:]:
+        probed = probe_mkv(target)
+        print(json.dumps({**asdict(probed), "bitrate_mbps": round(probed.bitrate_mbps, 2)}, indent=2))
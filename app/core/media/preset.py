@@ -0,0 +1,19 @@
+import json
+import logging
+import os
+from typing import Optional
+
+
+def load_preset(config, section: str) -> Optional[dict]:
+    """The section's HandBrake preset from its JSON file, or None for built-in presets and unreadable files."""
+    preset_path = os.path.expanduser(config.get(section, "handbrakepreset_path", fallback="").strip())
+    if not preset_path or not os.path.isfile(preset_path):
+        return None
+    try:
+        with open(preset_path) as f:
+            presets = json.load(f).get("PresetList") or []
+    except (OSError, ValueError) as e:
+        logging.warning(f"[Preset] Can't read {preset_path}: {e}")
+        return None
+    name = config.get(section, "handbrakepreset_name", fallback="")
+    return next((p for p in presets if p.get("PresetName") == name), presets[0] if presets else None)
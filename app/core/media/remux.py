@@ -0,0 +1,184 @@
+"""
+Decides per title whether a HandBrake encode can be skipped: when the source video
+already has the preset's codec, fits its resolution and stays under the bitrate
+limit, the title is remuxed instead (mkvmerge, keeping the audio/subtitle languages
+the preset would keep) or, when nothing needs dropping, finalized as-is.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.core.cache import TtlCache
+from app.core.media.mkv import MkvInfo, MkvTrack
+from app.core.media.preset import load_preset
+
+ENCODE_RATE_TTL = 365 * 86400
+ENCODE_RATE_WEIGHT = 0.3  # EWMA weight of each finished encode
+
+# Matroska usually carries ISO 639-2/B codes, HandBrake presets list 639-2/T
+BIBLIOGRAPHIC = {
+    "alb": "sqi", "arm": "hye", "baq": "eus", "bur": "mya", "chi": "zho", "cze": "ces", "dut": "nld",
+    "fre": "fra", "geo": "kat", "ger": "deu", "gre": "ell", "ice": "isl", "mac": "mkd", "mao": "mri",
+    "may": "msa", "per": "fas", "rum": "ron", "slo": "slk", "tib": "bod", "wel": "cym",
+}
+
+
+def language(code: str) -> str:
+    code = code.lower().split("-")[0]
+    return BIBLIOGRAPHIC.get(code, code)
+
+
+def encoder_codec(encoder: str) -> str:
+    """Maps a HandBrake VideoEncoder (x265_10bit, nvenc_h265, svt_av1, ...) to a codec family."""
+    encoder = encoder.lower()
+    for token, codec in (("265", "hevc"), ("hevc", "hevc"), ("264", "h264"), ("av1", "av1"), ("vp9", "vp9"), ("mpeg2", "mpeg2")):
+        if token in encoder:
+            return codec
+    return encoder
+
+
+@dataclass
+class RemuxPlan:
+    source: MkvInfo
+    audio: List[MkvTrack]
+    subtitles: List[MkvTrack]
+
+    @property
+    def drops_tracks(self) -> bool:
+        kept = len(self.audio) + len(self.subtitles)
+        return kept < len(self.source.of_type("audio")) + len(self.source.of_type("subtitle"))
+
+    def describe(self) -> str:
+        video = self.source.video
+        return (
+            f"{video.codec} {video.width}x{video.height} @ {self.source.bitrate_mbps:.1f} Mbit/s, "
+            f"audio {','.join(t.language for t in self.audio) or 'none'}, "
+            f"subtitles {','.join(t.language for t in self.subtitles) or 'none'}"
+        )
+
+
+@dataclass
+class TrackSelection:
+    """The audio/subtitle tracks a HandBrake preset would keep."""
+    audio_languages: List[str] = field(default_factory=list)  # empty or "any" = keep all
+    audio_behavior: str = "all"
+    subtitle_languages: List[str] = field(default_factory=list)
+    subtitle_behavior: str = "all"
+
+    @classmethod
+    def from_preset(cls, preset: dict) -> "TrackSelection":
+        return cls(
+            audio_languages=[language(l) for l in preset.get("AudioLanguageList") or []],
+            audio_behavior=preset.get("AudioTrackSelectionBehavior", "all"),
+            subtitle_languages=[language(l) for l in preset.get("SubtitleLanguageList") or []],
+            subtitle_behavior=preset.get("SubtitleTrackSelectionBehavior", "all"),
+        )
+
+    def apply(self, info: MkvInfo) -> tuple[List[MkvTrack], List[MkvTrack]]:
+        return (
+            _select(info.of_type("audio"), self.audio_languages, self.audio_behavior),
+            _select(info.of_type("subtitle"), self.subtitle_languages, self.subtitle_behavior),
+        )
+
+
+@dataclass
+class RemuxPolicy:
+    codec: str
+    max_width: int = 0
+    max_height: int = 0
+    max_mbps: float = 0.0  # 0 = no bitrate limit
+    container: str = "mkv"
+    tracks: TrackSelection = field(default_factory=TrackSelection)
+
+    @classmethod
+    def from_config(cls, config, section: str) -> Optional["RemuxPolicy"]:
+        """Built from the section's HandBrake preset file; None when remuxing is off or the preset is unknown."""
+        if config.get(section, "remux", fallback="true").lower() != "true":
+            return None
+        preset = load_preset(config, section)
+        if not preset or not preset.get("VideoEncoder"):
+            return None
+
+        max_mbps = config.getfloat(section, "remuxmaxmbps", fallback=0)
+        if not max_mbps and preset.get("VideoQualityType") == 1 and preset.get("VideoAvgBitrate"):
+            max_mbps = preset["VideoAvgBitrate"] / 1000  # ABR preset: kbit/s
+        return cls(
+            codec=encoder_codec(preset["VideoEncoder"]),
+            max_width=int(preset.get("PictureWidth") or 0),
+            max_height=int(preset.get("PictureHeight") or 0),
+            max_mbps=max_mbps,
+            container=config.get(section, "handbrakeformat", fallback="mkv").lower(),
+            tracks=TrackSelection.from_preset(preset),
+        )
+
+    def plan(self, info: MkvInfo) -> tuple[Optional[RemuxPlan], str]:
+        """(plan, "") if the title can skip the encode, else (None, reason)."""
+        if self.container != "mkv":
+            return None, f"target container is {self.container}"
+        video = info.video
+        if video is None:
+            return None, "no video track"
+        if video.codec != self.codec:
+            return None, f"{video.codec} source, preset encodes {self.codec}"
+        if video.interlaced:
+            return None, "interlaced source"
+        if (self.max_width and video.width > self.max_width) or (self.max_height and video.height > self.max_height):
+            return None, f"{video.width}x{video.height} exceeds {self.max_width}x{self.max_height}"
+        if self.max_mbps and info.bitrate_mbps > self.max_mbps:
+            return None, f"{info.bitrate_mbps:.1f} Mbit/s exceeds {self.max_mbps:.1f}"
+        audio, subtitles = self.tracks.apply(info)
+        return RemuxPlan(source=info, audio=audio, subtitles=subtitles), ""
+
+
+def _select(tracks: List[MkvTrack], languages: List[str], behavior: str) -> List[MkvTrack]:
+    """HandBrake's track selection: none, the first match per language, or every match."""
+    if behavior == "none":
+        return []
+    if languages and "any" not in languages:
+        tracks = [t for t in tracks if language(t.language) in languages]
+    if behavior == "first":
+        firsts: Dict[str, MkvTrack] = {}
+        for track in tracks:
+            firsts.setdefault(language(track.language), track)
+        tracks = list(firsts.values())
+    return tracks
+
+
+class EncodeRates:
+    """Smoothed source bytes/s of finished encodes per preset, used to report time a remux saved."""
+
+    def __init__(self, path: str):
+        self.store = TtlCache(path, ENCODE_RATE_TTL)
+
+    @classmethod
+    def from_config(cls, config) -> "EncodeRates":
+        return cls(config.get("General", "encoderatepath", fallback="~/.cache/TKDiscRipper/encode_rates.json"))
+
+    def observe(self, preset: str, nbytes: int, seconds: float):
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        previous = self.store.get(preset)
+        self.store.set(preset, rate if not previous else ENCODE_RATE_WEIGHT * rate + (1 - ENCODE_RATE_WEIGHT) * previous)
+
+    def rate(self, preset: str) -> Optional[float]:
+        return self.store.get(preset)
+
+    def estimate(self, preset: str, nbytes: int) -> Optional[float]:
+        rate = self.rate(preset)
+        return nbytes / rate if rate else None
+
+
+@dataclass
+class RemuxStats:
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    saved_seconds: Optional[float] = None  # None without encode history for the preset
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 1),
+            "saved_seconds": round(self.saved_seconds, 1) if self.saved_seconds is not None else None,
+        }
@@ -0,0 +1,2 @@
+from app.core.metadata.fingerprint import cd_fingerprint, video_fingerprint
+from app.core.metadata.service import metadata_service, display_name, safe_dirname
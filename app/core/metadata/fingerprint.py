@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import os
+import struct
+from typing import Optional
+
+PREGAP_SECTORS = 150  # red book: track 1 starts 2 seconds into the disc
+SECTORS_PER_SECOND = 75
+VIDEO_ROOTS = ("VIDEO_TS", "BDMV")
+
+DATA_SECTOR = 2048
+ISO_PVD_SECTOR = 16  # ISO 9660 primary volume descriptor
+UDF_ANCHOR_SECTOR = 256  # UDF anchor volume descriptor pointer
+UDF_ANCHOR_TAG = 2
+UDF_VDS_MAX_SECTORS = 16  # main volume descriptor sequence: primary, logical, partition, ... descriptors
+
+
+def musicbrainz_disc_id(toc: list[dict]) -> str:
+    """MusicBrainz disc ID from a cdparanoia TOC (see musicbrainz.org/doc/Disc_ID_Calculation)."""
+    first, last = toc[0]["number"], toc[-1]["number"]
+    offsets = {t["number"]: t["begin"] + PREGAP_SECTORS for t in toc}
+    lead_out = toc[-1]["begin"] + toc[-1]["sectors"] + PREGAP_SECTORS
+
+    sha = hashlib.sha1()
+    sha.update(f"{first:02X}{last:02X}{lead_out:08X}".encode())
+    for number in range(1, 100):
+        sha.update(f"{offsets.get(number, 0):08X}".encode())
+    encoded = base64.b64encode(sha.digest()).decode()
+    return encoded.replace("+", ".").replace("/", "_").replace("=", "-")
+
+
+def cddb_disc_id(toc: list[dict]) -> str:
+    def digit_sum(n: int) -> int:
+        return sum(int(d) for d in str(n))
+
+    starts = [(t["begin"] + PREGAP_SECTORS) // SECTORS_PER_SECOND for t in toc]
+    lead_out = (toc[-1]["begin"] + toc[-1]["sectors"] + PREGAP_SECTORS) // SECTORS_PER_SECOND
+    checksum = sum(digit_sum(s) for s in starts) % 255
+    length = lead_out - starts[0]
+    return f"{(checksum << 24) | (length << 8) | len(toc):08x}"
+
+
+def cd_fingerprint(toc: list[dict]) -> dict:
+    disc_id = musicbrainz_disc_id(toc)
+    return {
+        "kind": "cd",
+        "id": f"mb:{disc_id}",
+        "musicbrainz": disc_id,
+        "cddb": cddb_disc_id(toc),
+        "track_count": len(toc),
+    }
+
+
+def video_structure_hash(mount_point: Optional[str]) -> Optional[str]:
+    """Hashes the names and sizes under VIDEO_TS/BDMV; cheap (metadata only) and stable per pressing."""
+    if not mount_point:
+        return None
+    sha = hashlib.sha1()
+    found = False
+    for root_name in VIDEO_ROOTS:
+        root = os.path.join(mount_point, root_name)
+        if not os.path.isdir(root):
+            continue
+        found = True
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                sha.update(f"{os.path.relpath(path, mount_point)}\0{size}\n".encode())
+    return sha.hexdigest() if found else None
+
+
+def video_fingerprint(disc_label: str, mount_point: Optional[str], device: Optional[str] = None) -> dict:
+    """
+    Identity of a video disc: its VIDEO_TS/BDMV structure, else its volume descriptors.
+    The label is only a search hint for providers; labels like DVD_VIDEO or DISC1 are
+    shared by many discs, so with neither identity the id is None and nothing is cached.
+    """
+    structure = video_structure_hash(mount_point)
+    if structure:
+        disc_id = f"video:{structure}"
+    else:
+        try:
+            volume = volume_fingerprint(device) if device else None
+        except OSError:
+            volume = None
+        disc_id = volume["id"] if volume else None
+    return {
+        "kind": "video",
+        "id": disc_id,
+        "structure": structure,
+        "label": disc_label,
+    }
+
+
+def read_volume_descriptors(device: str) -> dict:
+    """
+    The ISO 9660 primary volume descriptor and UDF main volume descriptor sequence, read
+    raw from the device (a few KB, no mount). Both carry the volume and volume-set IDs,
+    creation time and size mastered onto the pressing. Missing parts are left out.
+    """
+    found = {}
+    with open(device, "rb") as f:
+        f.seek(ISO_PVD_SECTOR * DATA_SECTOR)
+        pvd = f.read(DATA_SECTOR)
+        if len(pvd) == DATA_SECTOR and pvd[0] == 1 and pvd[1:6] == b"CD001":
+            found["pvd"] = pvd
+            found["volume_id"] = pvd[40:72].decode("ascii", "replace").strip()
+            found["volume_sectors"] = struct.unpack_from("<I", pvd, 80)[0]
+
+        f.seek(UDF_ANCHOR_SECTOR * DATA_SECTOR)
+        anchor = f.read(DATA_SECTOR)
+        if len(anchor) == DATA_SECTOR and struct.unpack_from("<H", anchor, 0)[0] == UDF_ANCHOR_TAG:
+            length, location = struct.unpack_from("<II", anchor, 16)
+            f.seek(location * DATA_SECTOR)
+            vds = f.read(min(length, UDF_VDS_MAX_SECTORS * DATA_SECTOR))
+            if vds:
+                found["udf"] = vds
+    return found
+
+
+def volume_fingerprint(device: str) -> Optional[dict]:
+    """Identity of a data/video disc from its volume descriptors; None if it has neither ISO 9660 nor UDF."""
+    descriptors = read_volume_descriptors(device)
+    if "pvd" not in descriptors and "udf" not in descriptors:
+        return None
+    sha = hashlib.sha1()
+    for part in ("pvd", "udf"):
+        sha.update(part.encode() + b"\0" + descriptors.get(part, b""))
+    return {
+        "kind": "volume",
+        "id": f"vol:{sha.hexdigest()}",
+        "volume_id": descriptors.get("volume_id"),
+        "volume_sectors": descriptors.get("volume_sectors"),
+        "udf": "udf" in descriptors,
+    }
@@ -0,0 +1,134 @@
+"""
+Index of discs that were already archived, keyed by fingerprints taken from cheap reads
+at detect time (CD TOC, ISO 9660/UDF volume descriptors, VIDEO_TS/BDMV layout). A
+re-inserted disc is recognized with one dict lookup before any full read starts.
+"""
+import logging
+import os
+import time
+from typing import List, Optional
+
+from app.core.cache import TtlCache
+from app.core.config import get_config, subscribe
+from app.core.metadata.fingerprint import cd_fingerprint, video_structure_hash, volume_fingerprint
+
+DAY = 86400
+MOUNTS = "/proc/mounts"
+POLICIES = ("off", "flag", "skip", "eject")
+
+
+def mount_point_of(device: str) -> Optional[str]:
+    """Where device is mounted, if it is (desktop automount); never mounts anything itself."""
+    device = os.path.realpath(device)
+    try:
+        with open(MOUNTS) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0].startswith("/") and os.path.realpath(fields[0]) == device:
+                    return fields[1].replace("\\040", " ")
+    except OSError:
+        pass
+    return None
+
+
+def disc_fingerprint(drive_path: str, disc_type: str) -> Optional[dict]:
+    """
+    Fingerprint of the disc in drive_path plus every key it is indexed under: the exact
+    pressing first, then the VIDEO_TS/BDMV layout (same release, different pressing)
+    when the disc happens to be mounted. None if nothing identifying could be read.
+    """
+    if disc_type == "audio_cd":
+        from app.core.integrations.cdparanoia import read_toc
+        toc = read_toc(drive_path)
+        if not toc:
+            return None
+        fingerprint = cd_fingerprint(toc)
+        fingerprint["keys"] = [fingerprint["id"]]
+        return fingerprint
+
+    try:
+        fingerprint = volume_fingerprint(drive_path)
+    except OSError as e:
+        logging.warning(f"[DiscIndex] Could not read volume descriptors of {drive_path}: {e}")
+        fingerprint = None
+    structure = video_structure_hash(mount_point_of(drive_path)) if disc_type.endswith("_video") else None
+    if fingerprint is None and structure is None:
+        return None
+    fingerprint = fingerprint or {"kind": "video", "id": f"video:{structure}"}
+    fingerprint["structure"] = structure
+    fingerprint["keys"] = list(dict.fromkeys(k for k in (fingerprint["id"], structure and f"video:{structure}") if k))
+    return fingerprint
+
+
+class DiscIndex:
+    def __init__(self):
+        self._store: Optional[TtlCache] = None
+        self._policy: Optional[str] = None
+        subscribe(self.reload)
+
+    def reload(self, config=None):
+        config = config or get_config()
+        policy = config.get("Duplicates", "policy", fallback="flag").lower()
+        if policy not in POLICIES:
+            logging.warning(f"[DiscIndex] Unknown duplicate policy {policy!r}, using flag")
+            policy = "flag"
+        self._policy = policy
+        path = os.path.expanduser(config.get("Duplicates", "indexpath", fallback="~/.cache/TKDiscRipper/disc_index.json"))
+        ttl = config.getfloat("Duplicates", "indexttldays", fallback=3650) * DAY
+        if self._store is None or self._store.path != path or self._store.ttl != ttl:
+            self._store = TtlCache(path, ttl)
+
+    @property
+    def store(self) -> TtlCache:
+        if self._store is None:
+            self.reload()
+        return self._store
+
+    @property
+    def policy(self) -> str:
+        if self._policy is None:
+            self.reload()
+        return self._policy
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        """The archived entry for the first of the fingerprint's keys whose output still exists."""
+        for key in fingerprint.get("keys", [fingerprint["id"]]):
+            entry = self.store.get(key)
+            if entry is None:
+                continue
+            if not os.path.exists(entry["output"]):
+                self.store.delete(key)  # archive moved or deleted: rip it again
+                continue
+            return {**entry, "matched": key}
+        return None
+
+    def record(self, fingerprint: dict, job: dict, output: str):
+        entry = {
+            "job_id": job["job_id"],
+            "disc_type": job.get("disc_type"),
+            "disc_label": job.get("disc_label"),
+            "output": output,
+            "archived_at": time.time(),
+        }
+        for key in fingerprint.get("keys", [fingerprint["id"]]):
+            self.store.set(key, entry)
+
+    def forget_job(self, job_id: str) -> int:
+        """Drops the entries a job recorded (e.g. its background compression failed later)."""
+        keys = [k for k, entry in self.store.items().items() if entry["job_id"] == job_id]
+        for key in keys:
+            self.store.delete(key)
+        return len(keys)
+
+    def forget(self, key: str) -> bool:
+        if key not in self.store:
+            return False
+        self.store.delete(key)
+        return True
+
+    def entries(self) -> List[dict]:
+        return [{"key": k, **v} for k, v in sorted(self.store.items().items(), key=lambda kv: -kv[1]["archived_at"])]
+
+
+# Singleton
+disc_index = DiscIndex()
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional, Type
+
+import requests
+
+USER_AGENT = "TKDiscRipper/2.0 ( https://github.com/TKtheDEV/TKDiscRipper )"
+
+
+class MetadataProvider:
+    """
+    Resolves a disc fingerprint to metadata:
+    {"title", "artist", "year", "tracks": [{"number", "title", "artist"}], "titles": [title ids to rip]}.
+    Return None when the provider doesn't know the disc.
+    """
+    name = "base"
+    kinds = ("cd", "video")
+
+    @classmethod
+    def from_config(cls, config) -> "MetadataProvider":
+        return cls()
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        raise NotImplementedError
+
+
+class LocalProvider(MetadataProvider):
+    """Offline stand-in: reads `<directory>/<fingerprint id>.json` (':' replaced by '_')."""
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = os.path.expanduser(directory)
+
+    @classmethod
+    def from_config(cls, config) -> "LocalProvider":
+        return cls(config.get("Metadata", "localdirectory", fallback="~/TKDiscRipper/metadata"))
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        if not fingerprint["id"]:
+            return None
+        path = os.path.join(self.directory, f"{fingerprint['id'].replace(':', '_')}.json")
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+class MusicBrainzProvider(MetadataProvider):
+    name = "musicbrainz"
+    kinds = ("cd",)
+    url = "https://musicbrainz.org/ws/2/discid/{}"
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        r = requests.get(
+            self.url.format(fingerprint["musicbrainz"]),
+            params={"inc": "recordings+artist-credits", "fmt": "json"},
+            headers={"User-Agent": USER_AGENT},
+            timeout=10,
+        )
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        releases = r.json().get("releases") or []
+        if not releases:
+            return None
+
+        release = releases[0]
+        artist = "".join(c["name"] + c.get("joinphrase", "") for c in release.get("artist-credit", []))
+        media = next(
+            (m for m in release.get("media", []) if len(m.get("tracks", [])) == fingerprint.get("track_count")),
+            (release.get("media") or [{}])[0],
+        )
+        return {
+            "title": release.get("title"),
+            "artist": artist or None,
+            "year": (release.get("date") or "")[:4] or None,
+            "tracks": [
+                {
+                    "number": t.get("position"),
+                    "title": t.get("title"),
+                    "artist": "".join(c["name"] + c.get("joinphrase", "") for c in t.get("artist-credit", [])) or artist,
+                }
+                for t in media.get("tracks", [])
+            ],
+        }
+
+
+class OmdbProvider(MetadataProvider):
+    name = "omdb"
+    kinds = ("video",)
+    url = "https://www.omdbapi.com/"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @classmethod
+    def from_config(cls, config) -> "OmdbProvider":
+        return cls(config.get("General", "omdbapikey", fallback="").strip())
+
+    @staticmethod
+    def _title_from_label(label: str) -> str:
+        title = re.sub(r"[_.]+", " ", label or "")
+        title = re.sub(r"\b(DISC|DISK|D)\s*\d+\b.*$", "", title, flags=re.IGNORECASE)
+        return title.strip().title()
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        if not self.api_key:
+            return None
+        title = self._title_from_label(fingerprint.get("label", ""))
+        if not title or title == "Untitled":
+            return None
+        r = requests.get(self.url, params={"t": title, "apikey": self.api_key}, timeout=10)
+        r.raise_for_status()
+        data = r.json()
+        if data.get("Response") != "True":
+            return None
+        return {"title": data.get("Title"), "year": data.get("Year"), "imdb_id": data.get("imdbID"), "type": data.get("Type")}
+
+
+PROVIDERS: Dict[str, Type[MetadataProvider]] = {}
+
+
+def register_provider(cls: Type[MetadataProvider]) -> Type[MetadataProvider]:
+    PROVIDERS[cls.name] = cls
+    return cls
+
+
+for _cls in (LocalProvider, MusicBrainzProvider, OmdbProvider):
+    register_provider(_cls)
+
+
+def build_providers(config) -> list[MetadataProvider]:
+    """Instantiates the providers listed in [Metadata] providers, in lookup order."""
+    providers = []
+    for name in config.get("Metadata", "providers", fallback="local").split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        cls = PROVIDERS.get(name)
+        if cls is None:
+            logging.warning(f"[Metadata] Unknown provider '{name}' ignored")
+            continue
+        providers.append(cls.from_config(config))
+    return providers
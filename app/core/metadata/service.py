@@ -0,0 +1,75 @@
+import logging
+import re
+from typing import Optional
+
+from app.core.cache import TtlCache
+from app.core.config import get_config
+from app.core.metadata.providers import build_providers
+
+DAY = 86400
+_MISS = object()
+
+
+class MetadataService:
+    """
+    Looks discs up by fingerprint, cache first, then each configured provider in order.
+    Misses are cached too (for a shorter time) so batch rips of unknown discs stay offline.
+    """
+
+    def __init__(self):
+        self._cache: Optional[TtlCache] = None
+
+    @property
+    def cache(self) -> TtlCache:
+        if self._cache is None:
+            config = get_config()
+            self._cache = TtlCache(
+                config.get("Metadata", "cachepath", fallback="~/TKDiscRipper/cache/metadata.json"),
+                config.getfloat("Metadata", "cachettldays", fallback=30) * DAY,
+            )
+        return self._cache
+
+    def lookup(self, fingerprint: dict) -> Optional[dict]:
+        # Without an id (a video disc known only by its label) providers are asked but nothing is cached
+        key = fingerprint["id"]
+        if key:
+            cached = self.cache.get(key, _MISS)
+            if cached is not _MISS:
+                return cached
+
+        config = get_config()
+        errored = False
+        for provider in build_providers(config):
+            if fingerprint["kind"] not in provider.kinds:
+                continue
+            try:
+                result = provider.lookup(fingerprint)
+            except Exception as e:
+                errored = True
+                logging.warning(f"[Metadata] {provider.name} lookup failed for {key or fingerprint.get('label')}: {e}")
+                continue
+            if result:
+                result["source"] = provider.name
+                if key:
+                    self.cache.set(key, result)
+                return result
+
+        # Don't pin a miss caused by a provider being unreachable
+        if key and not errored:
+            self.cache.set(key, None, ttl=config.getfloat("Metadata", "missttldays", fallback=1) * DAY)
+        return None
+
+
+def display_name(meta: Optional[dict]) -> Optional[str]:
+    if not meta or not meta.get("title"):
+        return None
+    name = f"{meta['artist']} - {meta['title']}" if meta.get("artist") else meta["title"]
+    return f"{name} ({meta['year']})" if meta.get("year") else name
+
+
+def safe_dirname(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)[:64]
+
+
+# Singleton
+metadata_service = MetadataService()
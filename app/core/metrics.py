@@ -0,0 +1,213 @@
+"""
+In-process metrics rendered in the Prometheus text format at /metrics.
+
+Metrics are cheap enough to leave on: a labelled child is created once and then
+updated under its own small lock, so unrelated series never contend. Label values
+must come from bounded sets (route templates, drive paths, command names, phases).
+"""
+import bisect
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(str(kwargs[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_str(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "lock", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Evaluates `function` at scrape time instead of tracking a value."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_str(values)} {_fmt(child.get())}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _fmt(bound)
+            labels = self._label_str(values, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_str(values)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{self._label_str(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+API_LATENCY = Histogram("tkdr_api_request_seconds", "HTTP request latency by route template", ["method", "route", "status"])
+JOB_UPDATE_LATENCY = Histogram("tkdr_job_update_seconds", "Round trip of JobContext updates to the job API")
+SUBPROCESS_LATENCY = Histogram("tkdr_subprocess_seconds", "Wall time of short helper commands (lsblk, udevadm, blkid, ...)", ["command"])
+PHASE_DURATION = Histogram("tkdr_job_phase_seconds", "Time jobs spend in each operation", ["phase"], buckets=PHASE_BUCKETS)
+DRIVE_BYTES = Counter("tkdr_drive_bytes_total", "Bytes read from each drive and written for its jobs", ["drive", "direction"])
+DRIVE_READ_MBPS = Gauge("tkdr_drive_read_mbps", "Throughput of the last completed read per drive", ["drive"])
+DISK_UTILIZATION = Gauge("tkdr_disk_utilization", "Share of time a watched volume had I/O in flight (/proc/diskstats)", ["device"])
+DISK_MBPS = Gauge("tkdr_disk_mbps", "Throughput of each watched volume", ["device", "direction"])
+IO_THROTTLE_SECONDS = Counter("tkdr_io_throttle_seconds_total", "Time background copies slept to leave bandwidth to drive reads", ["devices"])
+QUEUE_DEPTH = Gauge("tkdr_queue_depth", "Items waiting or in flight per queue", ["queue"])
+
+
+def timed_run(cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run that records its wall time under the command's name."""
+    with SUBPROCESS_LATENCY.labels(cmd[0]).time():
+        return subprocess.run(cmd, **kwargs)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,35 @@
+import importlib
+import threading
+from typing import Dict, Optional, Type, Union
+
+# disc type -> ripper class, or a "module:Class" path imported the first time that disc type is ripped
+RIPPERS: Dict[str, Union[str, Type]] = {}
+_lock = threading.Lock()
+
+
+def register_ripper(disc_type: str, ripper: Union[str, Type]):
+    with _lock:
+        RIPPERS[disc_type] = ripper
+
+
+def get_ripper(disc_type: str) -> Optional[Type]:
+    ripper = RIPPERS.get(disc_type)
+    if ripper is None or not isinstance(ripper, str):
+        return ripper
+    module, _, name = ripper.partition(":")
+    cls = getattr(importlib.import_module(module), name)
+    with _lock:
+        RIPPERS[disc_type] = cls
+    return cls
+
+
+for _disc_type, _path in {
+    "audio_cd": "app.core.rippers.cd:CdRipper",
+    "dvd_video": "app.core.rippers.dvd:DvdRipper",
+    "bluray_video": "app.core.rippers.bluray:BlurayRipper",
+    "cd_rom": "app.core.rippers.other:IsoRipper",
+    "dvd_rom": "app.core.rippers.other:IsoRipper",
+    "bluray_rom": "app.core.rippers.other:IsoRipper",
+    "otherdisc": "app.core.rippers.other:IsoRipper",
+}.items():
+    register_ripper(_disc_type, _path)
@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.rippers.audio.linux import AudioRipper
-elif platform.system() == "Windows":
-    from app.core.rippers.audio.windows import AudioRipper
-elif platform.system() == "Darwin":
-    from app.core.rippers.audio.macos import AudioRipper
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "AudioRipper")
@@ -1,30 +1,258 @@
 from app.core.job.context import JobContext
+from app.core.job.control import bound
+from app.core.job.spec import JobSpec
 from app.core.integrations.abcde.linux import run_abcde
+from app.core.integrations.audioenc import encode_track, ENCODERS
+from app.core.integrations.cdparanoia import SECTOR_BYTES, read_toc, rip_track
 from app.core.config import get_config
+from app.core.drivemanager import drive_manager
+from app.core.metrics import DRIVE_BYTES
+from app.core.metadata import cd_fingerprint, metadata_service, display_name, safe_dirname
+from app.core.storage import TempTiers, InsufficientSpaceError, io_budget
+from app.core.storage.integrity import ALGORITHM, write_manifest
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
+import time
+
+# Until the TOC is read, progress plans for a full 80-minute disc (75 sectors a second)
+FULL_CD_BYTES = 80 * 60 * 75 * SECTOR_BYTES
 
 class AudioRipper:
-    def __init__(self, job_id: str, drive_path: str):
-        self.job_id = job_id
-        self.drive_path = drive_path
-        self.ctx = JobContext(job_id)
+    def __init__(self, spec: JobSpec):
+        self.spec = spec
+        self.job_id = spec.job_id
+        self.drive_path = spec.drive_path
+        self.ctx = JobContext(spec.job_id)
         self.disc_label = "Disc name not available"
         config = get_config()
+        self.backend = config.get("CD", "backend", fallback="native").lower()
         self.output_format = config.get("CD", "outputformat", fallback="flac")
         self.config_path = os.path.expanduser(config.get("CD", "configpath", fallback="~/TKDiscRipper/config/abcde.conf"))
         self.additional_args = config.get("CD", "additionaloptions", fallback="").split()
+        self.base_output = os.path.expanduser(config.get("CD", "outputdirectory", fallback="~/TKDiscRipper/output/CD"))
+        self.encode_workers = config.getint("CD", "encodeworkers", fallback=0) or os.cpu_count() or 1
+        self.tiers = TempTiers.from_config(config, spec.job_id)
+        self.output_dir = None
+        self.metadata = None
+
+        self._lock = threading.Lock()
+        self._tracks: list[dict] = []
+        self._read_bytes = 0
+        self._encoded_bytes = 0
 
     def rip(self):
+        if self.backend == "abcde" or self.output_format not in ENCODERS:
+            yield from self._rip_abcde()
+        else:
+            yield from self._rip_native()
+
+    def _rip_abcde(self):
         self.ctx.log("▶️ Starting audio CD rip via abcde...")
-        success = run_abcde(
-            drive_path=self.drive_path,
-            config_path=self.config_path,
-            output_format=self.output_format,
-            additional_args=self.additional_args,
-            on_output=self.ctx.log
-        )
+        if cap := drive_manager.apply_speed_cap(self.drive_path):
+            self.ctx.log(f"🐢 Read speed capped at {cap}x")
+        # abcde reads and encodes in one process, so the whole run is a single span (and a
+        # single phase whose expected length is learned from earlier runs)
+        progress = self.ctx.progress
+        progress.plan("abcde", f"abcde:{self.output_format}", 1)
+        with self.ctx.phase("abcde", "read") as span, progress.running("abcde"):
+            success = run_abcde(
+                drive_path=self.drive_path,
+                config_path=self.config_path,
+                output_format=self.output_format,
+                additional_args=self.additional_args,
+                on_output=self.ctx.log
+            )
+            span.args["failed"] = not success
+        self.ctx.read_complete(success)
 
         if success:
             yield "✅ Audio CD ripped successfully."
         else:
             yield "❌ Audio CD rip failed."
+
+    def _rip_native(self):
+        progress = self.ctx.progress
+        progress.plan("scan", "scan:audio_cd", 1)
+        progress.plan("metadata", "metadata", 1)
+        self._plan_tracks(FULL_CD_BYTES)
+        self.ctx.set_progress(operation="Reading TOC", status="Reading table of contents")
+        with self.ctx.phase("scan", "scan") as span, progress.running("scan"):
+            toc = read_toc(self.drive_path)
+            span.args["tracks"] = len(toc or [])
+        if not toc:
+            self.ctx.set_progress(operation="failed", status="Could not read TOC", progress=100)
+            yield "❌ Could not read the CD table of contents."
+            return
+
+        try:
+            self.tiers.check([t["bytes"] for t in toc])
+        except InsufficientSpaceError as e:
+            self.ctx.set_progress(operation="failed", status="Not enough temp space", progress=100)
+            yield f"❌ {e}"
+            return
+
+        self._plan_tracks(sum(t["bytes"] for t in toc))
+
+        fingerprint = cd_fingerprint(toc)
+        with self.ctx.phase("metadata lookup", "detect"), progress.running("metadata"):
+            self.metadata = metadata_service.lookup(fingerprint)
+        name = display_name(self.metadata)
+        if name:
+            self.disc_label = name
+            yield f"🏷️ {name} (via {self.metadata['source']})"
+        self.ctx.set_progress(disc_label=self.disc_label, fingerprint=fingerprint["id"])
+
+        self.output_dir = os.path.join(self.base_output, safe_dirname(name) if name else self.job_id)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.ctx.set_progress(temp_folder=self.tiers.capacity_dir, output_folder=self.output_dir)
+
+        self._tracks = [{"number": t["number"], "read": 0, "encode": "pending"} for t in toc]
+        yield f"💿 {len(toc)} tracks, encoding to {self.output_format} with {self.encode_workers} workers"
+
+        self.ctx.set_progress(operation="Ripping Disc", status="Reading tracks", tracks=self._tracks)
+        checksums: dict[str, str] = {}
+        failed = False
+        speed = drive_manager.speed_cap(self.drive_path)
+        if speed:
+            self.ctx.log(f"🐢 Read speed capped at {speed}x")
+        read_start = time.monotonic()
+        read_bytes = 0
+        progress.start("read")
+
+        # Reads stay sequential (one drive), encodes fan out while the next track is read
+        try:
+            with ThreadPoolExecutor(max_workers=self.encode_workers, thread_name_prefix=f"encode-{self.job_id[:8]}") as pool:
+                futures = []
+                for idx, track in enumerate(toc):
+                    try:
+                        # check() only looked at free space; another job may have taken it since
+                        wav_dir = self.tiers.place(track["bytes"])
+                    except InsufficientSpaceError as e:
+                        self._set_track(idx, encode="failed")
+                        yield f"❌ {e}"
+                        failed = True
+                        break
+                    wav_path = os.path.join(wav_dir, f"track{track['number']:02}.wav")
+
+                    with self.ctx.phase(f"read track {track['number']}", "read", track=track["number"]) as span, io_budget.foreground(wav_dir):
+                        ok = rip_track(
+                            self.drive_path, track, wav_path,
+                            on_progress=lambda frac, i=idx, t=track: self._on_read_progress(i, t, frac),
+                            on_output=self.ctx.log,
+                            speed=speed,
+                        )
+                        span.bytes = track["bytes"] if ok else 0
+                        span.args["failed"] = not ok
+                    if not ok:
+                        self.tiers.release(wav_dir, track["bytes"])
+                        self._set_track(idx, read=100, encode="failed")
+                        yield f"❌ Reading track {track['number']} failed"
+                        failed = True
+                        break
+
+                    read_bytes += track["bytes"]
+                    self._on_read_progress(idx, track, 1.0)
+                    yield f"📀 Read track {track['number']}/{len(toc)}"
+                    futures.append(pool.submit(bound(self._encode), idx, track, wav_dir, wav_path))
+
+                progress.finish("read", not failed)
+                self.ctx.read_complete(not failed)
+                if not failed:
+                    drive_manager.observe_read(self.drive_path, read_bytes, time.monotonic() - read_start)
+                self.ctx.set_progress(operation="Encoding", status="Waiting for encoders")
+                for future in futures:
+                    filename, digest = future.result()
+                    if digest:
+                        checksums[filename] = digest
+                    else:
+                        failed = True
+                progress.finish("encode", not failed)
+        finally:
+            # Also after an exception, so no WAVs are left on the temp tiers
+            self.tiers.cleanup()
+
+        if checksums:
+            write_manifest(os.path.join(self.output_dir, f"checksums.{ALGORITHM}"), checksums)
+            self.ctx.set_progress(checksums=checksums, checksum_algorithm=ALGORITHM)
+
+        if failed:
+            self.ctx.set_progress(operation="failed", status="Audio CD rip failed", progress=100, tracks=self._tracks)
+            yield "❌ Audio CD rip failed."
+        else:
+            self.ctx.set_progress(operation="complete", status="Done", tracks=self._tracks)
+            yield f"✅ Audio CD ripped successfully. Files in: {self.output_dir}"
+
+    def _plan_tracks(self, total_bytes: int):
+        progress = self.ctx.progress
+        progress.plan("read", "read:audio_cd", total_bytes, rate=drive_manager.read_rate(self.drive_path))
+        # Tracks encode while the next one is read; the job waits for whichever ends last
+        progress.plan("encode", f"encode:{self.output_format}", total_bytes, overlaps=True)
+
+    def _encode(self, idx: int, track: dict, wav_dir: str, wav_path: str) -> tuple[str, str | None]:
+        ext, _ = ENCODERS[self.output_format]
+        tags = self._track_tags(track["number"])
+        name = f"{track['number']:02} - {safe_dirname(tags['title'])}.{ext}"
+        self._set_track(idx, encode="encoding")
+        self.ctx.progress.start("encode")
+        try:
+            with self.ctx.phase(f"encode track {track['number']}", "encode", format=self.output_format) as span:
+                ok, digest = encode_track(
+                    wav_path, os.path.join(self.output_dir, name), self.output_format,
+                    tags=tags, on_output=self.ctx.log,
+                )
+                span.bytes = track["bytes"]
+        finally:
+            if os.path.exists(wav_path):
+                os.remove(wav_path)
+            self.tiers.release(wav_dir, track["bytes"])
+
+        if not ok:
+            self._set_track(idx, encode="failed")
+            self.ctx.log(f"❌ Encoding track {track['number']} failed")
+            return name, None
+
+        DRIVE_BYTES.labels(self.drive_path, "written").inc(os.path.getsize(os.path.join(self.output_dir, name)))
+        with self._lock:
+            self._encoded_bytes += track["bytes"]
+            encoded = self._encoded_bytes
+        self.ctx.progress.advance("encode", encoded)
+        self._set_track(idx, encode="done")
+        self.ctx.log(f"🎵 Encoded {name}")
+        return name, digest
+
+    def _track_tags(self, number: int) -> dict:
+        tags = {"tracknumber": number, "title": f"Track {number:02}"}
+        if not self.metadata:
+            return tags
+        for key in ("artist", "year"):
+            if self.metadata.get(key):
+                tags["date" if key == "year" else key] = self.metadata[key]
+        if self.metadata.get("title"):
+            tags["album"] = self.metadata["title"]
+        track = next((t for t in self.metadata.get("tracks", []) if t.get("number") == number), None)
+        if track:
+            tags.update({k: v for k, v in track.items() if k in ("title", "artist") and v})
+        return tags
+
+    def _on_read_progress(self, idx: int, track: dict, fraction: float):
+        pct = int(fraction * 100)
+        with self._lock:
+            if pct == self._tracks[idx]["read"]:
+                return
+            previous = self._tracks[idx]["read"]
+            self._tracks[idx]["read"] = pct
+            self._read_bytes += int(track["bytes"] * (pct - previous) / 100)
+            read = self._read_bytes
+        self.ctx.progress.advance("read", read)
+        self._report()
+
+    def _set_track(self, idx: int, **fields):
+        with self._lock:
+            self._tracks[idx].update(fields)
+        self._report()
+
+    def _report(self):
+        with self._lock:
+            tracks = [dict(t) for t in self._tracks]
+        self.ctx.set_progress(tracks=tracks)
@@ -1,5 +1,5 @@
 from app.core.rippers.video import VideoRipper
 
 class BlurayRipper(VideoRipper):
-    def __init__(self, job_id, drive_path):
-        super().__init__(job_id, drive_path, config_section="BLURAY")
+    def __init__(self, spec):
+        super().__init__(spec, config_section="BLURAY")
@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.rippers.other.linux import IsoRipper
-elif platform.system() == "Windows":
-    from app.core.rippers.other.windows import IsoRipper
-elif platform.system() == "Darwin":
-    from app.core.rippers.other.macos import IsoRipper
+__getattr__, __dir__ = lazy_platform(__name__, "IsoRipper")
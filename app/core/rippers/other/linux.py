@@ -1,72 +1,144 @@
 import os
-import shutil
-import threading
+import time
 from app.core.config import get_config
+from app.core.drivemanager import drive_manager
 from app.core.job.context import JobContext
+from app.core.job.spec import JobSpec
 from app.core.integrations.bz2 import compress_bz2
 from app.core.integrations.zstd import compress_zstd
-from app.core.logstream import stream_subprocess
-from app.core.driveinfo.linux import LinuxDriveInfo
+from app.core.metrics import DRIVE_BYTES
+from app.core.storage import TempTiers, InsufficientSpaceError, FinalizeStats, finalize_file, human_size, io_budget
+from app.core.workers import remote_enabled, compress_remote
+from app.core.storage.integrity import ALGORITHM, tee_command_to_file, write_manifest
 
 class IsoRipper:
-    def __init__(self, job_id: str, drive_path: str):
-        self.job_id = job_id
-        self.drive_path = drive_path
-        self.ctx = JobContext(job_id)
+    def __init__(self, spec: JobSpec):
+        self.spec = spec
+        self.job_id = spec.job_id
+        self.drive_path = spec.drive_path
+        self.ctx = JobContext(spec.job_id)
 
-        self.disc_label = self._get_disc_label()  
+        self.disc_label = spec.disc_label
 
         config = get_config()
-        self.base_temp = os.path.expanduser(config.get("General", "tempdirectory"))
+        self.tiers = TempTiers.from_config(config, spec.job_id)
         self.base_output = os.path.expanduser(config.get("OTHER", "outputdirectory"))
         self.compression = config.get("OTHER", "compression", fallback="bz2").lower()
 
-        self.temp_dir = os.path.join(self.base_temp, job_id) 
-        self.output_dir = self.base_output                   
+        self.temp_dir = self.tiers.capacity_dir
+        self.output_dir = self.base_output
+        self.checksums: dict[str, str] = {}
 
-        os.makedirs(self.temp_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def _get_disc_label(self) -> str:
-        info = LinuxDriveInfo().get_drive_info()
-        for d in info:
-            if os.path.realpath(d["path"]) == os.path.realpath(self.drive_path):
-                return d.get("disc_label", "UNTITLED")
-        return "UNTITLED"
-
     def rip(self):
+        size = drive_manager.disc_size(self.drive_path)
+        remote = self.compression in ("bz2", "zstd") and remote_enabled("compress")
+        progress = self.ctx.progress
+        progress.plan("read", f"read:{self.spec.disc_type}", size, rate=drive_manager.read_rate(self.drive_path))
+        if self.compression in ("bz2", "zstd"):
+            progress.plan("compress", f"compress:{self.compression}{':remote' if remote else ''}", size)
+        else:
+            progress.plan("finalize", "finalize", size)
+        try:
+            self.temp_dir = self.tiers.place(size)
+        except InsufficientSpaceError as e:
+            self.ctx.set_progress(progress=100, operation="failed", status="Not enough temp space")
+            yield f"❌ {e}"
+            return
+        self.ctx.set_progress(temp_folder=self.temp_dir)
+
         iso_path = os.path.join(self.temp_dir, f"{self.job_id}.iso")
-        self.ctx.set_progress(operation="Ripping Disc", status="Reading via dd", progress=5)
+        self.ctx.set_progress(operation="Ripping Disc", status="Reading via dd")
 
-        dd_cmd = ["dd", f"if={self.drive_path}", f"of={iso_path}", "bs=64k", "status=progress"]
-        self.ctx.log(f"$ {' '.join(dd_cmd)}")
-        code, _ = stream_subprocess(dd_cmd, on_output=self.ctx.log)
+        # dd writes to stdout so the ISO is hashed as it lands in temp
+        dd_cmd = ["dd", f"if={self.drive_path}", "bs=64k", "status=progress"]
+        if cap := drive_manager.apply_speed_cap(self.drive_path):
+            self.ctx.log(f"🐢 Read speed capped at {cap}x")
+        self.ctx.log(f"$ {' '.join(dd_cmd)} > {iso_path}")
+        read_start = time.monotonic()
+        with self.ctx.phase("read disc", "read", command="dd") as span, io_budget.foreground(self.temp_dir):
+            progress.start("read")
+            code, digest, nbytes = tee_command_to_file(
+                dd_cmd, iso_path, on_output=self.ctx.log, on_progress=lambda done: progress.advance("read", done),
+            )
+            progress.finish("read", code == 0)
+            span.bytes = nbytes
+            if code != 0:
+                span.args["failed"] = True
+        self.ctx.read_complete(code == 0)
+        if code == 0:
+            drive_manager.observe_read(self.drive_path, nbytes, time.monotonic() - read_start)
 
         if code != 0:
+            self.tiers.cleanup()
             self.ctx.set_progress(progress=100, operation="failed", status="dd failed")
             yield "❌ dd failed"
             return
 
-        self.ctx.set_progress(progress=60)
-        yield "✅ ISO created successfully"
+        self.checksums[os.path.basename(iso_path)] = digest
+        self.ctx.set_progress(checksums=self.checksums, checksum_algorithm=ALGORITHM)
+        yield f"✅ ISO created successfully ({ALGORITHM} {digest})"
 
-        threading.Thread(target=self._compress_iso, args=(iso_path,), daemon=True).start()
+        # Runs after the drive is released; the tracker waits for it before calling the job completed
+        self.ctx.control.thread(self._compress_iso, iso_path, remote, name=f"compress-{self.job_id[:8]}", daemon=True).start()
 
-    def _compress_iso(self, iso_path: str):
+    def _compress_iso(self, iso_path: str, remote: bool):
         final_path = os.path.join(self.output_dir, f"{self.job_id}.iso.{self.compression}")
-        self.ctx.set_progress(operation="Compressing", status=f"Compressing {iso_path}", progress=65)
+        self.ctx.set_progress(operation="Compressing", status=f"Compressing {iso_path}", output_file=final_path)
+
+        raw_digest = self.checksums[os.path.basename(iso_path)]
+        progress = self.ctx.progress
 
         try:
-            if self.compression == "bz2":
-                compress_bz2(iso_path, final_path, self.ctx.log)
-            elif self.compression == "zstd":
-                compress_zstd(iso_path, final_path, self.ctx.log)
+            if self.compression in ("bz2", "zstd"):
+                if remote:
+                    with progress.running("compress"):
+                        result = compress_remote(
+                            iso_path, final_path, self.compression, self.ctx,
+                            on_progress=lambda fraction: progress.advance("compress", fraction=fraction),
+                        )
+                else:
+                    compress = compress_bz2 if self.compression == "bz2" else compress_zstd
+                    with io_budget.background(iso_path, final_path) as throttle, \
+                            self.ctx.phase(f"compress {self.compression}", "compress") as span, \
+                            progress.running("compress"):
+                        result = compress(
+                            iso_path, final_path, self.ctx.log, throttle,
+                            on_progress=lambda done: progress.advance("compress", done),
+                        )
+                        span.bytes = result["decompressed_bytes"]
+                        span.args["archive_bytes"] = result["archive_bytes"]
+                if result["decompressed"] != raw_digest:
+                    raise RuntimeError(
+                        f"Archive verification failed: decompressed {ALGORITHM} {result['decompressed']} "
+                        f"!= raw read {raw_digest}"
+                    )
+                self.checksums[os.path.basename(final_path)] = result["archive"]
+                DRIVE_BYTES.labels(self.drive_path, "written").inc(result.get("archive_bytes", 0))
+                self.ctx.log(f"🔒 Archive verified against raw read ({ALGORITHM})")
             else:
-                shutil.copy2(iso_path, final_path)
+                with io_budget.background(iso_path, final_path) as throttle, self.ctx.phase("finalize", "finalize") as span, \
+                        progress.running("finalize"):
+                    method, size = finalize_file(iso_path, final_path, throttle)
+                    span.bytes, span.args["method"] = size, method
+                self.checksums[os.path.basename(final_path)] = self.checksums.pop(os.path.basename(iso_path))
+                stats = FinalizeStats()
+                stats.add(method, size)
+                DRIVE_BYTES.labels(self.drive_path, "written").inc(size)
+                self.ctx.log(f"📄 {method.capitalize()} {os.path.basename(iso_path)} ({human_size(size)})")
+                self.ctx.set_progress(finalize=stats.as_dict())
 
+            write_manifest(f"{final_path}.{ALGORITHM}", self.checksums)
+            self.tiers.cleanup()
             self.ctx.log("✅ Compression complete")
-            self.ctx.set_progress(progress=100, status="completed")
+            self.ctx.set_progress(status="Compression complete", checksums=self.checksums)
 
         except Exception as e:
+            if os.path.exists(final_path):
+                os.remove(final_path)  # a partial or unverified archive is worse than none
             self.ctx.log(f"❌ Compression failed: {e}")
-            self.ctx.set_progress(progress=100, status="failed")
+            self.ctx.set_progress(operation="failed", status="Compression failed")
+            self.ctx.background_error = f"Compression failed: {e}"
+        finally:
+            self.tiers.release(self.temp_dir)
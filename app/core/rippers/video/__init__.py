@@ -1,8 +1,3 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.rippers.video.linux import VideoRipper
-elif platform.system() == "Windows":
-    from app.core.rippers.video.windows import VideoRipper
-elif platform.system() == "Darwin":
-    from app.core.rippers.video.macos import VideoRipper
\ No newline at end of file
+__getattr__, __dir__ = lazy_platform(__name__, "VideoRipper")
@@ -1,40 +1,51 @@
 import os
 import re
-import shutil
+import time
 from app.core.config import get_config
+from app.core.drivemanager import drive_manager
 from app.core.job.context import JobContext
+from app.core.job.spec import JobSpec
 from app.core.integrations.makemkv import MakeMKV
 from app.core.integrations.handbrake import HandBrake
+from app.core.integrations import mkvmerge
 from app.core.driveinfo.linux import LinuxDriveInfo
+from app.core.storage import TempTiers, InsufficientSpaceError, FinalizeStats, finalize_file, human_size, io_budget
+from app.core.metrics import DRIVE_BYTES
+from app.core.media import (
+    ChunkPolicy, EncodeAnalyzer, EncodeRates, MkvError, RemuxPlan, RemuxPolicy, RemuxStats, encode_chunked, probe_mkv,
+)
+from app.core.metadata import video_fingerprint, metadata_service, display_name
+from app.core.workers import remote_enabled, transcode_remote
+from app.core.storage.integrity import ALGORITHM, hash_file_async, write_manifest
 
 class VideoRipper:
-    def __init__(self, job_id: str, drive_path: str, config_section: str):
-        self.job_id = job_id
-        self.drive_path = os.path.realpath(drive_path)
-        self.ctx = JobContext(job_id)
+    def __init__(self, spec: JobSpec, config_section: str):
+        self.spec = spec
+        self.job_id = spec.job_id
+        self.drive_path = os.path.realpath(spec.drive_path)
+        self.ctx = JobContext(spec.job_id)
         self.config_section = config_section.upper()
-        self.disc_label = self._get_disc_label()
+        self.disc_label = spec.disc_label
 
         config = get_config()
-        self.base_temp = os.path.expanduser(config.get("General", "tempdirectory"))
+        self.tiers = TempTiers.from_config(config, spec.job_id)
         self.base_output = os.path.expanduser(config.get(self.config_section, "outputdirectory"))
         self.handbrake_enabled = config.get(self.config_section, "usehandbrake", fallback="true").lower() == "true"
         self.handbrake_preset_name = os.path.expanduser(config.get(self.config_section, "handbrakepreset_name"))
         self.handbrake_preset_path = os.path.expanduser(config.get(self.config_section, "handbrakepreset_path"))
         self.handbrake_format = config.get(self.config_section, "handbrakeformat", fallback="mkv")
+        self.remux_policy = RemuxPolicy.from_config(config, self.config_section) if self.handbrake_enabled else None
+        self.encode_rates = EncodeRates.from_config(config)
+        self.analyzer = EncodeAnalyzer.from_config(config, self.config_section) if self.handbrake_enabled else None
+        self.chunk_policy = ChunkPolicy.from_config(config, self.config_section) if self.handbrake_enabled else None
 
         self.temp_dir = None
         self.output_dir = None
-
-    def _get_disc_label(self) -> str:
-        info = LinuxDriveInfo().get_drive_info()
-        for d in info:
-            if os.path.realpath(d["path"]) == self.drive_path:
-                return d.get("disc_label", "UNTITLED")
-        return "UNTITLED"
+        self._pending_hashes = {}  # file name -> Future[hexdigest]
+        self.metadata = None
 
     def setup_dirs(self):
-        self.temp_dir = os.path.join(self.base_temp, self.job_id)
+        self.temp_dir = self.tiers.capacity_dir
         os.makedirs(self.temp_dir, exist_ok=True)
 
         safe_label = re.sub(r"[^\w.-]", "_", self.disc_label)[:64]
@@ -43,37 +54,366 @@ class VideoRipper:
 
         self.ctx.set_progress(temp_folder=self.temp_dir, output_folder=self.output_dir)
 
+    def _resolve_metadata(self):
+        mount_point = LinuxDriveInfo().get_mount_point(self.drive_path)
+        fingerprint = video_fingerprint(self.disc_label, mount_point, self.drive_path)
+        self.metadata = metadata_service.lookup(fingerprint)
+        name = display_name(self.metadata)
+        if name:
+            self.disc_label = name
+        self.ctx.set_progress(disc_label=self.disc_label, fingerprint=fingerprint["id"])
+
     def rip(self):
+        progress = self.ctx.progress
+        progress.plan("metadata", "metadata", 1)
+        progress.plan("scan", "scan", 1)
+        # Sized from the whole disc until the scan says which titles are ripped
+        self._plan_work(drive_manager.disc_size(self.drive_path), 1)
+        with self.ctx.phase("metadata lookup", "detect"), progress.running("metadata"):
+            self._resolve_metadata()
         self.setup_dirs()
         yield f"📁 Temp Dir: {self.temp_dir}"
         yield f"🎬 Disc Label: {self.disc_label}"
 
         yield "🔹 Starting MakeMKV..."
-        self.ctx.set_progress(operation="Ripping Disc", status="Using MakeMKV to rip...", progress=5)
+        self.ctx.set_progress(operation="Scanning Disc", status="Reading title list...")
         makemkv = MakeMKV()
-        if not makemkv.rip(self.drive_path, self.temp_dir, self.ctx):
+        with self.ctx.phase("scan", "scan") as span, progress.running("scan"):
+            titles = makemkv.scan(self.drive_path, self.ctx)
+            span.args["titles"] = len(titles or [])
+        if titles is None:
+            yield "❌ MakeMKV scan failed"
+            self.ctx.set_progress(status="MakeMKV scan failed", progress=100, operation="failed")
+            return
+
+        wanted = (self.metadata or {}).get("titles")
+        if wanted:
+            titles = [t for t in titles if t["id"] in wanted]
+            self.ctx.log(f"🎯 Ripping titles {wanted} (from {self.metadata['source']} metadata)")
+        if titles:
+            self._plan_work(sum(t["size"] for t in titles), len(titles))
+
+        try:
+            self.tiers.check([t["size"] for t in titles])
+        except InsufficientSpaceError as e:
+            yield f"❌ {e}"
+            self.ctx.set_progress(status="Not enough temp space", progress=100, operation="failed")
+            return
+
+        self.ctx.set_progress(operation="Ripping Disc", status="Using MakeMKV to rip...")
+        if cap := drive_manager.apply_speed_cap(self.drive_path):
+            self.ctx.log(f"🐢 Read speed capped at {cap}x")
+        read_start = time.monotonic()
+        progress.start("read")
+        ripped = self._rip_titles(makemkv, titles)
+        self.ctx.read_complete(ripped)
+        if ripped:
+            read_bytes = sum(os.path.getsize(os.path.join(d, f)) for d in self.tiers.dirs for f in os.listdir(d) if f.endswith(".mkv"))
+            drive_manager.observe_read(self.drive_path, read_bytes, time.monotonic() - read_start)
+            progress.plan("read", f"read:{self.spec.disc_type}", read_bytes, rate=drive_manager.read_rate(self.drive_path))
+        progress.finish("read", ripped)
+        if not ripped:
             yield "❌ MakeMKV failed"
             self.ctx.set_progress(status="MakeMKV failed", progress=100, operation="failed")
             return
 
         yield f"📤 Output Dir: {self.output_dir}"
 
-        mkvs = [os.path.join(self.temp_dir, f) for f in os.listdir(self.temp_dir) if f.endswith(".mkv")]
+        mkvs = sorted(
+            (os.path.join(d, f) for d in self.tiers.dirs for f in os.listdir(d) if f.endswith(".mkv")),
+            key=os.path.basename,
+        )
 
         if self.handbrake_enabled:
-            yield "🎞️ Starting HandBrake..."
-            self.ctx.set_progress(operation="Transcoding", status="Using HandBrake", progress=55)
-            hb = HandBrake(self.handbrake_preset_name, self.handbrake_preset_path)
-            if hb.transcode(mkvs, self.output_dir, self.ctx):
+            plans, to_encode = self._plan_remux(mkvs)
+            ok = True
+            if plans:
+                yield f"⏩ {len(plans)} of {len(mkvs)} titles already match the preset, remuxing instead of encoding"
+                self.ctx.set_progress(operation="Remuxing", status="Copying streams")
+                # A title mkvmerge can't handle still gets encoded
+                to_encode += self._remux(plans)
+                self._plan_encode(to_encode)
+            if to_encode:
+                yield "🎞️ Starting HandBrake..."
+                self.ctx.set_progress(operation="Transcoding", status="Using HandBrake")
+                ok = self._transcode(sorted(to_encode, key=os.path.basename))
+            if ok:
+                self.tiers.cleanup()
+                self._record_checksums()
                 yield f"✅ Transcoding complete. Files in: {self.output_dir}"
-                self.ctx.set_progress(operation="complete", status="Done", progress=100)
+                self.ctx.set_progress(operation="complete", status="Done")
             else:
                 yield "⚠️ HandBrake failed"
                 self.ctx.set_progress(operation="failed", status="HandBrake failed", progress=100)
         else:
-            yield "📦 Skipping HandBrake. Copying raw MKVs..."
-            for f in mkvs:
-                shutil.copy2(f, os.path.join(self.output_dir, os.path.basename(f)))
-                self.ctx.log(f"📄 Copied {f}")
-            self.ctx.set_progress(operation="complete", status="Raw MKVs copied", progress=100)
-            yield f"✅ Copied {len(mkvs)} MKV files to output."
+            yield "📦 Skipping HandBrake. Finalizing raw MKVs..."
+            self.ctx.set_progress(operation="Finalizing", status="Moving raw MKVs to output")
+            self.ctx.progress.plan("finalize", "finalize", sum(os.path.getsize(f) for f in mkvs))
+            stats = self._finalize(mkvs)
+            self.tiers.cleanup()
+            self._record_checksums()
+            self.ctx.set_progress(operation="complete", status="Raw MKVs finalized", finalize=stats.as_dict())
+            yield (
+                f"✅ Finalized {stats.files} MKV files: {human_size(stats.bytes_moved + stats.bytes_cloned)} moved/reflinked, "
+                f"{human_size(stats.bytes_copied)} copied."
+            )
+
+    def _plan_work(self, total: int, titles: int):
+        """Phases after the scan, for `total` bytes of titles; the probe re-plans the encode once it knows what remuxes."""
+        progress = self.ctx.progress
+        progress.plan("read", f"read:{self.spec.disc_type}", total, rate=drive_manager.read_rate(self.drive_path))
+        if not self.handbrake_enabled:
+            progress.plan("finalize", "finalize", total)
+            return
+        if self.analyzer is not None:
+            progress.plan("analyze", "analyze", titles)
+        progress.plan("transcode", "transcode", total, rate=self.encode_rates.rate(self.handbrake_preset_name))
+
+    def _plan_encode(self, to_encode: list[str]):
+        progress = self.ctx.progress
+        if not to_encode:
+            progress.skip("analyze")
+            progress.skip("transcode")
+            return
+        progress.plan("transcode", "transcode", sum(os.path.getsize(f) for f in to_encode),
+                      rate=self.encode_rates.rate(self.handbrake_preset_name))
+
+    def _transcode(self, mkvs: list[str]) -> bool:
+        extra_args = self._analyze(mkvs)
+        source_bytes = sum(os.path.getsize(f) for f in mkvs)
+        start = time.monotonic()
+        with self.ctx.progress.running("transcode"):
+            ok = self._run_transcode(mkvs, extra_args)
+        if ok:
+            self.encode_rates.observe(self.handbrake_preset_name, source_bytes, time.monotonic() - start)
+        return ok
+
+    def _analyze(self, mkvs: list[str]) -> dict[str, list[str]]:
+        """Per-title HandBrake options (crop, deinterlace, RF) from the pre-encode analysis."""
+        if self.analyzer is None:
+            return {}
+        hb = HandBrake(self.handbrake_preset_name, self.handbrake_preset_path)
+        extra_args, report = {}, {}
+        self.ctx.set_progress(status="Analyzing titles")
+        self.ctx.progress.plan("analyze", "analyze", len(mkvs))
+        with self.ctx.phase("analyze", "scan") as span, self.ctx.progress.running("analyze"):
+            for done, path in enumerate(mkvs):
+                self.ctx.progress.advance("analyze", done)
+                name = os.path.basename(path)
+                settings = self.analyzer.analyze(hb, path, self.disc_label, self.temp_dir)
+                if settings is None:
+                    self.ctx.log(f"⚠️ {name}: analysis failed, encoding with the preset as is")
+                    continue
+                extra_args[path] = settings.handbrake_args()
+                report[name] = settings.as_dict()
+                self.ctx.log(f"🔬 {name}: {settings.describe()}")
+            span.args.update(analyzed=len(report), cached=sum(r["cached"] for r in report.values()))
+        if report:
+            self.ctx.set_progress(analysis=report)
+        return extra_args
+
+    def _run_transcode(self, mkvs: list[str], extra_args: dict[str, list[str]]) -> bool:
+        progress = self.ctx.progress
+        if remote_enabled("transcode"):
+            if transcode_remote(
+                mkvs, self.output_dir, self.ctx,
+                self.handbrake_preset_name, self.handbrake_preset_path,
+                on_file_done=self._output_done, extra_args=extra_args,
+                on_progress=lambda fraction: progress.advance("transcode", fraction=fraction),
+            ):
+                return True
+            self.ctx.log("⚠️ Remote transcode failed, falling back to local HandBrake")
+
+        hb = HandBrake(self.handbrake_preset_name, self.handbrake_preset_path)
+        whole, done = [], 0  # source bytes of the titles encoded in parts
+        for path in mkvs:
+            size = os.path.getsize(path)
+            if self._encode_chunked(hb, path, extra_args.get(path, []), done):
+                done += size
+            else:
+                whole.append(path)
+        if not whole:
+            self.ctx.log("✅ Transcoding complete.")
+            return True
+        whole_bytes = sum(os.path.getsize(f) for f in whole)
+        return hb.transcode(
+            whole, self.output_dir, self.ctx, on_file_done=self._output_done, extra_args=extra_args,
+            on_progress=lambda fraction: progress.advance("transcode", done + fraction * whole_bytes),
+        )
+
+    def _encode_chunked(self, hb: HandBrake, path: str, args: list[str], done_before: int) -> bool:
+        """Encodes a long title as parallel pieces; False if it isn't eligible or that failed (encode it whole)."""
+        if self.chunk_policy is None or not mkvmerge.available():
+            return False
+        try:
+            info = probe_mkv(path)
+        except (MkvError, OSError):
+            return False
+        points = self.chunk_policy.split_points(info)
+        if not points:
+            return False
+
+        name = os.path.basename(path)
+        dest = os.path.join(self.output_dir, name)
+        size = os.path.getsize(path)
+        self.ctx.log(f"🧩 {name}: encoding {len(points) + 1} parts in parallel, cut at {', '.join(f'{p:.0f}s' for p in points)}")
+
+        def progress(pct: float):
+            self.ctx.progress.advance("transcode", done_before + size * pct / 100)
+
+        ok = encode_chunked(
+            hb, mkvmerge, info, dest, points, self.chunk_policy.tracks, args,
+            self.temp_dir, self.ctx.log, on_progress=progress, phase=self.ctx.phase,
+        )
+        if not ok:
+            self.ctx.log(f"⚠️ Split encode of {name} failed, encoding it in one piece")
+            return False
+        self._output_done(dest)
+        return True
+
+    def _plan_remux(self, mkvs: list[str]) -> tuple[dict[str, RemuxPlan], list[str]]:
+        """Splits titles into those whose streams already meet the preset (remux) and the rest (encode)."""
+        if self.remux_policy is None:
+            return {}, list(mkvs)
+        plans, to_encode = {}, []
+        with self.ctx.phase("probe", "scan") as span:
+            for path in mkvs:
+                name = os.path.basename(path)
+                try:
+                    plan, reason = self.remux_policy.plan(probe_mkv(path))
+                except (MkvError, OSError) as e:
+                    plan, reason = None, f"probe failed: {e}"
+                if plan:
+                    plans[path] = plan
+                    self.ctx.log(f"⏩ {name}: {plan.describe()} → remux")
+                else:
+                    to_encode.append(path)
+                    self.ctx.log(f"🎞️ {name}: {reason} → encode")
+            span.args.update(remux=len(plans), encode=len(to_encode))
+        if plans:
+            self.ctx.progress.plan("remux", "remux", sum(plan.source.size for plan in plans.values()))
+        self._plan_encode(to_encode)
+        return plans, to_encode
+
+    def _remux(self, plans: dict[str, RemuxPlan]) -> list[str]:
+        """Remuxes or finalizes each planned title; returns the ones that failed and need an encode."""
+        stats, failed = RemuxStats(), []
+        start = time.monotonic()
+        progress = self.ctx.progress
+        progress.start("remux")
+        done = 0
+        for path, plan in plans.items():
+            name = os.path.basename(path)
+            dest = os.path.join(self.output_dir, name)
+            with io_budget.background(path, dest) as throttle, self.ctx.phase(f"remux {name}", "transcode", input=path) as span:
+                if plan.drops_tracks and mkvmerge.available():
+                    audio_ids = [plan.source.tracks.index(t) for t in plan.audio]
+                    subtitle_ids = [plan.source.tracks.index(t) for t in plan.subtitles]
+                    ok = mkvmerge.remux(path, dest, audio_ids, subtitle_ids, self.ctx.log)
+                    if ok:
+                        os.remove(path)
+                else:
+                    if plan.drops_tracks:
+                        self.ctx.log(f"⚠️ mkvmerge not found, keeping every track of {name}")
+                    finalize_file(path, dest, throttle)
+                    ok = True
+                if not ok:
+                    span.args["failed"] = True
+                    self.ctx.log(f"⚠️ Remux of {name} failed, encoding it instead")
+                    failed.append(path)
+                    continue
+                span.bytes = os.path.getsize(dest)
+            self._output_done(dest)
+            stats.files += 1
+            stats.bytes += plan.source.size
+            done += plan.source.size
+            progress.advance("remux", done)
+        progress.finish("remux", not failed)
+
+        stats.seconds = time.monotonic() - start
+        estimate = self.encode_rates.estimate(self.handbrake_preset_name, stats.bytes)
+        if estimate is not None:
+            stats.saved_seconds = max(0.0, estimate - stats.seconds)
+        self.ctx.set_progress(remux=stats.as_dict())
+        if stats.files:
+            saved = f", about {stats.saved_seconds / 60:.0f} min of encoding saved" if stats.saved_seconds is not None else ""
+            self.ctx.log(f"⏱️ Remuxed {stats.files} titles ({human_size(stats.bytes)}) in {stats.seconds:.0f}s{saved}")
+        return failed
+
+    def _output_done(self, path: str):
+        """An encode or remux wrote `path` into the output directory. Raw MKVs are counted by _finalize_files."""
+        DRIVE_BYTES.labels(self.drive_path, "written").inc(os.path.getsize(path))
+        self._hash_in_background(path)
+
+    def _hash_in_background(self, path: str):
+        # Runs while the next title is still being ripped/encoded; the file is hot in page cache
+        self._pending_hashes[os.path.basename(path)] = hash_file_async(path)
+
+    def _record_checksums(self):
+        checksums = {name: future.result() for name, future in self._pending_hashes.items()}
+        if not checksums:
+            return
+        write_manifest(os.path.join(self.output_dir, f"checksums.{ALGORITHM}"), checksums)
+        self.ctx.set_progress(checksums=checksums, checksum_algorithm=ALGORITHM)
+        self.ctx.log(f"🔒 Recorded {ALGORITHM} checksums for {len(checksums)} files")
+
+    def _finalize(self, files: list[str]) -> FinalizeStats:
+        stats = FinalizeStats()
+        with io_budget.background(*self.tiers.dirs, self.output_dir) as throttle, self.ctx.phase("finalize", "finalize") as span, \
+                self.ctx.progress.running("finalize"):
+            self._finalize_files(files, stats, throttle)
+            span.bytes = stats.bytes_moved + stats.bytes_cloned + stats.bytes_copied
+            span.args.update(stats.as_dict())
+        return stats
+
+    def _finalize_files(self, files: list[str], stats: FinalizeStats, throttle):
+        done = 0
+        for f in files:
+            pending = self._pending_hashes.get(os.path.basename(f))
+            if pending:
+                pending.result()  # don't move a file out from under its checksum job
+            method, size = finalize_file(f, os.path.join(self.output_dir, os.path.basename(f)), throttle)
+            stats.add(method, size)
+            DRIVE_BYTES.labels(self.drive_path, "written").inc(size)
+            self.ctx.log(f"📄 {method.capitalize()} {os.path.basename(f)} ({human_size(size)})")
+            done += size
+            self.ctx.progress.advance("finalize", done)
+
+    def _rip_titles(self, makemkv: MakeMKV, titles: list[dict]) -> bool:
+        """Rips title by title so each lands on a temp tier that has room for its predicted size."""
+        if not titles:
+            with self.ctx.phase("read all titles", "read") as span, io_budget.foreground(self.temp_dir):
+                on_progress = lambda fraction: self.ctx.progress.advance("read", fraction=fraction)
+                if not makemkv.rip(self.drive_path, self.temp_dir, self.ctx, on_progress=on_progress):
+                    span.args["failed"] = True
+                    return False
+                span.bytes = sum(os.path.getsize(os.path.join(self.temp_dir, f)) for f in os.listdir(self.temp_dir) if f.endswith(".mkv"))
+            self._hash_new_mkvs(self.temp_dir)
+            return True
+
+        done = 0  # predicted bytes of the titles already read
+        for title in titles:
+            dest = self.tiers.place(title["size"])
+            on_progress = lambda fraction, before=done, size=title["size"]: self.ctx.progress.advance("read", before + fraction * size)
+            done += title["size"]
+
+            self.ctx.log(f"📀 Title {title['id']} ({human_size(title['size'])}) → {dest}")
+            try:
+                with self.ctx.phase(f"read title {title['id']}", "read", title=title["id"], temp=dest) as span, io_budget.foreground(dest):
+                    if not makemkv.rip(self.drive_path, dest, self.ctx, title=str(title["id"]), on_progress=on_progress):
+                        span.args["failed"] = True
+                        return False
+                    out = os.path.join(dest, title.get("filename") or "")
+                    span.bytes = os.path.getsize(out) if os.path.isfile(out) else title["size"]
+            finally:
+                self.tiers.release(dest, title["size"])
+            self._hash_new_mkvs(dest)
+        return True
+
+    def _hash_new_mkvs(self, directory: str):
+        # Raw MKVs are the final output, so checksum them while the next title reads
+        if self.handbrake_enabled:
+            return
+        for f in os.listdir(directory):
+            if f.endswith(".mkv") and f not in self._pending_hashes:
+                self._hash_in_background(os.path.join(directory, f))
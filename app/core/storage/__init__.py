@@ -0,0 +1,3 @@
+from app.core.storage.tiering import TempTiers, Tier, InsufficientSpaceError, human_size
+from app.core.storage.finalize import FinalizeStats, finalize_file
+from app.core.storage.iobudget import IoBudget, RateLimiter, io_budget, volume_of
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.core.job.control import spawn
+from app.core.job.timeline import wait_process
+from app.core.storage.iobudget import io_budget
+
+CHUNK = 4 * 1024 * 1024
+
+try:
+    import blake3
+    ALGORITHM = "blake3"
+    new_hasher = blake3.blake3
+except ImportError:
+    try:
+        import xxhash
+        ALGORITHM = "xxh3_128"
+        new_hasher = xxhash.xxh3_128
+    except ImportError:
+        ALGORITHM = "blake2b"
+        new_hasher = hashlib.blake2b
+
+# Hashes files whose writer is done, while their pages are still cached
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="integrity", initializer=io_budget.lower_thread_priority)
+
+
+def _pump(src, sinks: list, hasher, throttle: Optional[Callable[[int], None]] = None) -> int:
+    total = 0
+    buf = bytearray(CHUNK)
+    view = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            return total
+        chunk = view[:n]
+        hasher.update(chunk)
+        for sink in sinks:
+            sink.write(chunk)
+        total += n
+        if throttle:
+            throttle(n)
+
+
+def _counter(on_progress: Optional[Callable[[int], None]]) -> Optional[Callable[[int], None]]:
+    """Turns per-chunk sizes into running totals for an on_progress(bytes so far) callback."""
+    if on_progress is None:
+        return None
+    total = 0
+
+    def count(n: int):
+        nonlocal total
+        total += n
+        on_progress(total)
+    return count
+
+
+def hash_file(path: str) -> str:
+    hasher = new_hasher()
+    with open(path, "rb") as f:
+        _pump(f, [], hasher)
+    return hasher.hexdigest()
+
+
+def hash_file_async(path: str) -> Future:
+    return _pool.submit(hash_file, path)
+
+
+def tee_command_to_file(
+    command: list[str],
+    output_path: str,
+    on_output: Optional[Callable[[str], None]] = None,
+    preemptible: bool = False,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> tuple[int, str, int]:
+    """
+    Runs a command that writes its payload to stdout and its progress to stderr,
+    writing the payload to `output_path` and hashing it on the way through.
+    on_progress gets the bytes written so far. Returns (returncode, hexdigest, bytes_written).
+    """
+    process = spawn(command, preemptible, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    threading.Thread(target=_forward_lines, args=(process.stderr, on_output), daemon=True).start()
+
+    hasher = new_hasher()
+    with open(output_path, "wb") as out:
+        total = _pump(process.stdout, [out], hasher, _counter(on_progress))
+    process.stdout.close()
+    return wait_process(process), hasher.hexdigest(), total
+
+
+def compress_verified(
+    compress_cmd: list[str],
+    decompress_cmd: list[str],
+    output_path: str,
+    throttle: Optional[Callable[[int], None]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """
+    Streams `compress_cmd`'s stdout into `output_path` while feeding the same bytes to
+    `decompress_cmd`, so the archive hash and the round-trip hash of its decompressed
+    content are both available when the write finishes, without re-reading the archive.
+    The compressor runs at background I/O priority; throttle paces the archive writes.
+    on_progress gets the input bytes done so far (as the round trip has reproduced them).
+    """
+    compressor = spawn(io_budget.command(compress_cmd), preemptible=True, stdout=subprocess.PIPE)
+    checker = spawn(decompress_cmd, preemptible=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    roundtrip = {}
+
+    def hash_decompressed():
+        hasher = new_hasher()
+        roundtrip["bytes"] = _pump(checker.stdout, [], hasher, _counter(on_progress))
+        roundtrip["digest"] = hasher.hexdigest()
+
+    reader = threading.Thread(target=hash_decompressed, daemon=True)
+    reader.start()
+
+    archive_hasher = new_hasher()
+    try:
+        with open(output_path, "wb") as out:
+            archive_bytes = _pump(compressor.stdout, [out, checker.stdin], archive_hasher, throttle)
+    finally:
+        compressor.stdout.close()
+        checker.stdin.close()
+
+    if wait_process(compressor) != 0:
+        raise subprocess.CalledProcessError(compressor.returncode, compress_cmd)
+    reader.join()
+    if wait_process(checker) != 0:
+        raise subprocess.CalledProcessError(checker.returncode, decompress_cmd)
+
+    return {
+        "archive": archive_hasher.hexdigest(),
+        "archive_bytes": archive_bytes,
+        "decompressed": roundtrip["digest"],
+        "decompressed_bytes": roundtrip["bytes"],
+    }
+
+
+def write_manifest(manifest_path: str, checksums: dict[str, str]):
+    """Writes a `<digest>  <name>` sidecar next to the files it describes (b3sum/sha256sum layout)."""
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w") as f:
+        for name, digest in sorted(checksums.items()):
+            f.write(f"{digest}  {name}\n")
+    os.replace(tmp, manifest_path)
+
+
+def _forward_lines(stream, on_output: Optional[Callable[[str], None]]):
+    # dd redraws its progress line with carriage returns, so split on both
+    pending = b""
+    for chunk in iter(lambda: stream.read1(4096), b""):
+        pending += chunk.replace(b"\r", b"\n")
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line = line.decode(errors="replace").strip()
+            if line and on_output:
+                on_output(line)
+    stream.close()
@@ -0,0 +1,299 @@
+"""
+Disk I/O admission between drive reads and background stages.
+
+Drive reads (MakeMKV, dd, cdparanoia) register the volume they write to as foreground.
+Background stages (finalize copies, remuxes, ISO compression) take one of a few slots
+per volume and run at a low I/O priority. While a foreground read shares a volume that
+/proc/diskstats shows as busy, their copy loops are also paced down to a floor rate.
+Drive reads themselves are never throttled, so a slow disk can't starve the drive's
+read buffer.
+"""
+import ctypes
+import logging
+import os
+import platform
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from app.core.config import get_config, subscribe
+from app.core.metrics import DISK_MBPS, DISK_UTILIZATION, IO_THROTTLE_SECONDS
+
+DISKSTATS = "/proc/diskstats"
+SAMPLE_INTERVAL = 1.0
+SECTOR_BYTES = 512
+
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1  # with a thread id: that thread only
+IONICE = {"idle": (3, 0), "besteffort": (2, 7)}
+SYSCALLS = {  # (ioprio_set, ioprio_get)
+    "x86_64": (251, 252),
+    "aarch64": (30, 31),
+    "armv7l": (314, 315),
+    "i686": (289, 290),
+}
+
+
+class IoSettings(NamedTuple):
+    enabled: bool
+    busy_utilization: float  # 0-1
+    min_mbps: float  # pace of a throttled background stage
+    max_mbps: float  # 0 = unlimited when not throttled
+    slots: int  # concurrent background stages per volume
+    ionice: str  # idle, besteffort or none
+
+
+class VolumeStats(NamedTuple):
+    utilization: float  # share of the last interval with I/O in flight
+    read_mbps: float
+    write_mbps: float
+
+
+@lru_cache(maxsize=64)
+def _device_name(dev: int) -> Optional[str]:
+    real = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    if not os.path.isdir(real):
+        return None  # tmpfs, NFS, overlay: no block device to watch
+    if os.path.exists(os.path.join(real, "partition")):
+        real = os.path.dirname(real)  # contention is per disk, not per partition
+    return os.path.basename(real)
+
+
+def volume_of(path: str) -> Optional[str]:
+    """The /proc/diskstats device holding path (or its nearest existing parent)."""
+    path = os.path.abspath(os.path.expanduser(path))
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return _device_name(os.stat(path).st_dev)
+
+
+def read_diskstats() -> Dict[str, tuple[int, int, int]]:
+    """device -> (sectors read, sectors written, ms with I/O in flight)."""
+    stats = {}
+    with open(DISKSTATS) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 13:
+                stats[fields[2]] = (int(fields[5]), int(fields[9]), int(fields[12]))
+    return stats
+
+
+@lru_cache(maxsize=1)
+def _libc() -> ctypes.CDLL:
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def _ioprio_syscall(index: int, *args) -> int:
+    numbers = SYSCALLS.get(platform.machine())
+    if numbers is None:
+        return -1
+    return _libc().syscall(numbers[index], *args)
+
+
+def set_thread_ioprio(value: int) -> Optional[int]:
+    """Sets the calling thread's I/O priority; returns the previous one, or None if unsupported."""
+    tid = threading.get_native_id()
+    previous = _ioprio_syscall(1, IOPRIO_WHO_PROCESS, tid)
+    if previous < 0 or _ioprio_syscall(0, IOPRIO_WHO_PROCESS, tid, value) < 0:
+        return None
+    return previous
+
+
+def ioprio_value(name: str) -> Optional[int]:
+    if name not in IONICE:
+        return None
+    cls, level = IONICE[name]
+    return cls << IOPRIO_CLASS_SHIFT | level
+
+
+class RateLimiter:
+    """Paces a copy loop: called with each chunk's size, sleeps while its volumes need the bandwidth."""
+
+    def __init__(self, budget: "IoBudget", volumes: List[str]):
+        self.budget = budget
+        self.volumes = volumes
+        self.label = ",".join(volumes) or "untracked"
+        self.slept = 0.0
+        self._last = time.monotonic()
+
+    def __call__(self, nbytes: int):
+        rate = self.budget.rate_for(self.volumes)
+        now = time.monotonic()
+        if rate:
+            wait = nbytes / rate - (now - self._last)
+            if wait > 0:
+                time.sleep(wait)
+                self.slept += wait
+                IO_THROTTLE_SECONDS.labels(self.label).inc(wait)
+                now = time.monotonic()
+        self._last = now
+
+
+class IoBudget:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._settings: Optional[IoSettings] = None
+        self._foreground: Dict[str, int] = {}  # volume -> drive reads writing to it
+        self._background: Dict[str, int] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, VolumeStats] = {}
+        self._sampler: Optional[threading.Thread] = None
+        subscribe(self.reload)
+
+    @property
+    def settings(self) -> IoSettings:
+        if self._settings is None:
+            self.reload()
+        return self._settings
+
+    def reload(self, config=None):
+        config = config or get_config()
+        settings = IoSettings(
+            config.get("IO", "admission", fallback="true").lower() == "true",
+            config.getfloat("IO", "busyutilization", fallback=80) / 100,
+            config.getfloat("IO", "backgroundminmbps", fallback=20),
+            config.getfloat("IO", "backgroundmaxmbps", fallback=0),
+            max(1, config.getint("IO", "backgroundslots", fallback=2)),
+            config.get("IO", "ionice", fallback="besteffort").lower(),
+        )
+        with self.lock:
+            if self._settings and settings.slots != self._settings.slots:
+                self._slots.clear()  # new stages get the new count; running ones release into the old semaphore
+            self._settings = settings
+
+    def command(self, command: List[str]) -> List[str]:
+        """Prefixes a background command with ionice (when configured and installed)."""
+        name = self.settings.ionice
+        if name not in IONICE or not shutil.which("ionice"):
+            return command
+        cls, level = IONICE[name]
+        return ["ionice", "-c", str(cls), *(["-n", str(level)] if cls == 2 else []), *command]
+
+    def lower_thread_priority(self):
+        """For threads that only ever do background I/O (hash pool initializer)."""
+        value = ioprio_value(self.settings.ionice)
+        if value is not None:
+            set_thread_ioprio(value)
+
+    @contextmanager
+    def foreground(self, path: str) -> Iterator[None]:
+        """Marks path's volume as being written by a drive read for the duration."""
+        volume = volume_of(path)
+        if volume is None or not self.settings.enabled:
+            yield
+            return
+        with self.lock:
+            self._foreground[volume] = self._foreground.get(volume, 0) + 1
+        self._ensure_sampler()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self._foreground[volume] -= 1
+
+    @contextmanager
+    def background(self, *paths: str) -> Iterator[Callable[[int], None]]:
+        """
+        Runs a heavy background stage touching paths: waits for a slot on each of their
+        volumes, lowers the thread's I/O priority and yields a RateLimiter for its copy loop.
+        """
+        volumes = sorted({v for v in map(volume_of, paths) if v})
+        settings = self.settings
+        if not settings.enabled:
+            yield RateLimiter(self, [])
+            return
+        with self.lock:
+            slots = [self._slots.setdefault(v, threading.BoundedSemaphore(settings.slots)) for v in volumes]
+        waited = time.monotonic()
+        for slot in slots:  # sorted order, so two stages can't each hold the other's volume
+            slot.acquire()
+        waited = time.monotonic() - waited
+        if waited > 1:
+            logging.info(f"[IO] Background stage on {','.join(volumes)} waited {waited:.0f}s for a slot")
+        value = ioprio_value(settings.ionice)
+        previous = set_thread_ioprio(value) if value is not None else None
+        with self.lock:
+            for v in volumes:
+                self._background[v] = self._background.get(v, 0) + 1
+        self._ensure_sampler()
+        try:
+            yield RateLimiter(self, volumes)
+        finally:
+            with self.lock:
+                for v in volumes:
+                    self._background[v] -= 1
+            if previous is not None:
+                set_thread_ioprio(previous)
+            for slot in reversed(slots):
+                slot.release()
+
+    def rate_for(self, volumes: List[str]) -> Optional[float]:
+        """Bytes/s a background stage on volumes may use right now; None = unlimited."""
+        settings = self.settings
+        if not settings.enabled:
+            return None
+        with self.lock:
+            contended = any(
+                self._foreground.get(v) and v in self._stats and self._stats[v].utilization >= settings.busy_utilization
+                for v in volumes
+            )
+        if contended:
+            return settings.min_mbps * 1e6
+        return settings.max_mbps * 1e6 or None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self.lock:
+            volumes = set(self._stats) | set(self._foreground) | set(self._background)
+            return {
+                v: {
+                    **(self._stats[v]._asdict() if v in self._stats else {}),
+                    "foreground": self._foreground.get(v, 0),
+                    "background": self._background.get(v, 0),
+                }
+                for v in sorted(volumes)
+            }
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            with self.lock:
+                if self._sampler is None or not self._sampler.is_alive():
+                    self._sampler = threading.Thread(target=self._sample_loop, name="io-sampler", daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self):
+        try:
+            previous, at = read_diskstats(), time.monotonic()
+        except OSError as e:
+            logging.warning(f"[IO] {DISKSTATS} unavailable, background stages won't be paced: {e}")
+            return
+        while True:
+            time.sleep(SAMPLE_INTERVAL)
+            current, now = read_diskstats(), time.monotonic()
+            elapsed = now - at
+            with self.lock:
+                watched = set(self._foreground) | set(self._background)
+            stats = {}
+            for volume in watched:
+                if volume not in current or volume not in previous:
+                    continue
+                read, written, busy_ms = (c - p for c, p in zip(current[volume], previous[volume]))
+                stats[volume] = VolumeStats(
+                    min(1.0, busy_ms / 1000 / elapsed),
+                    read * SECTOR_BYTES / elapsed / 1e6,
+                    written * SECTOR_BYTES / elapsed / 1e6,
+                )
+                DISK_UTILIZATION.labels(volume).set(round(stats[volume].utilization, 3))
+                DISK_MBPS.labels(volume, "read").set(round(stats[volume].read_mbps, 1))
+                DISK_MBPS.labels(volume, "write").set(round(stats[volume].write_mbps, 1))
+            with self.lock:
+                self._stats.update(stats)
+            previous, at = current, now
+
+
+io_budget = IoBudget()
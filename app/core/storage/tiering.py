@@ -0,0 +1,125 @@
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+GIB = 1024 ** 3
+
+# Space promised to in-flight writes, shared by every job: tier base -> bytes
+_reserved: Dict[str, int] = {}
+_reserved_lock = threading.Lock()
+
+
+class InsufficientSpaceError(RuntimeError):
+    pass
+
+
+def human_size(num_bytes: int) -> str:
+    size = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+@dataclass
+class Tier:
+    name: str
+    base: str
+    reserve: int = 0
+
+    def free_bytes(self) -> int:
+        os.makedirs(self.base, exist_ok=True)
+        return shutil.disk_usage(self.base).free
+
+    def available(self) -> int:
+        with _reserved_lock:
+            promised = _reserved.get(self.base, 0)
+        return max(0, self.free_bytes() - self.reserve - promised)
+
+
+class TempTiers:
+    """
+    Staging area for job temp data, split into an optional fast tier (tmpfs/NVMe)
+    and the capacity tier from [General] tempdirectory. Files are placed on the
+    fastest tier that can hold their predicted size and spill over otherwise.
+    """
+
+    def __init__(self, job_id: str, tiers: List[Tier]):
+        self.job_id = job_id
+        self.tiers = tiers
+        self._held: Dict[str, List[int]] = {}  # job dir -> outstanding reservations
+
+    @classmethod
+    def from_config(cls, config, job_id: str) -> "TempTiers":
+        tiers = []
+        fast = config.get("General", "fasttempdirectory", fallback="").strip()
+        if fast:
+            tiers.append(Tier(
+                "fast",
+                os.path.expanduser(fast),
+                int(config.getfloat("General", "fasttempreservegb", fallback=1) * GIB),
+            ))
+        tiers.append(Tier(
+            "capacity",
+            os.path.expanduser(config.get("General", "tempdirectory")),
+            int(config.getfloat("General", "tempreservegb", fallback=2) * GIB),
+        ))
+        return cls(job_id, tiers)
+
+    @property
+    def capacity_dir(self) -> str:
+        return self.job_dir(self.tiers[-1])
+
+    @property
+    def dirs(self) -> List[str]:
+        return [self.job_dir(t) for t in self.tiers if os.path.isdir(self.job_dir(t))]
+
+    def job_dir(self, tier: Tier) -> str:
+        return os.path.join(tier.base, self.job_id)
+
+    def check(self, sizes: List[int]):
+        """Raise InsufficientSpaceError unless every predicted size can be placed right now."""
+        available = {t.base: t.available() for t in self.tiers}
+        for size in sorted(sizes, reverse=True):
+            tier = next((t for t in self.tiers if available[t.base] >= size), None)
+            if tier is None:
+                total = sum(available.values())
+                raise InsufficientSpaceError(
+                    f"Not enough temp space: need {human_size(sum(sizes))} "
+                    f"(largest file {human_size(max(sizes))}), {human_size(total)} available"
+                )
+            available[tier.base] -= size
+
+    def place(self, size: int) -> str:
+        """Reserve `size` bytes on the fastest tier that fits and return the job dir on it."""
+        for tier in self.tiers:
+            with _reserved_lock:
+                promised = _reserved.get(tier.base, 0)
+                if tier.free_bytes() - tier.reserve - promised < size:
+                    continue
+                _reserved[tier.base] = promised + size
+            path = self.job_dir(tier)
+            os.makedirs(path, exist_ok=True)
+            self._held.setdefault(path, []).append(size)
+            return path
+        raise InsufficientSpaceError(f"No temp tier can hold {human_size(size)}")
+
+    def release(self, path: str, size: Optional[int] = None):
+        """Drop a reservation once its file is fully written (free space now reflects it)."""
+        held = self._held.get(path)
+        if not held:
+            return
+        size = held.pop(held.index(size)) if size in held else held.pop()
+        base = os.path.dirname(path)
+        with _reserved_lock:
+            _reserved[base] = max(0, _reserved.get(base, 0) - size)
+
+    def cleanup(self):
+        for path in list(self._held):
+            while self._held.get(path):
+                self.release(path)
+        for tier in self.tiers:
+            shutil.rmtree(self.job_dir(tier), ignore_errors=True)
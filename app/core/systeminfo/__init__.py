@@ -1,8 +1,6 @@
-import platform
+from app.core.backends import lazy_platform
 
-if platform.system() == "Linux":
-    from app.core.systeminfo.linux import LinuxSystemInfo as SystemInfo
-elif platform.system() == "Windows":
-    from app.core.systeminfo.windows import WindowsSystemInfo as SystemInfo
-elif platform.system() == "Darwin":
-    from app.core.systeminfo.macos import MacosSystemInfo as SystemInfo
+__getattr__, __dir__ = lazy_platform(
+    __name__,
+    SystemInfo={"linux": "LinuxSystemInfo", "windows": "WindowsSystemInfo", "macos": "MacosSystemInfo"},
+)
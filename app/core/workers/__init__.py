@@ -0,0 +1,2 @@
+from app.core.workers.registry import worker_registry, Worker, Task
+from app.core.workers.dispatch import remote_enabled, transcode_remote, compress_remote
@@ -0,0 +1,115 @@
+import os
+import time
+from typing import Callable, Optional
+
+from app.core.config import get_config
+from app.core.job.context import JobContext
+from app.core.job.timeline import Span
+from app.core.workers.registry import Task, worker_registry
+
+POLL_INTERVAL = 1.0
+
+
+def task_timeout() -> float:
+    """Seconds a remote task may take before the job gives up on it (and encodes locally)."""
+    return get_config().getfloat("Workers", "tasktimeoutminutes", fallback=360) * 60
+
+
+def remote_enabled(kind: str) -> bool:
+    config = get_config()
+    return config.getboolean("Workers", "enabled", fallback=False) and worker_registry.has_workers(kind)
+
+
+def transcode_remote(
+    mkv_files: list[str],
+    output_dir: str,
+    ctx: JobContext,
+    preset_name: str,
+    preset_file: Optional[str] = None,
+    on_file_done: Optional[Callable[[str], None]] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    extra_args: Optional[dict[str, list[str]]] = None,
+) -> bool:
+    """Fans the job's MKVs out to registered workers, one task per file; blocks until all finish."""
+    params = {"preset_name": preset_name}
+    if preset_file and os.path.isfile(preset_file):
+        with open(preset_file, "r") as f:
+            params["preset_json"] = f.read()
+
+    tasks = [
+        worker_registry.submit(
+            ctx.job_id, "transcode", mkv, os.path.join(output_dir, os.path.basename(mkv)),
+            {**params, "args": (extra_args or {}).get(mkv, [])}, timeout=task_timeout(),
+        )
+        for mkv in mkv_files
+    ]
+    ctx.log(f"🛰️ Dispatched {len(tasks)} transcodes to remote workers")
+    return _wait_all(tasks, ctx, on_progress, on_file_done)
+
+
+def compress_remote(
+    input_path: str, output_path: str, fmt: str, ctx: JobContext,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> dict:
+    """Ships an ISO to a worker for compression; returns the same digest dict as compress_bz2/compress_zstd."""
+    task = worker_registry.submit(ctx.job_id, "compress", input_path, output_path, {"format": fmt}, timeout=task_timeout())
+    ctx.log(f"🛰️ Dispatched {fmt} compression to a remote worker")
+    if not _wait_all([task], ctx, on_progress, None):
+        raise RuntimeError(f"Remote compression failed: {task.error}")
+    return task.result
+
+
+def _record_span(task: Task, ctx: JobContext):
+    """Remote work runs elsewhere, so its span is rebuilt from the task's timestamps (no rusage)."""
+    name = os.path.basename(task.input_path)
+    span = Span(f"{task.kind} {name}", task.kind, worker=task.worker_id, attempts=task.attempts, remote=True)
+    span.start = task.started_at or task.submitted_at
+    span.end = task.finished_at or time.time()
+    span.bytes = task.result.get("uploaded_bytes", 0)
+    if task.status != "done":
+        span.args["failed"] = True
+    ctx.add_span(span)
+
+
+def _wait_all(
+    tasks: list[Task],
+    ctx: JobContext,
+    on_progress: Optional[Callable[[float], None]],
+    on_file_done: Optional[Callable[[str], None]],
+) -> bool:
+    """Blocks until every task is done; on_progress gets the fraction of the input bytes processed."""
+    sizes = {t.task_id: (os.path.getsize(t.input_path) if os.path.exists(t.input_path) else 1) for t in tasks}
+    total = sum(sizes.values()) or 1
+    pending = list(tasks)
+    ok = True
+    last = None
+
+    try:
+        while pending:
+            ctx.control.check()  # a cancelled job stops waiting; the workers' results are dropped
+            # Dead workers are only noticed when someone looks; without this a task whose
+            # worker vanished would sit queued forever
+            worker_registry.check(pending)
+            for task in list(pending):
+                if not task.done.is_set():
+                    continue
+                pending.remove(task)
+                _record_span(task, ctx)
+                if task.status == "done":
+                    ctx.log(f"✅ Worker finished {os.path.basename(task.output_path)}")
+                    if on_file_done:
+                        on_file_done(task.output_path)
+                else:
+                    ok = False
+                    ctx.log(f"❌ Remote {task.kind} of {os.path.basename(task.input_path)} failed: {task.error}")
+
+            weighted = sum(t.progress * sizes[t.task_id] for t in tasks) / (100 * total)
+            if on_progress and weighted != last:
+                on_progress(weighted)
+                last = weighted
+            if pending:
+                pending[0].done.wait(POLL_INTERVAL)
+    finally:
+        for task in tasks:
+            worker_registry.forget(task.task_id)
+    return ok
@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from app.core.metrics import QUEUE_DEPTH
+
+HEARTBEAT_TIMEOUT = 30
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class Worker:
+    worker_id: str
+    name: str
+    capabilities: List[str]
+    slots: int = 1
+    load: float = 0.0  # worker-reported CPU load, 0..1
+    last_seen: float = field(default_factory=time.time)
+    queue: Deque[str] = field(default_factory=deque)  # assigned, not yet picked up
+    running: set = field(default_factory=set)
+
+    def score(self) -> float:
+        """Lower is better: slot occupancy plus reported CPU load."""
+        return (len(self.queue) + len(self.running)) / max(1, self.slots) + self.load
+
+    def as_dict(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "name": self.name,
+            "capabilities": self.capabilities,
+            "slots": self.slots,
+            "load": self.load,
+            "last_seen": self.last_seen,
+            "queued": len(self.queue),
+            "running": len(self.running),
+        }
+
+
+@dataclass
+class Task:
+    task_id: str
+    job_id: str
+    kind: str  # "transcode" | "compress"
+    input_path: str
+    output_path: str
+    params: dict = field(default_factory=dict)
+    status: str = "queued"  # queued | assigned | running | done | failed
+    worker_id: Optional[str] = None
+    attempts: int = 0
+    progress: float = 0.0
+    error: Optional[str] = None
+    result: dict = field(default_factory=dict)
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    deadline: Optional[float] = None  # failed if not done by then, whatever the workers say
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def payload(self) -> dict:
+        return {
+            "task_id": self.task_id,
+            "job_id": self.job_id,
+            "worker_id": self.worker_id,  # sent back with uploads and completions to prove ownership
+            "kind": self.kind,
+            "input_name": self.input_path.rsplit("/", 1)[-1],
+            "output_name": self.output_path.rsplit("/", 1)[-1],
+            "params": self.params,
+        }
+
+
+class WorkerRegistry:
+    """
+    Coordinator-side bookkeeping for remote transcode/compression workers.
+    Tasks are pushed to the least-loaded capable worker; workers long-poll for them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.workers: Dict[str, Worker] = {}
+        self.tasks: Dict[str, Task] = {}
+        self.pending: Deque[str] = deque()  # tasks no capable worker could take yet
+        QUEUE_DEPTH.labels("worker_tasks_unassigned").set_function(lambda: len(self.pending))
+        QUEUE_DEPTH.labels("worker_tasks_assigned").set_function(
+            lambda: sum(len(w.queue) + len(w.running) for w in list(self.workers.values()))
+        )
+
+    def register(self, name: str, capabilities: List[str], slots: int = 1) -> str:
+        worker_id = str(uuid.uuid4())
+        with self.changed:
+            self.workers[worker_id] = Worker(worker_id, name, capabilities, max(1, slots))
+            self._drain_pending()
+            self.changed.notify_all()
+        logging.info(f"[Workers] Registered {name} ({worker_id}) with {slots} slots: {capabilities}")
+        return worker_id
+
+    def heartbeat(self, worker_id: str, load: float = 0.0) -> bool:
+        with self.changed:
+            worker = self.workers.get(worker_id)
+            if not worker:
+                return False
+            worker.last_seen = time.time()
+            worker.load = max(0.0, float(load))
+            self._expire_workers()
+            return True
+
+    def has_workers(self, kind: str) -> bool:
+        with self.lock:
+            self._expire_workers()
+            return any(kind in w.capabilities for w in self.workers.values())
+
+    def list_workers(self) -> List[dict]:
+        with self.lock:
+            self._expire_workers()
+            return [w.as_dict() for w in self.workers.values()]
+
+    def submit(
+        self, job_id: str, kind: str, input_path: str, output_path: str,
+        params: Optional[dict] = None, timeout: Optional[float] = None,
+    ) -> Task:
+        task = Task(str(uuid.uuid4()), job_id, kind, input_path, output_path, params or {})
+        if timeout:
+            task.deadline = task.submitted_at + timeout
+        with self.changed:
+            self.tasks[task.task_id] = task
+            if not self._assign(task):
+                self.pending.append(task.task_id)
+            self.changed.notify_all()
+        return task
+
+    def next_task(self, worker_id: str, timeout: float = 25) -> Optional[Task]:
+        """Blocks until a task is assigned to this worker (or the timeout passes; 0 only checks)."""
+        deadline = time.time() + timeout
+        with self.changed:
+            while True:
+                worker = self.workers.get(worker_id)
+                if not worker:
+                    return None
+                worker.last_seen = time.time()
+                if worker.queue:
+                    task = self.tasks[worker.queue.popleft()]
+                    task.status, task.started_at = "running", time.time()
+                    worker.running.add(task.task_id)
+                    return task
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.changed.wait(remaining)
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        return self.tasks.get(task_id)
+
+    def owns(self, task_id: str, worker_id: Optional[str]) -> bool:
+        """The worker is the task's current assignee; a task retried or given up on has moved on."""
+        task = self.tasks.get(task_id)
+        return task is not None and worker_id is not None and task.worker_id == worker_id and not task.done.is_set()
+
+    def report_progress(self, task_id: str, worker_id: Optional[str], progress: float):
+        task = self.tasks.get(task_id)
+        if task and self.owns(task_id, worker_id):
+            task.progress = max(0.0, min(100.0, float(progress)))
+
+    def complete(self, task_id: str, worker_id: Optional[str], ok: bool, error: Optional[str] = None, result: Optional[dict] = None) -> bool:
+        """Applies a worker's result; False (and nothing changes) if that worker no longer owns the task."""
+        with self.changed:
+            task = self.tasks.get(task_id)
+            if not task or not self.owns(task_id, worker_id):
+                return False
+            worker = self.workers.get(task.worker_id)
+            if worker:
+                worker.running.discard(task_id)
+            task.result = result or {}
+            task.error = error
+            if ok:
+                task.status, task.progress, task.finished_at = "done", 100.0, time.time()
+                task.done.set()
+            else:
+                self._retry(task)
+            self._drain_pending()
+            self.changed.notify_all()
+            return True
+
+    def check(self, tasks: List[Task]):
+        """
+        Called by whoever waits on tasks: expires silent workers (requeueing their work) and
+        fails tasks past their deadline or that no registered worker is able to take.
+        """
+        now = time.time()
+        with self.changed:
+            self._expire_workers()
+            for task in tasks:
+                if task.done.is_set():
+                    continue
+                if task.deadline and now > task.deadline:
+                    self._fail(task, f"no result within {(task.deadline - task.submitted_at) / 60:.0f} min")
+                elif task.status == "queued" and not any(task.kind in w.capabilities for w in self.workers.values()):
+                    self._fail(task, f"no {task.kind} worker left ({task.error})" if task.error else f"no {task.kind} worker left")
+            self.changed.notify_all()
+
+    def forget(self, task_id: str):
+        with self.lock:
+            self.tasks.pop(task_id, None)
+
+    # -- internal, called with self.lock held --
+
+    def _assign(self, task: Task) -> bool:
+        candidates = [w for w in self.workers.values() if task.kind in w.capabilities]
+        if not candidates:
+            return False
+        worker = min(candidates, key=Worker.score)
+        task.worker_id = worker.worker_id
+        task.status = "assigned"
+        task.attempts += 1
+        worker.queue.append(task.task_id)
+        return True
+
+    def _drain_pending(self):
+        for _ in range(len(self.pending)):
+            task_id = self.pending.popleft()
+            task = self.tasks.get(task_id)
+            if task and not self._assign(task):
+                self.pending.append(task_id)
+
+    def _fail(self, task: Task, error: str):
+        worker = self.workers.get(task.worker_id)
+        if worker:
+            if task.task_id in worker.queue:
+                worker.queue.remove(task.task_id)
+            worker.running.discard(task.task_id)
+        if task.task_id in self.pending:
+            self.pending.remove(task.task_id)
+        task.status, task.error, task.worker_id, task.finished_at = "failed", error, None, time.time()
+        logging.warning(f"[Workers] {task.kind} task {task.task_id} failed: {error}")
+        task.done.set()
+
+    def _retry(self, task: Task):
+        if task.attempts >= MAX_ATTEMPTS:
+            task.status, task.finished_at = "failed", time.time()
+            task.done.set()
+            return
+        task.status, task.worker_id, task.progress = "queued", None, 0.0
+        if not self._assign(task):
+            self.pending.append(task.task_id)
+
+    def _expire_workers(self):
+        cutoff = time.time() - HEARTBEAT_TIMEOUT
+        for worker_id, worker in list(self.workers.items()):
+            if worker.last_seen >= cutoff:
+                continue
+            logging.warning(f"[Workers] {worker.name} ({worker_id}) timed out; requeueing its tasks")
+            del self.workers[worker_id]
+            for task_id in list(worker.queue) + list(worker.running):
+                task = self.tasks.get(task_id)
+                if task and not task.done.is_set():
+                    task.error = f"worker {worker.name} timed out"
+                    self._retry(task)
+            self.changed.notify_all()
+
+
+# Singleton
+worker_registry = WorkerRegistry()
@@ -0,0 +1,121 @@
+"""
+Output catalog at library scale: fills a catalog with synthetic rows, then times
+search pages (browse, full-text, filtered, deep keyset pages) and a rescan of an
+unchanged tree of real (empty) files.
+
+    python -m bench.catalog --rows 100000 --tree-files 20000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.core.catalog import CatalogStore
+from app.core.catalog.service import Catalog, CatalogSettings
+
+WORDS = ["alien", "batman", "casablanca", "dune", "eraserhead", "fargo", "gattaca", "heat", "inception", "jaws",
+         "season", "disc", "extras", "live", "concert", "collection", "remastered", "directors", "cut", "anniversary"]
+CATEGORIES = [("dvd", "dvd_video", "mpeg2"), ("bluray", "bluray_video", "hevc"), ("cd", "audio_cd", None), ("iso", "dvd_rom", None)]
+
+
+def fill(store: CatalogStore, rows: int):
+    rng = random.Random(1)
+    batch = []
+    for i in range(rows):
+        category, disc_type, codec = CATEGORIES[i % len(CATEGORIES)]
+        label = "_".join(rng.sample(WORDS, 3)).upper() + f"_{i // 20}"
+        directory = f"/library/{category}/{label}"
+        batch.append({
+            "path": f"{directory}/title_t{i % 20:02}.mkv", "dir": directory, "category": category,
+            "name": f"title_t{i % 20:02}.mkv", "label": label, "disc_type": disc_type, "job_id": f"job-{i // 20}",
+            "size": rng.randint(1, 40) * 10**9, "mtime": 1.7e9 + i, "duration": rng.uniform(600, 10800),
+            "video_codec": codec, "resolution": "1920x1080" if codec else None,
+            "audio_codecs": "ac3,dts" if codec else "flac", "languages": "eng,deu", "checksum": f"{i:064x}",
+            "checksum_algorithm": "blake3",
+        })
+        if len(batch) == 5000:
+            store.upsert(batch)
+            batch = []
+    store.upsert(batch)
+
+
+def timed(fn, repeat: int = 20) -> tuple[float, object]:
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def cursor_at(store: CatalogStore, pages: int, **kwargs):
+    """The cursor a client holds after paging through `pages` pages."""
+    cursor = None
+    for _ in range(pages):
+        cursor = store.search(cursor=cursor, **kwargs)["next_cursor"]
+    return cursor
+
+
+def bench_tree(root: str, files: int):
+    per_dir = 10
+    for i in range(files):
+        directory = os.path.join(root, "DVD", f"LABEL_{i // per_dir:05}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"title_t{i % per_dir:02}.mkv"), "wb").close()
+    past = time.time() - 3600  # settled, so unchanged directories can be skipped
+    for directory, _, names in os.walk(root):
+        for name in names:
+            os.utime(os.path.join(directory, name), (past, past))
+        os.utime(directory, (past, past))
+
+    catalog = Catalog()
+    catalog._settings = CatalogSettings(True, os.path.join(root, "tree.db"), False, 0, ((os.path.join(root, "DVD"), "dvd"),))
+    for label in ("initial", "unchanged"):
+        start = time.perf_counter()
+        catalog._scan_all()
+        print(f"{f'rescan {label}':>28}  {(time.perf_counter() - start) * 1000:>9.1f} ms  ({catalog.last_scan['dirs_listed']} dirs listed)")
+    catalog.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--tree-files", type=int, default=20000, help="files for the rescan test (0 = skip)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="catalog-bench-")
+    try:
+        store = CatalogStore(os.path.join(tmp, "catalog.db"))
+        start = time.perf_counter()
+        fill(store, args.rows)
+        print(f"{'insert':>28}  {(time.perf_counter() - start) * 1000:>9.1f} ms  ({args.rows} rows)")
+        deep = cursor_at(store, 500)
+        deep_codec = cursor_at(store, 50, query="hevc")
+        deep_category = cursor_at(store, 100, category="cd")
+        cases = [
+            ("browse first page", lambda: store.search()),
+            ("browse page 501", lambda: store.search(cursor=deep)),
+            ("fts common word", lambda: store.search("season")),
+            ("fts two words", lambda: store.search("dune fargo")),
+            ("fts prefix", lambda: store.search("incep")),
+            ("fts rare", lambda: store.search("ALIEN_BATMAN_CASABLANCA")),
+            ("fts no match", lambda: store.search("zzzz")),
+            ("fts + category", lambda: store.search("heat", category="bluray")),
+            ("fts codec page 51", lambda: store.search("hevc", cursor=deep_codec)),
+            ("category page 101", lambda: store.search(category="cd", cursor=deep_category)),
+        ]
+        for name, fn in cases:
+            ms, page = timed(fn)
+            print(f"{name:>28}  {ms:>9.2f} ms  ({len(page['items'])} items)")
+        store.close()
+        if args.tree_files:
+            bench_tree(os.path.join(tmp, "tree"), args.tree_files)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
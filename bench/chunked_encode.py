@@ -0,0 +1,83 @@
+"""
+Split vs single-process encode of one title with the real tools (HandBrakeCLI via
+flatpak, mkvmerge, and ffmpeg for the quality score): wall time, output size, duration
+drift against the source and SSIM/PSNR of each result against the source.
+
+    python -m bench.chunked_encode title_t00.mkv --preset-name "H.265 MKV 1080p30" [--preset-file p.json] [--chunks 4 8]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from app.core.integrations import mkvmerge
+from app.core.integrations.handbrake import HandBrake
+from app.core.media import ChunkPolicy, TrackSelection, encode_chunked, probe_mkv
+
+
+def quality(output: str, source: str) -> str:
+    """SSIM and PSNR of output against source (ffmpeg), or "-" without ffmpeg."""
+    if not shutil.which("ffmpeg"):
+        return "-"
+    # Scale the reference to the encode's picture so cropped/scaled presets still compare
+    graph = "[1:v][0:v]scale2ref[ref][enc];[enc]split[a][b];[a][ref]ssim;[b][ref]psnr"
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", output, "-i", source, "-lavfi", graph, "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+    ssim = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    psnr = re.search(r"PSNR .*average:([\d.inf]+)", result.stderr)
+    return f"SSIM {ssim.group(1) if ssim else '?'} PSNR {psnr.group(1) if psnr else '?'}"
+
+
+def report(label: str, path: str, seconds: float, source_duration: float, source: str):
+    out = probe_mkv(path)
+    print(f"{label:>10}  {seconds:>8.1f}  {os.path.getsize(path) / 1e6:>9.1f}  {out.duration - source_duration:>+8.3f}  {quality(path, source)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("--preset-name", required=True)
+    parser.add_argument("--preset-file")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[4])
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    if not mkvmerge.available():
+        parser.error("mkvmerge is required")
+    preset = None
+    if args.preset_file:
+        with open(args.preset_file) as f:
+            preset = next((p for p in json.load(f).get("PresetList", []) if p.get("PresetName") == args.preset_name), None)
+    tracks = TrackSelection.from_preset(preset) if preset else TrackSelection()
+    hb = HandBrake(args.preset_name, args.preset_file)
+    info = probe_mkv(args.input)
+    tmp = tempfile.mkdtemp(prefix="chunk-bench-", dir=args.workdir)
+    print(f"{os.path.basename(args.input)}: {info.duration / 60:.1f} min, {info.size / 1e9:.2f} GB, {len(info.chapters)} chapters")
+    print(f"{'mode':>10}  {'wall s':>8}  {'MB':>9}  {'drift s':>8}  quality")
+    try:
+        single = os.path.join(tmp, "single.mkv")
+        start = time.monotonic()
+        if not hb.encode_file(args.input, single):
+            raise SystemExit("single-process encode failed")
+        report("single", single, time.monotonic() - start, info.duration, args.input)
+
+        for chunks in args.chunks:
+            points = ChunkPolicy(chunks=chunks, min_seconds=0, tracks=tracks).split_points(info)
+            out = os.path.join(tmp, f"chunked{chunks}.mkv")
+            start = time.monotonic()
+            if not encode_chunked(hb, mkvmerge, info, out, points, tracks, [], tmp, lambda line: None):
+                print(f"{f'{chunks} parts':>10}  failed")
+                continue
+            report(f"{chunks} parts", out, time.monotonic() - start, info.duration, args.input)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Stand-ins for the external tools a rip shells out to. The harness puts a wrapper
+per tool name on PATH that runs `tool.py <name> <args...>`; behaviour comes from
+the JSON file in $BENCH_STATE (drives, discs and simulated speeds) and output is
+replayed from the transcripts in recordings/.
+
+Reads really read the file that stands in for the drive and writes really write,
+paced to the configured MB/s, so temp/output I/O and page cache behave as in a rip.
+"""
+import json
+import os
+import struct
+import sys
+import time
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+CHUNK = 1024 * 1024
+SECTOR_BYTES = 2352
+WORDS_PER_SECTOR = SECTOR_BYTES // 2
+
+
+def load_state() -> dict:
+    with open(os.environ["BENCH_STATE"]) as f:
+        return json.load(f)
+
+
+STATE = load_state()
+
+
+def recording(name: str, **values) -> str:
+    with open(os.path.join(RECORDINGS, name)) as f:
+        text = f.read()
+    for key, value in values.items():
+        text = text.replace("{" + key + "}", str(value))
+    return text
+
+
+def find_drive(device: str) -> dict:
+    """Accepts the drive file's path, dev:<path> or /dev/<name>."""
+    device = device[4:] if device.startswith("dev:") else device
+    for path, drive in STATE["drives"].items():
+        if device in (path, os.path.realpath(path)) or os.path.basename(device) == drive["name"]:
+            return dict(drive, path=path)
+    sys.stderr.write(f"{device}: no such device\n")
+    sys.exit(1)
+
+
+def opt(args: list, flag: str, default=None):
+    for i, arg in enumerate(args):
+        if arg == flag and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def pump(src, dst, nbytes: int, mbps: float, on_progress=None, ratio: float = 1.0):
+    """Copies nbytes from src to dst (scaled by ratio) no faster than mbps, wrapping src at EOF."""
+    start = time.monotonic()
+    done = written = 0
+    while done < nbytes:
+        chunk = src.read(min(CHUNK, nbytes - done)) if src else b""
+        if src and not chunk:
+            src.seek(0)
+            continue
+        size = len(chunk) or min(CHUNK, nbytes - done)
+        done += size
+        out = int(done * ratio) - written
+        if dst and out > 0:
+            dst.write((chunk or bytes(size))[:out].ljust(out, b"\0"))
+            written += out
+        ahead = done / (mbps * 1e6) - (time.monotonic() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+        if on_progress:
+            on_progress(done, nbytes)
+    if dst:
+        dst.flush()
+    return written
+
+
+def ebml(element_id: int, payload: bytes) -> bytes:
+    size = len(payload)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + (size | 1 << 56).to_bytes(8, "big") + payload
+
+
+def mkv_header(disc: dict, size: int) -> bytes:
+    """EBML header, Info and Tracks as MakeMKV writes them; the rest of the title is filler."""
+    codec_ids = {"hevc": "V_MPEGH/ISO/HEVC", "h264": "V_MPEG4/ISO/AVC", "mpeg2": "V_MPEG2", "vc1": "V_MS/VFW/FOURCC"}
+    width, height = disc.get("resolution", (1920, 1080))
+    seconds = size / (disc.get("mbps", 30) * 1e6 / 8)
+    video = ebml(0xAE, ebml(0xD7, b"\1") + ebml(0x83, b"\1") + ebml(0x86, codec_ids[disc.get("codec", "mpeg2")].encode())
+                 + ebml(0xE0, ebml(0xB0, width.to_bytes(2, "big")) + ebml(0xBA, height.to_bytes(2, "big"))))
+    entries = [video]
+    for n, (kind, lang) in enumerate(disc.get("streams", [(2, "eng"), (2, "ger"), (17, "eng"), (17, "fre")]), start=2):
+        codec = b"A_AC3" if kind == 2 else b"S_HDMV/PGS"
+        entries.append(ebml(0xAE, ebml(0xD7, bytes([n])) + ebml(0x83, bytes([kind])) + ebml(0x86, codec) + ebml(0x22B59C, lang.encode())))
+    info = ebml(0x1549A966, ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + ebml(0x4489, struct.pack(">d", seconds * 1000)))
+    segment = info + ebml(0x1654AE6B, b"".join(entries))
+    return ebml(0x1A45DFA3, ebml(0x4282, b"matroska")) + (0x18538067).to_bytes(4, "big") + b"\x01\xff\xff\xff\xff\xff\xff\xff" + segment
+
+
+def read_speed(drive: dict) -> float:
+    return drive.get("read_mbps") or STATE.get("read_mbps", 20)
+
+
+def lsblk(args):
+    if "-J" in args:
+        print(json.dumps({"blockdevices": [{"name": d["name"], "type": "rom"} for d in STATE["drives"].values()]}))
+        return 0
+    drive = find_drive(args[-1])
+    columns = args[-2]  # lsblk -no ID <dev>, -bno SIZE <dev>, -o MOUNTPOINT <dev>
+    if columns == "ID":
+        print(f"{drive['model']}_{drive['serial']}")
+    elif columns == "LABEL":
+        print(drive["disc"].get("label", ""))
+    elif columns == "SIZE":
+        print(os.path.getsize(drive["path"]))
+    elif columns == "MOUNTPOINT":
+        if "-o" in args:
+            print("MOUNTPOINT")
+        print("")
+    return 0
+
+
+def udevadm(args):
+    if args and args[0] == "monitor":
+        # Insertions come from the harness, not udev; just stay alive like the real monitor
+        while True:
+            time.sleep(3600)
+    drive = find_drive(opt(args, "--name", ""))
+    caps = {"CD": ["ID_CDROM=1"], "DVD": ["ID_CDROM=1", "ID_CDROM_DVD=1"], "BD": ["ID_CDROM=1", "ID_CDROM_DVD=1", "ID_CDROM_BD=1"]}
+    print("\n".join([f"DEVNAME=/dev/{drive['name']}", *caps[drive["capability"]], "ID_CDROM_MEDIA=1"]))
+    return 0
+
+
+def blkid(args):
+    drive = find_drive(args[-1])
+    fs = drive["disc"].get("fs", "")
+    if fs:
+        print(fs)
+    return 0 if fs else 2
+
+
+def makemkvcon(args):
+    if "info" in args:
+        drive = find_drive(next(a for a in args if a.startswith("dev:")))
+        disc = drive["disc"]
+        titles = disc.get("titles", [])
+        out = [recording(
+            "makemkvcon_info.txt", model=drive["model"], label=disc.get("label", "BENCH"),
+            device=drive["path"], titles=len(titles), media="Blu-ray disc" if drive["capability"] == "BD" else "DVD disc",
+        ).rstrip("\n")]
+        for i, size in enumerate(titles):
+            seconds = int(size / 4e6)  # ~32 Mbit/s
+            out.append(recording(
+                "makemkvcon_title.txt", id=i, label=disc.get("label", "BENCH"), chapters=12,
+                duration=f"{seconds // 3600}:{seconds // 60 % 60:02}:{seconds % 60:02}",
+                size=size, size_human=human(size), playlist=f"{i:05}.mpls", segment=str(i),
+                filename=f"title_t{i:02}.mkv",
+            ).rstrip("\n"))
+        print("\n".join(out))
+        return 0
+
+    # makemkvcon --robot mkv dev:<drive> <title|all> <dir> ... --progress=<file>
+    device = next(a for a in args if a.startswith("dev:"))
+    idx = args.index(device)
+    which, outdir = args[idx + 1], args[idx + 2]
+    progress_path = opt(args, "--progress")
+    drive = find_drive(device)
+    titles = drive["disc"].get("titles", [])
+    wanted = range(len(titles)) if which == "all" else [int(which)]
+    total = sum(titles[i] for i in wanted) or 1
+    print(recording("makemkvcon_rip.txt", days=30, outdir=outdir), end="", flush=True)
+
+    time.sleep(STATE.get("spinup_s", 0))
+    progress = open(progress_path, "a") if progress_path else None
+    copied = 0
+    with open(drive["path"], "rb") as src:
+        for i in wanted:
+            if progress:
+                progress.write('PRGC:5017,0,"Saving to MKV file"\n')
+            with open(os.path.join(outdir, f"title_t{i:02}.mkv"), "wb") as dst:
+                dst.write(mkv_header(drive["disc"], titles[i]))
+
+                def report(done, _n, base=copied):
+                    if progress and done % (8 * CHUNK) < CHUNK:
+                        progress.write(f"PRGV:0,{int((base + done) * 65536 / total)},65536\n")
+                        progress.flush()
+                pump(src, dst, titles[i], read_speed(drive), report)
+            copied += titles[i]
+    if progress:
+        progress.write("PRGV:65536,65536,65536\n")
+        progress.close()
+    print(f'MSG:5036,0,1,"Copy complete. {len(wanted)} titles saved.","Copy complete. %1 titles saved.","{len(wanted)}"')
+    return 0
+
+
+def handbrake_scan(src_path: str, previews: str) -> int:
+    # Duration/size come from the fake MKV header; crop and combing from the state file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from app.core.media.mkv import probe_mkv
+    info = probe_mkv(src_path)
+    seconds = int(info.duration)
+    crop = STATE.get("scan_crop", (0, 0, 0, 0))
+    time.sleep(STATE.get("scan_seconds", 0.2))
+    print(f"[00:00:00] scan: {previews.split(':')[0]} previews, {info.video.width}x{info.video.height}"
+          f"{', combing detected' if STATE.get('scan_combed') else ''}", file=sys.stderr)
+    print(f"+ title 1:\n  + stream: {src_path}\n  + duration: {seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}")
+    print(f"  + size: {info.video.width}x{info.video.height}, pixel aspect: 1/1, display aspect: 1.78, 23.976 fps")
+    print(f"  + autocrop: {'/'.join(map(str, crop))}")
+    if STATE.get("scan_combed"):
+        print("  + combing detected, may be interlaced or telecined")
+    return 0
+
+
+def handbrake_sample(src_path: str, dst_path: str, seconds: float, quality: float) -> int:
+    # Output bitrate follows the title's complexity and halves every +6 RF
+    mbps = STATE.get("complexity_mbps", 4.0) * 2 ** ((22 - quality) / 6)
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        pump(src, dst, int(seconds * mbps * 1e6 / 8), STATE.get("encode_mbps", 60))
+    return 0
+
+
+def handbrake(args):
+    src_path, dst_path = opt(args, "-i"), opt(args, "-o")
+    if "--scan" in args:
+        return handbrake_scan(src_path, opt(args, "--previews", "10:0"))
+    if "--stop-at" in args:
+        return handbrake_sample(src_path, dst_path, float(opt(args, "--stop-at").split(":")[1]), float(opt(args, "-q", 22)))
+    size = os.path.getsize(src_path)
+    print(recording("handbrake_start.txt", input=src_path), end="", flush=True)
+    start = time.monotonic()
+    mbps = STATE.get("encode_mbps", 60)
+
+    def report(done, total):
+        if done % (4 * CHUNK) < CHUNK or done == total:
+            pct = 100.0 * done / total
+            eta = int((total - done) / (mbps * 1e6))
+            fps = 25.0 * done / 4e6 / max(1e-3, time.monotonic() - start)
+            print(f"Encoding: task 1 of 1, {pct:.2f} % ({fps:.2f} fps, avg {fps:.2f} fps, ETA 00h{eta // 60:02}m{eta % 60:02}s)", flush=True)
+
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        pump(src, dst, size, mbps, report, ratio=STATE.get("encode_ratio", 0.3))
+    print("Encode done!\nHandBrake has exited.")
+    return 0
+
+
+def mkvmerge(args):
+    # mkvmerge -o <out> [--split timestamps:..] ... <in>, or -o <out> <part> + <part> ... -D ... <source>
+    dst_path = opt(args, "-o")
+    split = opt(args, "--split")
+    if split:
+        sources = [args[-1]]
+    elif "+" in args:
+        sources = [a for i, a in enumerate(args) if a.endswith(".mkv") and a != dst_path and (i + 1 < len(args) and args[i + 1] == "+" or args[i - 1] == "+")]
+    else:
+        sources = [args[-1]]
+    size = sum(os.path.getsize(p) for p in sources)
+    last = [-1]
+
+    def report(done, total):
+        pct = int(100 * done / total)
+        if pct != last[0]:
+            last[0] = pct
+            print(f"Progress: {pct}%", flush=True)
+
+    print(f"mkvmerge v80.0 ('Roundabout') 64-bit\n'{sources[0]}': Using the demultiplexer for the format 'Matroska'.", flush=True)
+    if split:
+        # Split files: equal parts with the source's header so they probe like titles
+        parts = len(split.split(":", 1)[1].split(",")) + 1
+        stem, ext = os.path.splitext(dst_path)
+        with open(sources[0], "rb") as src:
+            for n in range(1, parts + 1):
+                with open(f"{stem}-{n:03}{ext}", "wb") as dst:
+                    pump(src, dst, size // parts, STATE.get("remux_mbps", 400))
+                print(f"The file '{stem}-{n:03}{ext}' has been opened for writing.", flush=True)
+    else:
+        with open(dst_path, "wb") as dst:
+            for path in sources:
+                with open(path, "rb") as src:
+                    pump(src, dst, os.path.getsize(path), STATE.get("remux_mbps", 400), report)
+    print("Multiplexing took 1 second.")
+    return 0
+
+
+def flatpak(args):
+    # flatpak run --command=HandBrakeCLI fr.handbrake.ghb <HandBrakeCLI args>
+    return handbrake(args[3:])
+
+
+def dd(args):
+    drive = find_drive(opt(args, "if"))
+    size = os.path.getsize(drive["path"])
+    last = [0.0]
+
+    def report(done, total):
+        now = time.monotonic()
+        if now - last[0] >= 0.5 or done == total:
+            last[0] = now
+            sys.stderr.write(f"{done} bytes ({human(done)}) copied, {now:.0f} s, {read_speed(drive):.0f} MB/s\r")
+            sys.stderr.flush()
+
+    time.sleep(STATE.get("spinup_s", 0))
+    with open(drive["path"], "rb") as src:
+        pump(src, sys.stdout.buffer, size, read_speed(drive), report)
+    sys.stderr.write(f"\n{size // 65536} records in\n{size // 65536} records out\n")
+    return 0
+
+
+def cdparanoia(args):
+    drive = find_drive(opt(args, "-d"))
+    tracks = drive["disc"].get("tracks", [])
+    if "-Q" in args:
+        lines = [recording("cdparanoia_toc.txt").rstrip("\n")]
+        begin = 0
+        for n, sectors in enumerate(tracks, start=1):
+            lines.append(f"{n:3}.    {sectors:6} [{sectors // 4500:02}:{sectors // 75 % 60:02}.{sectors % 75:02}]    {begin:6} [00:00.00]    no   no  2")
+            begin += sectors
+        lines.append(f"TOTAL  {begin:6} [00:00.00]    (audio only)")
+        sys.stderr.write("\n".join(lines) + "\n")
+        return 0
+
+    number, wav = int(args[-2]), args[-1]
+    begin = sum(tracks[:number - 1])
+    sectors = tracks[number - 1]
+    speed = opt(args, "-S")
+    mbps = min(read_speed(drive), int(speed) * 0.1764) if speed else read_speed(drive)
+
+    def report(done, _total):
+        if done % (2 * CHUNK) < CHUNK:
+            sys.stderr.write(f"##: 0 [read] @ {(begin + done // SECTOR_BYTES) * WORDS_PER_SECTOR}\n")
+
+    with open(drive["path"], "rb") as src, open(wav, "wb") as dst:
+        dst.write(b"RIFF" + bytes(40))
+        pump(src, dst, sectors * SECTOR_BYTES, mbps, report)
+    return 0
+
+
+def abcde(args):
+    drive = find_drive(opt(args, "-d"))
+    tracks = drive["disc"].get("tracks", [])
+    print(recording("abcde.txt", tracks=" ".join(str(i + 1) for i in range(len(tracks)))), end="", flush=True)
+    for n, sectors in enumerate(tracks, start=1):
+        print(f"Grabbing track {n:02}: Track {n:02}...", flush=True)
+        time.sleep(sectors * SECTOR_BYTES / (read_speed(drive) * 1e6))
+    print("Finished.")
+    return 0
+
+
+def encoder(args):
+    """flac/opusenc/oggenc/lame writing the encoded stream to stdout."""
+    wav = next(a for a in args if a.endswith(".wav"))
+    size = os.path.getsize(wav)
+    with open(wav, "rb") as src:
+        pump(src, sys.stdout.buffer, size, STATE.get("encode_mbps", 60), ratio=STATE.get("audio_ratio", 0.6))
+    return 0
+
+
+def noop(args):
+    return 0
+
+
+TOOLS = {
+    "lsblk": lsblk,
+    "udevadm": udevadm,
+    "blkid": blkid,
+    "makemkvcon": makemkvcon,
+    "HandBrakeCLI": handbrake,
+    "mkvmerge": mkvmerge,
+    "flatpak": flatpak,
+    "dd": dd,
+    "cdparanoia": cdparanoia,
+    "abcde": abcde,
+    "flac": encoder,
+    "opusenc": encoder,
+    "oggenc": encoder,
+    "lame": encoder,
+    "eject": noop,
+    "fuser": noop,
+}
+
+if __name__ == "__main__":
+    sys.exit(TOOLS[sys.argv[1]](sys.argv[2:]))
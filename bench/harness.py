@@ -0,0 +1,410 @@
+"""
+End-to-end throughput harness: N concurrent jobs through JobTracker against
+simulated drives, without discs or the real tools.
+
+Each drive is a file (optionally attached to a loop device with --loop, which
+needs root). makemkvcon, HandBrakeCLI (via flatpak), abcde, cdparanoia, dd,
+udevadm, blkid, lsblk and the audio encoders are replaced on PATH by the
+simulators in bench/fakes, paced to --read-mbps / --encode-mbps. The real API
+runs on a loopback port so JobContext round trips are measured too; a poller
+plays the part of an open dashboard.
+
+    python -m bench.harness --jobs 8 --drives 2 --discs dvd_video,audio_cd
+    python -m bench.harness --jobs 8 --json base.json            # record a baseline
+    python -m bench.harness --jobs 8 --compare base.json          # exit 1 on regression
+
+Every inserted disc gets an ISO 9660 volume descriptor with its label, so the
+duplicate index sees distinct discs; --unique-discs N cycles N discs to exercise it:
+
+    python -m bench.harness --jobs 8 --discs dvd_rom --unique-discs 2 --duplicates skip
+
+Reports jobs/hour, job duration, API latency, peak thread count and peak RSS.
+"""
+import argparse
+import configparser
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_TOOL = os.path.join(REPO, "bench", "fakes", "tool.py")
+TOOLS = [
+    "lsblk", "udevadm", "blkid", "makemkvcon", "HandBrakeCLI", "flatpak", "dd",
+    "cdparanoia", "abcde", "flac", "opusenc", "oggenc", "lame", "eject", "fuser", "mkvmerge",
+]
+CAPABILITY = {"audio_cd": "CD", "cd_rom": "CD", "dvd_video": "DVD", "dvd_rom": "DVD", "bluray_video": "BD", "bluray_rom": "BD"}
+FILESYSTEM = {"audio_cd": "", "cd_rom": "iso9660", "dvd_video": "udf", "dvd_rom": "udf", "bluray_video": "udf", "bluray_rom": "udf"}
+# (metric, True if higher is better) checked by --compare
+PVD_OFFSET = 16 * 2048
+REGRESSION_KEYS = [("jobs_per_hour", True), ("api_p99_ms", False), ("rss_peak_mb", False), ("threads_peak", False)]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def histogram_quantile(metric, q, **labels) -> float:
+    """Upper bound of the bucket holding the q-quantile, summed over matching series."""
+    counts = None
+    for values, child in list(metric._children.items()):
+        if any(dict(zip(metric.labelnames, values)).get(k) != v for k, v in labels.items()):
+            continue
+        with child.lock:
+            counts = [a + b for a, b in zip(counts, child.counts)] if counts else list(child.counts)
+    if not counts or not sum(counts):
+        return 0.0
+    target, running = q * sum(counts), 0
+    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+        running += count
+        if running >= target:
+            return bound
+    return float("inf")
+
+
+class Workspace:
+    """Temp tree with config, fake tools on PATH and one file per simulated drive."""
+
+    def __init__(self, args):
+        self.args = args
+        self.root = tempfile.mkdtemp(prefix="tkdr-bench-")
+        self.bin = os.path.join(self.root, "bin")
+        self.state_path = os.path.join(self.root, "state.json")
+        self.loops = []
+        self.files = {}  # drive path -> backing file
+        self.disc_types = [d.strip() for d in args.discs.split(",") if d.strip()]
+        self.state = {
+            "read_mbps": args.read_mbps,
+            "encode_mbps": args.encode_mbps,
+            "encode_ratio": 0.3,
+            "scan_crop": [140, 140, 0, 0],
+            "spinup_s": args.spinup,
+            "drives": {},
+        }
+
+    def build(self):
+        os.makedirs(self.bin)
+        for tool in TOOLS:
+            path = os.path.join(self.bin, tool)
+            with open(path, "w") as f:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_TOOL}" {tool} "$@"\n')
+            os.chmod(path, 0o755)
+
+        os.makedirs(os.path.join(self.root, "dev"))
+        for i in range(self.args.drives):
+            disc_type = self.disc_types[i % len(self.disc_types)]
+            path = os.path.join(self.root, "dev", f"sr{i}")
+            with open(path, "wb") as f:
+                f.truncate(self.args.disc_mb * 1024 * 1024)
+            if self.args.loop:
+                path = subprocess.run(["losetup", "--find", "--show", "--read-only", path], capture_output=True, text=True, check=True).stdout.strip()
+                self.loops.append(path)
+            self.files[path] = os.path.join(self.root, "dev", f"sr{i}")
+            self.state["drives"][path] = {
+                "name": os.path.basename(path),
+                "model": f"BENCH_{CAPABILITY[disc_type]}",
+                "serial": f"{i:04}",
+                "capability": "BD",
+                "disc": self._disc(disc_type, 0),
+            }
+        for path, drive in self.state["drives"].items():
+            self._write_volume(path, drive["disc"])
+        self.save_state()
+        self._write_config()
+        os.symlink(os.path.join(REPO, "app"), os.path.join(self.root, "app"))
+
+    def _disc(self, disc_type: str, serial: int) -> dict:
+        size = self.args.disc_mb * 1024 * 1024
+        disc = {"type": disc_type, "label": f"BENCH_{disc_type.upper()}_{serial}", "fs": FILESYSTEM[disc_type]}
+        if disc_type == "audio_cd":
+            sectors = size // 2352
+            disc["tracks"] = [sectors // self.args.titles] * self.args.titles
+            disc["tracks"][-1] -= serial % 1000  # a distinct TOC per disc
+        else:
+            disc["titles"] = [size // self.args.titles] * self.args.titles
+            disc["codec"] = self.args.source_codec
+        return disc
+
+    def insert(self, drive_path: str, serial: int) -> str:
+        """Simulates swapping in a new disc (fresh label) and returns its type."""
+        drive = self.state["drives"][drive_path]
+        if self.args.unique_discs:
+            serial %= self.args.unique_discs
+        drive["disc"] = self._disc(drive["disc"]["type"], serial)
+        self._write_volume(drive_path, drive["disc"])
+        self.save_state()
+        return drive["disc"]["type"]
+
+    def _write_volume(self, drive_path: str, disc: dict):
+        """A minimal ISO 9660 primary volume descriptor carrying the disc's label."""
+        pvd = bytearray(2048)
+        if disc["fs"]:
+            pvd[0:7] = b"\x01CD001\x01"
+            pvd[40:72] = disc["label"].encode()[:32].ljust(32)
+            pvd[80:84] = (self.args.disc_mb * 512).to_bytes(4, "little")
+        with open(self.files[drive_path], "r+b") as f:
+            f.seek(PVD_OFFSET)
+            f.write(pvd)
+
+    def save_state(self):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    def _write_config(self):
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(os.path.join(REPO, "config", "TKDiscRipper.conf"))
+        out = os.path.join(self.root, "out")
+        # x265 1080p with English/German audio: titles from --source-codec hevc qualify for a remux
+        preset = os.path.join(self.root, "bench-preset.json")
+        with open(preset, "w") as f:
+            json.dump({"PresetList": [{
+                "PresetName": "BENCH", "VideoEncoder": "x265", "PictureWidth": 1920, "PictureHeight": 1080,
+                "VideoQualityType": 2, "VideoQualitySlider": 22, "AudioLanguageList": ["eng", "deu"], "AudioTrackSelectionBehavior": "all",
+                "SubtitleLanguageList": ["eng"], "SubtitleTrackSelectionBehavior": "all",
+            }]}, f)
+        video = {
+            "usehandbrake": "True", "handbrakepreset_name": "BENCH", "handbrakepreset_path": preset, "remux": "true",
+            "chunkedencode": str(self.args.chunks), "chunkminminutes": "0",
+        }
+        overrides = {
+            "General": {
+                "tempdirectory": os.path.join(self.root, "temp"), "outputdirectory": out, "tempreservegb": "0", "fasttempdirectory": "",
+                "encoderatepath": os.path.join(self.root, "cache", "encode_rates.json"),
+                "throughputpath": os.path.join(self.root, "cache", "throughput.json"),
+                "analysispath": os.path.join(self.root, "cache", "analysis.json"),
+            },
+            "CD": {"backend": "native", "outputdirectory": os.path.join(out, "CD"), "outputformat": "flac"},
+            "DVD": {"outputdirectory": os.path.join(out, "DVD"), **video},
+            "BLURAY": {"outputdirectory": os.path.join(out, "BLURAY"), **video},
+            "OTHER": {"outputdirectory": os.path.join(out, "ISO"), "compression": self.args.compression},
+            "Metadata": {"providers": "local", "localdirectory": os.path.join(self.root, "meta"), "cachepath": os.path.join(self.root, "cache", "metadata.json")},
+            "Workers": {"enabled": "false"},
+            "Catalog": {"path": os.path.join(self.root, "cache", "catalog.db")},
+            "Duplicates": {"policy": self.args.duplicates, "indexpath": os.path.join(self.root, "cache", "disc_index.json")},
+            "Drives": {"blacklist": "", "profilepath": os.path.join(self.root, "cache", "profiles.json"), "readspeed": "0", "speedcaps": ""},
+        }
+        for section, values in overrides.items():
+            if not config.has_section(section):
+                config.add_section(section)
+            for key, value in values.items():
+                config.set(section, key, value)
+        os.makedirs(os.path.join(self.root, "config"))
+        with open(os.path.join(self.root, "config", "TKDiscRipper.conf"), "w") as f:
+            config.write(f)
+
+    def cleanup(self):
+        for loop in self.loops:
+            subprocess.run(["losetup", "-d", loop], check=False)
+        if not self.args.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+class Sampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        import psutil
+        self.process = psutil.Process()
+        self.interval = interval
+        self.threads, self.rss = [], []
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.is_set():
+            self.threads.append(threading.active_count())
+            self.rss.append(self.process.memory_info().rss)
+            self.stop.wait(self.interval)
+
+
+class Poller(threading.Thread):
+    """Polls like an open dashboard: the job list plus each running job's detail."""
+
+    def __init__(self, base_url: str, auth, interval: float, job_ids: list):
+        super().__init__(daemon=True)
+        import requests
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.base_url = base_url
+        self.interval = interval
+        self.job_ids = job_ids
+        self.latencies = []
+        self.errors = 0
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.is_set():
+            for path in ["/api/jobs", *(f"/jobs/{j}/json" for j in list(self.job_ids)[-4:])]:
+                t0 = time.perf_counter()
+                try:
+                    ok = self.session.get(self.base_url + path, timeout=10).ok
+                except Exception:
+                    ok = False
+                self.latencies.append(time.perf_counter() - t0)
+                self.errors += not ok
+            self.stop.wait(self.interval)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(args) -> dict:
+    ws = Workspace(args)
+    ws.build()
+    os.environ["PATH"] = f"{ws.bin}{os.pathsep}{os.environ['PATH']}"
+    os.environ["BENCH_STATE"] = ws.state_path
+    os.chdir(ws.root)
+    sys.path.insert(0, REPO)
+
+    import uvicorn
+    import main
+    from app.core import metrics
+    from app.core.config import get_config
+    from app.core.job import api_helpers
+    from app.core.job.tracker import job_tracker
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    api_helpers.API_URL = f"http://127.0.0.1:{port}"
+
+    config = get_config()
+    auth = (config.get("auth", "username"), config.get("auth", "password"))
+    sampler = Sampler(0.1)
+    sampler.start()
+    job_ids = []
+    poller = Poller(api_helpers.API_URL, auth, args.poll_ms / 1000, job_ids)
+    poller.start()
+
+    drives = list(ws.state["drives"])
+    started, finished = {}, {}
+    deadline = time.time() + args.timeout
+    t_start = time.time()
+    try:
+        next_job = 0
+        while len(finished) < args.jobs and time.time() < deadline:
+            # Feed idle drives; a drive frees up as soon as its job finishes reading
+            for drive in drives:
+                if next_job < args.jobs and job_tracker.drive_manager.is_available(drive):
+                    disc_type = ws.insert(drive, next_job)
+                    job_tracker.drive_manager.invalidate(drive)
+                    job_id = job_tracker.start_job(drive, disc_type)
+                    started[job_id] = time.time()
+                    job_ids.append(job_id)
+                    next_job += 1
+            for job_id in job_ids:
+                job = job_tracker.get_job_status(job_id) or {}
+                if job_id not in finished and job.get("status") in ("completed", "failed"):
+                    finished[job_id] = (time.time(), job.get("status"))
+            time.sleep(0.05)
+    finally:
+        sampler.stop.set()
+        poller.stop.set()
+        server.should_exit = True
+
+    wall = (max((t for t, _ in finished.values()), default=time.time())) - t_start
+    durations = [finished[j][0] - started[j] for j in finished]
+    result = {
+        "jobs": args.jobs,
+        "drives": args.drives,
+        "discs": ws.disc_types,
+        "disc_mb": args.disc_mb,
+        "completed": sum(1 for _, s in finished.values() if s == "completed"),
+        "failed": sum(1 for _, s in finished.values() if s == "failed"),
+        "timed_out": args.jobs - len(finished),
+        "wall_s": round(wall, 2),
+        "jobs_per_hour": round(len(finished) * 3600 / wall, 1) if wall > 0 else 0.0,
+        "job_p50_s": round(percentile(durations, 0.5), 2),
+        "job_p99_s": round(percentile(durations, 0.99), 2),
+        "api_p50_ms": round(percentile(poller.latencies, 0.5) * 1000, 2),
+        "api_p99_ms": round(percentile(poller.latencies, 0.99) * 1000, 2),
+        "api_requests": len(poller.latencies),
+        "api_errors": poller.errors,
+        "update_p99_ms_le": histogram_quantile(metrics.JOB_UPDATE_LATENCY, 0.99) * 1000,
+        "threads_peak": max(sampler.threads, default=0),
+        "rss_peak_mb": round(max(sampler.rss, default=0) / 2**20, 1),
+        "workspace": ws.root if args.keep else None,
+    }
+    _kill_children()
+    ws.cleanup()
+    return result
+
+
+def _kill_children():
+    import psutil
+    for child in psutil.Process().children(recursive=True):
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, higher_is_better in REGRESSION_KEYS:
+        base, now = baseline.get(key), result.get(key)
+        if not base or now is None:
+            continue
+        change = (now - base) / base
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{key}: {base} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--drives", type=int, default=2)
+    parser.add_argument("--discs", default="dvd_video", help="disc types assigned round-robin to drives")
+    parser.add_argument("--disc-mb", type=int, default=64, help="simulated disc size")
+    parser.add_argument("--titles", type=int, default=3, help="titles (or audio tracks) per disc")
+    parser.add_argument("--read-mbps", type=float, default=40.0)
+    parser.add_argument("--encode-mbps", type=float, default=80.0)
+    parser.add_argument("--source-codec", default="mpeg2", choices=["mpeg2", "h264", "hevc", "vc1"], help="video codec of simulated titles; hevc matches the bench preset")
+    parser.add_argument("--chunks", type=int, default=0, help="split-encode every video title into this many parallel parts")
+    parser.add_argument("--unique-discs", type=int, default=0, help="cycle this many distinct discs (0 = every disc is new)")
+    parser.add_argument("--duplicates", default="flag", choices=["off", "flag", "skip", "eject"], help="duplicate disc policy")
+    parser.add_argument("--spinup", type=float, default=0.0, help="seconds before a drive returns data")
+    parser.add_argument("--compression", default="bz2", choices=["bz2", "zstd", "none"])
+    parser.add_argument("--poll-ms", type=float, default=250.0, help="dashboard poll interval")
+    parser.add_argument("--timeout", type=float, default=900.0)
+    parser.add_argument("--loop", action="store_true", help="attach drive files to loop devices (root)")
+    parser.add_argument("--keep", action="store_true", help="keep the workspace for inspection")
+    parser.add_argument("--json", help="write the result to this file")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 if a metric regressed beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    result = run(args)
+    width = max(len(k) for k in result)
+    for key, value in result.items():
+        print(f"{key:>{width}}  {value}")
+    if args.json:
+        with open(os.path.join(cwd, args.json), "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(os.path.join(cwd, args.compare)) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+    sys.exit(1 if result["failed"] or result["timed_out"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Job start latency with 1, 4 and 8 drives.
+
+Drive probing (lsblk/udevadm/fuser) is replaced by a fake that sleeps for
+--probe-ms per call, so the numbers reflect how many probes a job start costs
+rather than the host's hardware. The "legacy" column is what start_job used to
+pay: two ripper constructions, each scanning every drive.
+
+    python -m bench.job_start [--probe-ms 8] [--repeat 20]
+"""
+import argparse
+import json
+import statistics
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+
+def fake_run_factory(drive_count: int, probe_ms: float):
+    names = [f"sr{i}" for i in range(drive_count)]
+
+    def fake_run(cmd, *args, **kwargs):
+        time.sleep(probe_ms / 1000)
+        if cmd[:2] == ["lsblk", "-J"]:
+            out = json.dumps({"blockdevices": [{"name": n, "type": "rom"} for n in names]})
+        elif cmd[0] == "udevadm":
+            out = "ID_CDROM=1\nID_CDROM_DVD=1\nID_CDROM_BD=1\n"
+        elif cmd[:3] == ["lsblk", "-no", "LABEL"]:
+            out = "BENCH_DISC\n"
+        elif cmd[:3] == ["lsblk", "-no", "ID"]:
+            out = "BENCH_DRIVE_0001\n"
+        else:
+            out = ""
+        return SimpleNamespace(stdout=out, stderr="", returncode=0)
+
+    return fake_run
+
+
+def bench(drive_count: int, probe_ms: float, repeat: int) -> dict:
+    from app.core.driveinfo.linux import LinuxDriveInfo
+    from app.core.job.tracker import JobTracker
+
+    with mock.patch("app.core.driveinfo.linux.timed_run", fake_run_factory(drive_count, probe_ms)), \
+         mock.patch("app.core.driveinfo.linux.os.path.realpath", side_effect=lambda p: p), \
+         mock.patch("app.core.job.tracker.os.path.realpath", side_effect=lambda p: p), \
+         mock.patch.object(JobTracker, "_run_job", lambda self, spec, ripper: None):
+        tracker = JobTracker()
+        tracker.drive_manager.invalidate()
+
+        legacy = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(2):
+                LinuxDriveInfo().get_drive_info()
+            legacy.append(time.perf_counter() - t0)
+
+        current = []
+        for _ in range(repeat):
+            tracker.drive_manager.invalidate()
+            for i in range(drive_count):
+                drive = f"/dev/sr{i}"
+                t0 = time.perf_counter()
+                job_id = tracker.start_job(drive, "dvd_video")
+                current.append(time.perf_counter() - t0)
+                tracker.drive_manager.mark_free(drive)
+                tracker.jobs.pop(job_id, None)
+
+    return {
+        "drives": drive_count,
+        "legacy_ms": statistics.median(legacy) * 1000,
+        "current_ms": statistics.median(current) * 1000,
+        "current_p95_ms": sorted(current)[int(len(current) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--probe-ms", type=float, default=8.0, help="simulated latency of one lsblk/udevadm/fuser call")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'drives':>6}  {'legacy (ms)':>12}  {'now (ms)':>9}  {'now p95':>8}")
+    for drive_count in (1, 4, 8):
+        r = bench(drive_count, args.probe_ms, args.repeat)
+        print(f"{r['drives']:>6}  {r['legacy_ms']:>12.1f}  {r['current_ms']:>9.1f}  {r['current_p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
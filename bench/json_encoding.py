@@ -0,0 +1,113 @@
+"""
+Cost of serving /api/jobs at 100 and 10,000 jobs.
+
+    legacy   FastAPI's jsonable_encoder + json.dumps over live job dicts
+    cold     re-snapshot every job and encode (after every job changed)
+    one      one job changed since the last poll
+    warm     nothing changed: cached bytes
+    304      nothing changed and the client sent If-None-Match
+
+    python -m bench.json_encoding [--repeat 20]
+"""
+import argparse
+import json
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+
+def make_job(i: int) -> dict:
+    now = time.time()
+    return {
+        "disc_type": "dvd_video",
+        "drive": f"/dev/sr{i % 4}",
+        "disc_label": f"BENCH_DISC_{i}",
+        "temp_folder": f"/tmp/tkdr/{i}",
+        "output_folder": f"/srv/media/BENCH_DISC_{i}",
+        "start_time": now - 600,
+        "operation": "Transcoding",
+        "status": "Running",
+        "progress": i % 100,
+        "progress_step": 2,
+        "checksums": {f"title_t{t:02}.mkv": "ab" * 16 for t in range(3)},
+        "timeline": [
+            {"name": f"read title {t}", "category": "read", "start": now - 500 + t, "end": now - 400 + t,
+             "thread": "Thread-1", "bytes": 4_000_000_000, "cpu_user": 1.5, "cpu_system": 3.2,
+             "max_rss_kb": 20480, "processes": 1, "args": {"title": t}}
+            for t in range(6)
+        ],
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def bench(count: int, repeat: int) -> dict:
+    from app.core.encoding import ENCODER, json_response
+    from app.core.job.record import JobRecord
+    from app.core.job.tracker import JobTracker
+
+    tracker = JobTracker()
+    for i in range(count):
+        job_id = str(uuid.uuid4())
+        record = JobRecord(job_id, **make_job(i))
+        for n in range(15):
+            record.apply({"log": f"📀 Progress line {n} for job {i}"})
+        tracker.jobs[job_id] = record
+    tracker.update_job(job_id, {"progress": 1})
+
+    legacy_jobs = []
+    for record in tracker.jobs.values():
+        job = dict(record.snapshot())
+        job["stdout_log"] = record.stdout_log
+        legacy_jobs.append(job)
+
+    def touch_all():
+        for job_id in list(tracker.jobs):
+            tracker.update_job(job_id, {"progress": 50})
+        return tracker.encoded_jobs()
+
+    ids = list(tracker.jobs)
+
+    def touch_one():
+        tracker.update_job(ids[0], {"progress": 51})
+        return tracker.encoded_jobs()
+
+    etag, body = tracker.encoded_jobs()
+    conditional = SimpleNamespace(headers={"if-none-match": etag})
+
+    return {
+        "jobs": count,
+        "encoder": ENCODER,
+        "kb": len(body) / 1024,
+        "legacy_ms": timed(lambda: json.dumps(jsonable_encoder(legacy_jobs)).encode(), repeat),
+        "cold_ms": timed(touch_all, repeat),
+        "one_ms": timed(touch_one, repeat),
+        "warm_ms": timed(tracker.encoded_jobs, repeat),
+        "not_modified_ms": timed(lambda: json_response(conditional, tracker.encoded_jobs()[1], etag), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'jobs':>6}  {'encoder':>7}  {'KB':>8}  {'legacy':>9}  {'cold':>8}  {'one':>8}  {'warm':>8}  {'304':>8}  (ms)")
+    for count in (100, 10_000):
+        r = bench(count, args.repeat if count <= 100 else max(3, args.repeat // 4))
+        print(f"{r['jobs']:>6}  {r['encoder']:>7}  {r['kb']:>8.0f}  {r['legacy_ms']:>9.2f}  {r['cold_ms']:>8.2f}"
+              f"  {r['one_ms']:>8.2f}  {r['warm_ms']:>8.3f}  {r['not_modified_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
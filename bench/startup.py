@@ -0,0 +1,80 @@
+"""
+Server startup cost: time to `import main` in a fresh interpreter, and the file and
+process I/O the app itself does while being imported (should be none).
+
+"eager" additionally resolves every ripper, platform backend and config-derived
+setting right after import, which is what startup used to pay up front.
+
+    python -m bench.startup [--repeat 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, sys, sysconfig, time
+root = os.getcwd()
+skip = tuple(p for p in {sys.prefix, sys.base_prefix, sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"]} if p)
+io = []
+
+def app_io(path):
+    if path.startswith(root):
+        return "__pycache__" not in path and not path.endswith(".py")
+    return not path.startswith(skip)
+
+def hook(event, args):
+    if event == "open" and isinstance(args[0], str):
+        path = os.path.abspath(args[0])
+        if app_io(path):
+            io.append("open " + path)
+    elif event == "subprocess.Popen":
+        io.append("exec " + " ".join(map(str, args[1] or [args[0]])))
+
+sys.addaudithook(hook)
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter() - t0
+if EAGER:
+    from app.core.rippers import RIPPERS, get_ripper
+    from app.core.drivemanager import drive_manager
+    from app.core.systeminfo import SystemInfo
+    from app.core.integrations import audioenc, bz2, cdparanoia, handbrake, makemkv, zstd
+    for disc_type in list(RIPPERS):
+        get_ripper(disc_type)
+    for pkg in (audioenc, bz2, cdparanoia, handbrake, makemkv, zstd):
+        [getattr(pkg, name) for name in dir(pkg) if not name.startswith("_")]
+    drive_manager.settings, drive_manager.profiler.store._load()
+total = time.perf_counter() - t0
+print(json.dumps({"import_s": imported, "total_s": total, "io": io, "modules": len(sys.modules)}))
+"""
+
+
+def run(eager: bool) -> dict:
+    code = PROBE.replace("if EAGER:", f"if {eager}:")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6}  {'import ms':>10}  {'total ms':>9}  {'p95 ms':>7}  {'modules':>7}  {'app I/O':>7}")
+    for eager in (False, True):
+        runs = [run(eager) for _ in range(args.repeat)]
+        totals = sorted(r["total_s"] * 1000 for r in runs)
+        print(f"{'eager' if eager else 'lazy':>6}  {statistics.median(r['import_s'] for r in runs) * 1000:>10.1f}"
+              f"  {statistics.median(totals):>9.1f}  {totals[int(len(totals) * 0.95) - 1]:>7.1f}"
+              f"  {runs[-1]['modules']:>7}  {len(runs[-1]['io']):>7}")
+        for line in runs[-1]["io"]:
+            print(f"        {line}")
+
+
+if __name__ == "__main__":
+    main()
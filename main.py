@@ -5,14 +5,18 @@ from fastapi.staticfiles import StaticFiles
 
 import subprocess
 import threading
+import time
 import os
 import logging
 
 from app.api.api import router as api_router
 from app.api.ws_log import ws_router
+from app.api.workers import workers_router
+from app.core.catalog import catalog
 from app.core.config import get_config
 from app.core.disc_detection import monitor_cdrom
 from app.core.job.tracker import job_tracker
+from app.core.metrics import API_LATENCY
 from app.core.templates import templates
 
 app = FastAPI(title="TKDiscRipper", version="2.0")
@@ -20,17 +24,26 @@ security = HTTPBasic()
 
 app.mount("/static", StaticFiles(directory="app/frontend/static"), name="static")
 
-config = get_config()
-USERNAME = config.get("auth", "username")
-PASSWORD = config.get("auth", "password")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not the raw path, so job ids don't explode the series count
+    route = request.scope.get("route")
+    API_LATENCY.labels(
+        request.method, getattr(route, "path", "unmatched"), f"{response.status_code // 100}xx"
+    ).observe(time.perf_counter() - start)
+    return response
+
 def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
-    if credentials.username != USERNAME or credentials.password != PASSWORD:
+    # get_config() is a cached snapshot, so credential changes apply without a restart
+    config = get_config()
+    if credentials.username != config.get("auth", "username") or credentials.password != config.get("auth", "password"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -39,6 +52,7 @@ def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
     return credentials
 
 app.include_router(api_router, dependencies=[Depends(authenticate)])
+app.include_router(workers_router, dependencies=[Depends(authenticate)])
 app.include_router(ws_router)
 
 def generate_ssl_cert(cert_file, key_file):
@@ -56,10 +70,16 @@ def generate_ssl_cert(cert_file, key_file):
 @app.on_event("startup")
 def startup_event():
     threading.Thread(target=monitor_cdrom, daemon=True).start()
+    catalog.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Rip threads would otherwise keep the process (and makemkvcon/HandBrake) alive after the server stops
+    job_tracker.cancel_all("Server shutting down")
 
 @app.get("/", dependencies=[Depends(authenticate)])
 def dashboard(request: Request):
-    jobs = list(job_tracker.jobs.values())
+    jobs = job_tracker.list_jobs()
     return templates.TemplateResponse("dashboard.html", {"request": request, "jobs": jobs})
 
 if __name__ == "__main__":
@@ -68,4 +88,12 @@ if __name__ == "__main__":
     if not os.path.exists(cert_file) or not os.path.exists(key_file):
         generate_ssl_cert(cert_file, key_file)
     import uvicorn
+    unix_socket = get_config().get("Server", "unixsocket", fallback="").strip()
+    if unix_socket:
+        # Plain HTTP for same-host clients; requests still need the API credentials
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        # Same app, so its startup/shutdown hooks (disc monitor, catalog) are left to the TCP server
+        local = uvicorn.Server(uvicorn.Config(app, uds=unix_socket, log_level="warning", lifespan="off"))
+        threading.Thread(target=local.run, name="uds-server", daemon=True).start()
     uvicorn.run(app, host="::", port=8000, ssl_keyfile=key_file, ssl_certfile=cert_file)
@@ -0,0 +1,216 @@
+"""
+Remote transcode/compression worker. Registers with a TKDiscRipper coordinator,
+long-polls for tasks, downloads the input, runs HandBrake or bzip2/zstd locally
+and uploads the result. Several workers can run on one machine for testing:
+
+    python worker.py --server https://[::1]:8000 --slots 2
+    python worker.py --server https://[::1]:8000 --name w2 --capabilities compress
+"""
+import argparse
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+import urllib3
+from requests.auth import HTTPBasicAuth
+
+from app.core.config import get_config
+from app.core.job import api_helpers
+from app.core.job.timeline import Span
+from app.core.integrations.bz2 import compress_bz2
+from app.core.integrations.handbrake import HandBrake
+from app.core.integrations.zstd import compress_zstd
+from app.core.storage.integrity import hash_file
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+HEARTBEAT_INTERVAL = 10
+UPLOAD_CHUNK = 8 * 1024 * 1024
+
+
+class CoordinatorClient:
+    def __init__(self, server: str, auth: HTTPBasicAuth):
+        self.server = server.rstrip("/")
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.verify = False
+        self.worker_id = None
+
+    def _url(self, path: str) -> str:
+        return f"{self.server}{path}"
+
+    def register(self, name: str, capabilities: list[str], slots: int):
+        r = self.session.post(self._url("/api/workers/register"), json={"name": name, "capabilities": capabilities, "slots": slots}, timeout=10)
+        r.raise_for_status()
+        self.worker_id = r.json()["worker_id"]
+
+    def heartbeat(self, load: float) -> bool:
+        r = self.session.post(self._url(f"/api/workers/{self.worker_id}/heartbeat"), json={"load": load}, timeout=10)
+        return r.status_code == 200
+
+    def next_task(self, timeout: int = 25):
+        r = self.session.get(self._url(f"/api/workers/{self.worker_id}/next"), params={"timeout": timeout}, timeout=timeout + 10)
+        if r.status_code == 204:
+            return None
+        r.raise_for_status()
+        return r.json()
+
+    def download(self, task: dict, path: str):
+        with self.session.get(self._url(f"/api/workers/tasks/{task['task_id']}/input"), stream=True, timeout=60) as r:
+            r.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in r.iter_content(UPLOAD_CHUNK):
+                    f.write(chunk)
+
+    def upload(self, task: dict, path: str):
+        def chunks():
+            with open(path, "rb") as f:
+                while chunk := f.read(UPLOAD_CHUNK):
+                    yield chunk
+        r = self.session.put(
+            self._url(f"/api/workers/tasks/{task['task_id']}/output"),
+            params={"worker_id": task["worker_id"]}, data=chunks(), timeout=600,
+        )
+        r.raise_for_status()
+
+    def progress(self, task: dict, pct: float):
+        try:
+            self.session.post(self._url(f"/api/workers/tasks/{task['task_id']}/progress"), json={"progress": pct, "worker_id": task["worker_id"]}, timeout=5)
+        except requests.RequestException:
+            pass
+
+    def complete(self, task: dict, ok: bool, error: str = None, result: dict = None, digest: str = None):
+        self.session.post(
+            self._url(f"/api/workers/tasks/{task['task_id']}/complete"),
+            json={"ok": ok, "error": error, "result": result or {}, "digest": digest, "worker_id": task["worker_id"]},
+            timeout=30,
+        )
+
+
+class TaskContext:
+    """JobContext stand-in: logs go to the job through the job API, progress to the task."""
+
+    def __init__(self, client: CoordinatorClient, task: dict, name: str):
+        self.job_id = task["job_id"]
+        self.client = client
+        self.task = task
+        self.name = name
+
+    def log(self, msg: str):
+        try:
+            api_helpers.update_job(self.job_id, wait=False, log=f"[{self.name}] {msg}")
+        except Exception as e:
+            logging.debug(f"log forward failed: {e}")
+
+    def set_progress(self, **kwargs):
+        if "progress_step" in kwargs:
+            self.client.progress(self.task, kwargs["progress_step"])
+
+    @contextmanager
+    def phase(self, name: str, category: str = "job", **args):
+        # The coordinator records remote spans from task timestamps
+        yield Span(name, category, **args)
+
+
+def run_task(client: CoordinatorClient, task: dict, name: str):
+    ctx = TaskContext(client, task, name)
+    workdir = tempfile.mkdtemp(prefix=f"tkdr-{task['task_id'][:8]}-")
+    try:
+        input_path = os.path.join(workdir, task["input_name"])
+        out_dir = os.path.join(workdir, "out")
+        os.makedirs(out_dir)
+        output_path = os.path.join(out_dir, task["output_name"])
+
+        ctx.log(f"⬇️ Fetching {task['input_name']}")
+        client.download(task, input_path)
+
+        result = {}
+        if task["kind"] == "transcode":
+            preset_path = None
+            if task["params"].get("preset_json"):
+                preset_path = os.path.join(workdir, "preset.json")
+                with open(preset_path, "w") as f:
+                    f.write(task["params"]["preset_json"])
+            hb = HandBrake(task["params"]["preset_name"], preset_path)
+            ok = hb.transcode(
+                [input_path], out_dir, ctx, extra_args={input_path: task["params"].get("args") or []},
+                on_progress=lambda fraction: client.progress(task, fraction * 100),
+            )
+            digest = hash_file(output_path) if ok else None
+        elif task["kind"] == "compress":
+            compress = compress_bz2 if task["params"]["format"] == "bz2" else compress_zstd
+            result = compress(input_path, output_path, ctx.log)
+            ok, digest = True, result["archive"]
+        else:
+            raise ValueError(f"Unknown task kind {task['kind']}")
+
+        if not ok:
+            client.complete(task, False, error=f"{task['kind']} failed on {name}")
+            return
+        ctx.log(f"⬆️ Uploading {task['output_name']}")
+        client.upload(task, output_path)
+        client.complete(task, True, result=result, digest=digest)
+    except Exception as e:
+        logging.exception(f"Task {task['task_id']} failed")
+        client.complete(task, False, error=str(e))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def slot_loop(client: CoordinatorClient, name: str):
+    while True:
+        try:
+            task = client.next_task()
+        except requests.RequestException as e:
+            logging.warning(f"Polling failed: {e}")
+            time.sleep(5)
+            continue
+        if task:
+            run_task(client, task, name)
+
+
+def heartbeat_loop(client: CoordinatorClient, name: str, capabilities: list[str], slots: int):
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        try:
+            if not client.heartbeat(load):
+                client.register(name, capabilities, slots)
+        except requests.RequestException as e:
+            logging.warning(f"Heartbeat failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="https://[::1]:8000")
+    parser.add_argument("--name", default=socket.gethostname())
+    parser.add_argument("--slots", type=int, default=1)
+    parser.add_argument("--capabilities", default="transcode,compress")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    config = get_config()
+    auth = HTTPBasicAuth(config.get("auth", "username"), config.get("auth", "password"))
+    api_helpers.API_URL = args.server.rstrip("/")
+    capabilities = [c.strip() for c in args.capabilities.split(",") if c.strip()]
+
+    client = CoordinatorClient(args.server, auth)
+    client.register(args.name, capabilities, args.slots)
+    logging.info(f"🛰️ Registered as {args.name} ({client.worker_id}) with {args.slots} slots")
+
+    threading.Thread(target=heartbeat_loop, args=(client, args.name, capabilities, args.slots), daemon=True).start()
+    slots = [threading.Thread(target=slot_loop, args=(client, args.name), daemon=True) for _ in range(args.slots)]
+    for t in slots:
+        t.start()
+    for t in slots:
+        t.join()
+
+
+if __name__ == "__main__":
+    main()